@@ -9,8 +9,8 @@ from django.contrib.auth.models import Group
 from django.apps import apps
 from django.core.mail import send_mail
 from django.conf import settings
-import requests
-import stripe
+from django.core.exceptions import ValidationError
+from payments.stripe_client import stripe
 from api.rental_company.models import RentalCompany
 from api.hotel.models import Hotel
 from api.guest.models import Guest
@@ -19,7 +19,8 @@ from api.garage.models import Car
 from api.linkCarandHotel.models import CarHotelLink
 from api.bookingConflict.models import BookingConflict
 from api.booking.email_service import Email
-from middleware_platform.settings import BASE_URL_BACKEND
+from api.availability.index import availability_index
+from api.availability.services import alternative_cars_cache, find_alternative_cars
 from payments.challan.models import TrafficFine
 from payments.models import  Payment
 
@@ -226,52 +227,18 @@ class BookingConflictForm(forms.ModelForm):
         choices = [("", "--- Select a hotel and car ---")]
         instance = self.instance
 
-        if instance and instance.conflicting_booking:
-            booking = instance.conflicting_booking
-            hotel = booking.hotel
-            lat = getattr(hotel, 'latitude', None)
-            lon = getattr(hotel, 'longitude', None)
-
-            if not lat or not lon:
-                return choices
-
-            try:
-                url = self.build_nearby_hotels_url(lat, lon, booking.start_time, booking.end_time)
-                response = requests.get(url)
-                response.raise_for_status()
-                choices.extend(self.parse_api_response(response.json()))
-            except requests.RequestException as e:
-                print(f"Error fetching hotel data: {e}")
-            except Exception as e:
-                print(f"Unexpected error: {e}")
-
-        return choices
-
-    def build_nearby_hotels_url(self, lat, lon, start_time, end_time):
-        return (
-            f'{BASE_URL_BACKEND}/hotels/nearby/?lat={lat}&lon={lon}'
-            f'&radius=2&start_time={start_time.strftime("%Y-%m-%dT%H:%M:%SZ")}'
-            f'&end_time={end_time.strftime("%Y-%m-%dT%H:%M:%SZ")}'
-        )
-
-    def parse_api_response(self, data):
-        options = []
-        for hotel in data.get('results', []):
-            if not hotel.get('available_linked_cars'):
-                continue
-                
-            for car in hotel.get('available_linked_cars', []):
-                if car.get('status') != 'available':
-                    continue
-                    
-                option_value = f"{hotel['id']}|{car['id']}"
+        if instance and instance.conflicting_booking_id:
+            for option in find_alternative_cars(instance.conflicting_booking, radius_km=2):
+                hotel, car = option['hotel'], option['car']
+                option_value = f"{hotel.id}|{car.id}"
                 option_label = (
-                    f"{hotel['name']} ({hotel.get('distance_km', 0):.2f} km) - "
-                    f"{car['model']} ({car.get('plate_number', 'N/A')}) - "
-                    f"{hotel.get('location', 'N/A')}"
+                    f"{hotel.name} ({option['distance_km']:.2f} km) - "
+                    f"{car.model} ({car.plate_number or 'N/A'}) - "
+                    f"{hotel.location or 'N/A'}"
                 )
-                options.append((option_value, option_label))
-        return options
+                choices.append((option_value, option_label))
+
+        return choices
 
 
 
@@ -316,6 +283,8 @@ class BookingConflictAdmin(admin.ModelAdmin):
                         Booking.objects.filter(id=obj.conflicting_booking.id).update(
                             status=Booking.STATUS_CANCELLED
                         )
+                        vehicle_id = obj.conflicting_booking.vehicle_id
+                        transaction.on_commit(lambda vehicle_id=vehicle_id: availability_index.invalidate([vehicle_id]))
                         # Process refund
                         self._process_refund(request, obj.conflicting_booking)
                         email_service = Email()
@@ -338,12 +307,25 @@ class BookingConflictAdmin(admin.ModelAdmin):
                             
                             hotel_id, car_id = selected_option.split('|')
                             print(f"Selected hotel ID: {hotel_id}, car ID: {car_id}")
+                            # The choices come from the cached suggestions, so check the
+                            # car against the database before moving the booking to it
+                            if not CarHotelLink.objects.filter(
+                                car_id=car_id, hotel_id=hotel_id, car__status='available'
+                            ).exists():
+                                raise ValidationError("The selected car is no longer available at that hotel.")
                             obj.conflicting_booking.hotel_id = hotel_id
                             obj.conflicting_booking.vehicle_id = car_id  # ✅ correct field
                             obj.conflicting_booking.status = 'active'
+                            obj.conflicting_booking.clean()
                             obj.conflicting_booking.save()
+                            # The chosen car is no longer an alternative for other conflicts
+                            transaction.on_commit(alternative_cars_cache.clear)
                             email_service = Email()
                             email_service.send_conflict_resolved_email(obj.conflicting_booking)
+                        except ValidationError as e:
+                            # Leave the conflict pending so another car can be picked
+                            messages.error(request, f"Conflict not resolved: {' '.join(e.messages)}")
+                            return
                         except ValueError:
                             self.message_user(request, "Invalid selection format", level='error')
         
@@ -361,6 +343,8 @@ class BookingConflictAdmin(admin.ModelAdmin):
                         Booking.objects.filter(id=conflict.conflicting_booking.id).update(
                             status=Booking.STATUS_CANCELLED
                         )
+                        vehicle_id = conflict.conflicting_booking.vehicle_id
+                        transaction.on_commit(lambda vehicle_id=vehicle_id: availability_index.invalidate([vehicle_id]))
                         self._process_refund(request, conflict.conflicting_booking)
                         email_service = Email()
                         email_service.send_plaintext_cancellation_email(
@@ -571,9 +555,14 @@ class HotelAdmin(admin.ModelAdmin):
         if change and ('name' in form.changed_data or not obj.qr_code):
             obj.generate_qr_code()
 
-        # Ensure geocoding is done if location is set and latitude/longitude are not present
+        # Fill latitude/longitude from the geocode cache; never wait on the geocoder here
         if obj.location and not obj.latitude and not obj.longitude:
-            obj.geocode_address()
+            if not obj.geocode_address(use_network=False):
+                messages.warning(
+                    request,
+                    f"No coordinates cached for '{obj.location}'. Run `manage.py geocode_hotels` "
+                    f"to resolve them; the hotel is left out of nearby searches until then."
+                )
 
         super().save_model(request, obj, form, change)
 
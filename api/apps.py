@@ -1,4 +1,9 @@
+import os
+import sys
+import threading
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ApiConfig(AppConfig):
@@ -6,3 +11,25 @@ class ApiConfig(AppConfig):
     name = 'api'   
     verbose_name = 'Setup'  # This will change the name in the admin
 
+    def ready(self):
+        if self.should_preload_ocr():
+            from api.guest.ocr import load_readers
+
+            # Off the startup path: the first upload waits on the same lazy loader if it is not done yet
+            threading.Thread(target=load_readers, name='ocr-preload', daemon=True).start()
+
+    @staticmethod
+    def should_preload_ocr():
+        """
+        OCR_PRELOAD warms the readers only where OCR actually runs in-process:
+        not when a worker pool is configured, and not for management commands
+        other than runserver.
+        """
+        if not getattr(settings, 'OCR_PRELOAD', False) or getattr(settings, 'OCR_WORKER_ADDRESS', ''):
+            return False
+        if sys.argv and sys.argv[0].endswith('manage.py'):
+            if len(sys.argv) < 2 or sys.argv[1] != 'runserver':
+                return False
+            # Only in the serving child of the autoreloader, not in its watcher
+            return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv
+        return True
@@ -0,0 +1,127 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from api.availability.models import CarDayAvailability
+
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def day_start(date):
+    return timezone.make_aware(datetime.combine(date, time.min))
+
+
+def local_dates(start, end):
+    """Local dates touched by the interval [start, end)."""
+    first = timezone.localtime(start).date()
+    last = timezone.localtime(end - timedelta(microseconds=1)).date()
+    return {first + timedelta(days=offset) for offset in range((last - first).days + 1)}
+
+
+def summarize_day(date, intervals):
+    """
+    (booked_minutes, first_free, last_free) of one day given the car's
+    (start, end) intervals overlapping it. Minutes are counted as booked if
+    any part of them is booked.
+    """
+    start = day_start(date)
+    booked = [False] * MINUTES_PER_DAY
+    for b_start, b_end in intervals:
+        first = max(0, int((b_start - start).total_seconds() // 60))
+        last = min(MINUTES_PER_DAY, -int(-(b_end - start).total_seconds() // 60))
+        booked[first:last] = [True] * max(0, last - first)
+
+    free = [minute for minute, is_booked in enumerate(booked) if not is_booked]
+    if not free:
+        return MINUTES_PER_DAY, None, None
+
+    def as_time(minute):
+        return time(minute // 60, minute % 60)
+
+    return MINUTES_PER_DAY - len(free), as_time(free[0]), as_time(free[-1])
+
+
+def build_rows(car_id, dates, intervals):
+    """CarDayAvailability rows (unsaved) for `dates`, skipping fully free days."""
+    rows = []
+    for date in sorted(dates):
+        start = day_start(date)
+        end = day_start(date + timedelta(days=1))
+        day_intervals = [(b_start, b_end) for b_start, b_end in intervals if b_end > start and b_start < end]
+        if not day_intervals:
+            continue
+        booked_minutes, first_free, last_free = summarize_day(date, day_intervals)
+        if booked_minutes:
+            rows.append(CarDayAvailability(
+                car_id=car_id,
+                date=date,
+                booked_minutes=booked_minutes,
+                first_free=first_free,
+                last_free=last_free,
+            ))
+    return rows
+
+
+def blocking_intervals(car_ids, start, end):
+    """{car_id: [(start, end), ...]} for blocking bookings overlapping [start, end), one query."""
+    from api.booking.models import Booking
+
+    intervals = {car_id: [] for car_id in car_ids}
+    rows = Booking.objects.filter(
+        vehicle_id__in=car_ids,
+        status__in=Booking.BLOCKING_STATUSES,
+        end_time__gt=start,
+        start_time__lt=end,
+    ).values_list('vehicle_id', 'start_time', 'end_time')
+    for car_id, b_start, b_end in rows:
+        intervals[car_id].append((b_start, b_end))
+    return intervals
+
+
+def refresh_car_days(car_id, dates):
+    """Recomputes the calendar rows of one car for the given local dates."""
+    if not dates:
+        return
+    start = day_start(min(dates))
+    end = day_start(max(dates) + timedelta(days=1))
+    intervals = blocking_intervals([car_id], start, end)[car_id]
+
+    with transaction.atomic():
+        CarDayAvailability.objects.filter(car_id=car_id, date__in=dates).delete()
+        CarDayAvailability.objects.bulk_create(build_rows(car_id, dates, intervals))
+
+
+def refresh_for_intervals(intervals):
+    """
+    Refreshes every day touched by `intervals`, an iterable of
+    (car_id, start, end). Used after writes that bypass Booking signals,
+    such as queryset .update() of statuses.
+    """
+    dates_by_car = {}
+    for car_id, start, end in intervals:
+        if car_id and start and end and start < end:
+            dates_by_car.setdefault(car_id, set()).update(local_dates(start, end))
+    for car_id, dates in dates_by_car.items():
+        refresh_car_days(car_id, dates)
+
+
+def rebuild_calendar(car_ids, start_date, end_date):
+    """
+    Rebuilds all calendar rows of `car_ids` between start_date and end_date
+    (inclusive) from the bookings. Returns the number of rows written.
+    """
+    dates = {start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)}
+    intervals = blocking_intervals(car_ids, day_start(start_date), day_start(end_date + timedelta(days=1)))
+
+    rows = []
+    for car_id in car_ids:
+        rows.extend(build_rows(car_id, dates, intervals[car_id]))
+
+    with transaction.atomic():
+        CarDayAvailability.objects.filter(
+            car_id__in=car_ids, date__gte=start_date, date__lte=end_date
+        ).delete()
+        CarDayAvailability.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
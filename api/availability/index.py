@@ -0,0 +1,188 @@
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+
+class _StatusTimeline:
+    """
+    Sorted intervals of a single car for a single booking status.
+    Keeps a running maximum of end times so overlap checks are a bisect.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.ids = []
+        self.max_ends = []
+
+    def add(self, booking_id, start, end):
+        pos = bisect_left(self.starts, start)
+        self.starts.insert(pos, start)
+        self.ends.insert(pos, end)
+        self.ids.insert(pos, booking_id)
+        self._rebuild_max_ends(pos)
+
+    def remove(self, booking_id):
+        try:
+            pos = self.ids.index(booking_id)
+        except ValueError:
+            return
+        del self.starts[pos]
+        del self.ends[pos]
+        del self.ids[pos]
+        self._rebuild_max_ends(pos)
+
+    def _rebuild_max_ends(self, pos):
+        del self.max_ends[pos:]
+        running = self.max_ends[-1] if self.max_ends else None
+        for end in self.ends[pos:]:
+            running = end if running is None or end > running else running
+            self.max_ends.append(running)
+
+    def overlapping(self, start, end):
+        """
+        Yields ids of intervals intersecting [start, end), latest start first.
+        Stops as soon as no earlier interval can reach past `start`.
+        """
+        pos = bisect_left(self.starts, end) - 1
+        while pos >= 0 and self.max_ends[pos] > start:
+            if self.ends[pos] > start:
+                yield self.ids[pos]
+            pos -= 1
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class _CarTimeline:
+    def __init__(self):
+        self.by_status = {}
+        self.bookings = {}  # booking_id -> (start, end, status)
+        self.loaded_at = time.monotonic()
+
+    def add(self, booking_id, start, end, status):
+        self.remove(booking_id)
+        self.bookings[booking_id] = (start, end, status)
+        self.by_status.setdefault(status, _StatusTimeline()).add(booking_id, start, end)
+
+    def remove(self, booking_id):
+        previous = self.bookings.pop(booking_id, None)
+        if previous:
+            self.by_status[previous[2]].remove(booking_id)
+
+
+class AvailabilityIndex:
+    """
+    Process-wide in-memory index of booking intervals, one timeline per car.
+
+    Timelines are loaded from the database the first time a car is asked
+    about and are then kept in sync by the Booking save/delete signals once
+    the surrounding transaction commits.
+    Bulk `.update()` calls bypass those signals, so callers doing them must
+    `invalidate()` the affected cars. Timelines older than
+    AVAILABILITY_INDEX_TTL seconds are reloaded to pick up writes made by
+    other processes.
+    """
+
+    def __init__(self):
+        self._cars = {}
+        self._booking_cars = {}  # booking_id -> car_id, for loaded timelines only
+        self._lock = threading.RLock()
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'AVAILABILITY_INDEX_TTL', 60)
+
+    def _is_fresh(self, timeline):
+        return timeline is not None and time.monotonic() - timeline.loaded_at < self.ttl
+
+    def ensure_loaded(self, car_ids):
+        """Loads every missing or stale timeline for `car_ids` in one query."""
+        from api.booking.models import Booking
+
+        with self._lock:
+            missing = {car_id for car_id in car_ids if not self._is_fresh(self._cars.get(car_id))}
+            if not missing:
+                return
+
+            timelines = {car_id: _CarTimeline() for car_id in missing}
+            rows = Booking.objects.filter(vehicle_id__in=missing).exclude(
+                status=Booking.STATUS_CANCELLED
+            ).values_list('id', 'vehicle_id', 'start_time', 'end_time', 'status')
+            for booking_id, car_id, start, end, status in rows:
+                timelines[car_id].add(booking_id, start, end, status)
+                self._booking_cars[booking_id] = car_id
+            self._cars.update(timelines)
+
+    def _timeline(self, car_id):
+        self.ensure_loaded([car_id])
+        return self._cars[car_id]
+
+    def overlapping(self, car_id, start, end, statuses, exclude=None):
+        """Returns ids of bookings of `car_id` in `statuses` intersecting [start, end)."""
+        with self._lock:
+            timeline = self._timeline(car_id)
+            found = []
+            for status in statuses:
+                status_timeline = timeline.by_status.get(status)
+                if not status_timeline:
+                    continue
+                found.extend(
+                    booking_id for booking_id in status_timeline.overlapping(start, end)
+                    if booking_id != exclude
+                )
+            return found
+
+    def is_free(self, car_id, start, end, statuses, exclude=None):
+        with self._lock:
+            timeline = self._timeline(car_id)
+            for status in statuses:
+                status_timeline = timeline.by_status.get(status)
+                if not status_timeline:
+                    continue
+                for booking_id in status_timeline.overlapping(start, end):
+                    if booking_id != exclude:
+                        return False
+            return True
+
+    def free_cars(self, car_ids, start, end, statuses):
+        """Returns the subset of `car_ids` with no booking in `statuses` during [start, end)."""
+        with self._lock:
+            self.ensure_loaded(car_ids)
+            return [car_id for car_id in car_ids if self.is_free(car_id, start, end, statuses)]
+
+    def update(self, booking_id, car_id, start, end, status):
+        from api.booking.models import Booking
+
+        with self._lock:
+            # Drop the booking from whichever car held it before (vehicle can change)
+            self.remove(booking_id)
+            timeline = self._cars.get(car_id)
+            if timeline is None or status == Booking.STATUS_CANCELLED:
+                return  # Unloaded cars are read from the database on first use
+            timeline.add(booking_id, start, end, status)
+            self._booking_cars[booking_id] = car_id
+
+    def remove(self, booking_id):
+        with self._lock:
+            car_id = self._booking_cars.pop(booking_id, None)
+            timeline = self._cars.get(car_id)
+            if timeline is not None:
+                timeline.remove(booking_id)
+
+    def invalidate(self, car_ids=None):
+        with self._lock:
+            if car_ids is None:
+                self._cars.clear()
+                self._booking_cars.clear()
+                return
+            for car_id in car_ids:
+                timeline = self._cars.pop(car_id, None)
+                if timeline is not None:
+                    for booking_id in timeline.bookings:
+                        self._booking_cars.pop(booking_id, None)
+
+
+availability_index = AvailabilityIndex()
@@ -0,0 +1,31 @@
+import uuid
+from django.db import models
+
+from api.garage.models import Car
+
+
+class CarDayAvailability(models.Model):
+    """
+    Per-day booking summary of a car, maintained from Booking writes.
+    Only days with at least one booked minute are stored; a missing row
+    means the car is free all day.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name='day_availability')
+    date = models.DateField()
+    booked_minutes = models.PositiveIntegerField(default=0)
+    first_free = models.TimeField(null=True, blank=True, help_text="Earliest free minute of the day (empty if fully booked).")
+    last_free = models.TimeField(null=True, blank=True, help_text="Latest free minute of the day (empty if fully booked).")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['car', 'date'], name='car_day_availability_unique'),
+        ]
+        ordering = ['car', 'date']
+
+    @property
+    def is_fully_booked(self):
+        return self.first_free is None
+
+    def __str__(self):
+        return f"{self.car} on {self.date}: {self.booked_minutes} min booked"
@@ -0,0 +1,178 @@
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+
+from api.availability.index import availability_index
+from api.booking.models import Booking
+from api.booking.pricing import quote_price
+from api.cache import BoundedCache
+from api.hotel.models import Hotel
+from api.hotel.spatial import get_spatial_index
+from api.linkCarandHotel.models import CarHotelLink
+
+
+def car_summary(car):
+    """Car fields exposed by the availability and nearby-search endpoints."""
+    return {
+        'id': str(car.id),
+        'model': car.model,
+        'plate_number': car.plate_number,
+        'status': car.status,
+        'price_per_hour': car.price_per_hour,
+        'passengers': car.passengers,
+        'transmission': car.transmission,
+        'fuel_type': car.fuel_type,
+    }
+
+
+def hotel_car_availability(hotel_ids, start_time, end_time):
+    """
+    Availability of every car linked to `hotel_ids` during [start_time, end_time).
+
+    The links and their cars come from one join; whether each car is booked is
+    answered by the in-memory availability index, which loads the timelines of
+    cars it has not seen (or that went stale) in one more query. Returns
+    {hotel_id: [(car, is_available), ...]}.
+
+    This is a read-only answer: a booking another process wrote in the last
+    AVAILABILITY_INDEX_TTL seconds may be missed, and is rejected when the
+    booking is saved by Booking.clean() and the database overlap guard.
+    """
+    links = list(
+        CarHotelLink.objects
+        .filter(hotel_id__in=hotel_ids)
+        .select_related('car')
+        .order_by('hotel_id', 'car__model')
+    )
+    free = set(availability_index.free_cars(
+        [link.car_id for link in links], start_time, end_time, statuses=[Booking.STATUS_ACTIVE]
+    ))
+
+    availability = {hotel_id: [] for hotel_id in hotel_ids}
+    for link in links:
+        availability.setdefault(link.hotel_id, []).append((link.car, link.car_id in free))
+    return availability
+
+
+def default_buffer_minutes():
+    return Booking._meta.get_field('buffer_time').default
+
+
+def find_free_slots(car_ids, duration, horizon_start, horizon_end, limit=5, buffer_minutes=None):
+    """
+    Next `limit` free windows of at least `duration` for any of `car_ids`
+    between horizon_start and horizon_end, earliest first.
+
+    Stored end times already include each booking's buffer; the new booking's
+    own buffer is added to `duration` so a window is only reported if the
+    booking would also fit once saved. Reads only the bookings intersecting
+    the horizon, in one query ordered by (vehicle, start_time), and sweeps the
+    gaps. Returns a list of {'car_id', 'start', 'end'} where `end` is the
+    time the car stays free until.
+    """
+    if buffer_minutes is None:
+        buffer_minutes = default_buffer_minutes()
+    needed = duration + timedelta(minutes=buffer_minutes)
+
+    rows = (
+        Booking.objects
+        .filter(
+            vehicle_id__in=car_ids,
+            status__in=Booking.BLOCKING_STATUSES,
+            end_time__gt=horizon_start,
+            start_time__lt=horizon_end,
+        )
+        .order_by('vehicle_id', 'start_time')
+        .values_list('vehicle_id', 'start_time', 'end_time')
+    )
+    bookings_by_car = {
+        car_id: [(start, end) for _, start, end in group]
+        for car_id, group in groupby(rows, key=lambda row: row[0])
+    }
+
+    slots = []
+    for car_id in car_ids:
+        car_slots = []
+        cursor = horizon_start
+        for start, end in bookings_by_car.get(car_id, []):
+            if start - cursor >= needed:
+                car_slots.append({'car_id': car_id, 'start': cursor, 'end': start})
+                if len(car_slots) >= limit:
+                    break
+            cursor = max(cursor, end)
+        else:
+            if horizon_end - cursor >= needed:
+                car_slots.append({'car_id': car_id, 'start': cursor, 'end': horizon_end})
+        slots.extend(car_slots)
+
+    slots.sort(key=lambda slot: slot['start'])
+    return slots[:limit]
+
+
+# booking id -> ((radius_km, start_time, end_time), alternatives)
+alternative_cars_cache = BoundedCache(
+    max_size=256,
+    ttl=getattr(settings, 'ALTERNATIVE_CARS_CACHE_TTL', 60),
+)
+
+
+def find_alternative_cars(booking, radius_km=2):
+    """
+    Cars free during `booking`'s time window at hotels within `radius_km` of
+    its hotel, nearest hotel first, e.g. to move a booking out of a conflict.
+    Returns [{'hotel', 'car', 'distance_km'}, ...].
+
+    The hotel search uses the in-process spatial index and availability is one
+    query for all hotels found. Results are cached per booking for
+    ALTERNATIVE_CARS_CACHE_TTL seconds and recomputed if its window changes.
+    """
+    window = (radius_km, booking.start_time, booking.end_time)
+    cached = alternative_cars_cache.get(booking.id)
+    if cached is not None and cached[0] == window:
+        return cached[1]
+
+    hotel = booking.hotel
+    if hotel.latitude is None or hotel.longitude is None:
+        return []
+
+    nearby = Hotel.objects.nearby_hotels(hotel.latitude, hotel.longitude, radius_km)
+    availability = hotel_car_availability(
+        [item['hotel'].id for item in nearby], booking.start_time, booking.end_time
+    )
+    alternatives = [
+        {'hotel': item['hotel'], 'car': car, 'distance_km': item['distance_km']}
+        for item in nearby
+        for car, is_available in availability.get(item['hotel'].id, [])
+        if is_available and car.status == 'available' and car.id != booking.vehicle_id
+    ]
+    alternative_cars_cache.set(booking.id, (window, alternatives))
+    return alternatives
+
+
+def nearest_available_cars(lat, lon, start_time, end_time, k=5, max_radius_km=None, batch_size=16):
+    """
+    The `k` cars closest to (lat, lon) that are free during [start_time, end_time).
+
+    Best-first: hotels are expanded in increasing distance, `batch_size` at a
+    time with one availability query per batch, and the search stops as soon
+    as `k` available cars are found, so a dense network is never scanned in
+    full. Returns [{'car', 'hotel', 'distance_km', 'price'}, ...], nearest
+    first; cars at the same hotel are ordered by model.
+    """
+    found = []
+    for batch in get_spatial_index().iter_nearest(lat, lon, batch_size, max_radius_km):
+        availability = hotel_car_availability([hotel.id for _, hotel in batch], start_time, end_time)
+        for distance, hotel in batch:
+            for car, is_available in availability.get(hotel.id, []):
+                if not is_available or car.status != 'available':
+                    continue
+                found.append({
+                    'car': car,
+                    'hotel': hotel,
+                    'distance_km': distance,
+                    'price': round(quote_price(car.price_per_hour, car.max_price_per_day, start_time, end_time), 2),
+                })
+                if len(found) >= k:
+                    return found
+    return found
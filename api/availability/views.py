@@ -0,0 +1,244 @@
+# api/availability/views.py
+
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from api.availability.models import CarDayAvailability
+from api.availability.services import (
+    car_summary,
+    find_free_slots,
+    hotel_car_availability,
+    nearest_available_cars,
+)
+from api.garage.models import Car
+from api.linkCarandHotel.models import CarHotelLink
+from api.availability.utils import count_queries
+
+
+def parse_time_window(request):
+    """
+    Reads `start_time`/`end_time` from the query string.
+    Returns (start_time, end_time, error_response).
+    """
+    start_time_str = request.GET.get('start_time')
+    end_time_str = request.GET.get('end_time')
+    if not start_time_str or not end_time_str:
+        return None, None, JsonResponse({'error': 'start_time and end_time are required'}, status=400)
+
+    start_time = parse_datetime(start_time_str)
+    end_time = parse_datetime(end_time_str)
+    if not start_time or not end_time:
+        return None, None, JsonResponse({'error': 'Invalid datetime format'}, status=400)
+    if start_time >= end_time:
+        return None, None, JsonResponse({'error': 'start_time must be before end_time'}, status=400)
+    return start_time, end_time, None
+
+
+def availability_view(request):
+    """
+    GET /api/availability/?hotel_ids=<uuid>,<uuid>&start_time=...&end_time=...
+    Availability of every car linked to the given hotels: one SQL statement for
+    the cars, plus one to load the booking timelines the availability index
+    does not hold yet.
+    """
+    start_time, end_time, error = parse_time_window(request)
+    if error:
+        return error
+
+    try:
+        hotel_ids = [uuid.UUID(value) for value in request.GET.get('hotel_ids', '').split(',') if value]
+    except ValueError:
+        return JsonResponse({'error': 'hotel_ids must be a comma-separated list of UUIDs'}, status=400)
+    if not hotel_ids:
+        return JsonResponse({'error': 'hotel_ids is required'}, status=400)
+
+    with count_queries() as counter:
+        availability = hotel_car_availability(hotel_ids, start_time, end_time)
+
+    results = []
+    for hotel_id, cars in availability.items():
+        results.append({
+            'hotel_id': str(hotel_id),
+            'cars': [dict(car_summary(car), available=is_available) for car, is_available in cars],
+        })
+
+    response = JsonResponse({
+        'start_time': start_time.isoformat(),
+        'end_time': end_time.isoformat(),
+        'results': results,
+    })
+    response['X-Query-Count'] = counter.count
+    return response
+
+
+MAX_FREE_SLOT_HORIZON_HOURS = 24 * 90
+MAX_FREE_SLOT_RESULTS = 50
+
+
+def free_slots_view(request):
+    """
+    GET /api/availability/free-slots/?hotel_id=<uuid>|car_id=<uuid>
+        &duration_hours=3&horizon_hours=168&limit=5[&from=<datetime>]
+    Next free windows long enough for a booking of `duration_hours`.
+    horizon_hours is capped at MAX_FREE_SLOT_HORIZON_HOURS; a `from` without
+    an offset is read in the current time zone.
+    """
+    car_id = request.GET.get('car_id')
+    hotel_id = request.GET.get('hotel_id')
+    if not car_id and not hotel_id:
+        return JsonResponse({'error': 'car_id or hotel_id is required'}, status=400)
+
+    try:
+        duration_hours = float(request.GET['duration_hours'])
+        horizon_hours = float(request.GET.get('horizon_hours', 24 * 7))
+        limit = min(int(request.GET.get('limit', 5)), MAX_FREE_SLOT_RESULTS)
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'duration_hours is required; duration_hours, horizon_hours and limit must be numbers'}, status=400)
+    # The negated comparisons also reject nan
+    if not duration_hours > 0 or not horizon_hours > 0 or limit <= 0:
+        return JsonResponse({'error': 'duration_hours, horizon_hours and limit must be positive'}, status=400)
+    if duration_hours > MAX_FREE_SLOT_HORIZON_HOURS:
+        return JsonResponse({'error': f'duration_hours must be at most {MAX_FREE_SLOT_HORIZON_HOURS}'}, status=400)
+    duration = timedelta(hours=duration_hours)
+    horizon_hours = min(horizon_hours, MAX_FREE_SLOT_HORIZON_HOURS)
+
+    horizon_start = timezone.now()
+    if request.GET.get('from'):
+        horizon_start = parse_datetime(request.GET['from'])
+        if not horizon_start:
+            return JsonResponse({'error': 'Invalid datetime format'}, status=400)
+        if timezone.is_naive(horizon_start):
+            horizon_start = timezone.make_aware(horizon_start)
+    try:
+        horizon_end = horizon_start + timedelta(hours=horizon_hours)
+    except OverflowError:
+        return JsonResponse({'error': 'from is too far in the future'}, status=400)
+
+    try:
+        if car_id:
+            cars = {car.id: car for car in Car.objects.filter(id=uuid.UUID(car_id))}
+        else:
+            links = CarHotelLink.objects.select_related('car').filter(hotel_id=uuid.UUID(hotel_id))
+            cars = {link.car_id: link.car for link in links}
+    except ValueError:
+        return JsonResponse({'error': 'car_id and hotel_id must be UUIDs'}, status=400)
+
+    slots = find_free_slots(list(cars), duration, horizon_start, horizon_end, limit=limit)
+
+    return JsonResponse({
+        'duration_hours': duration.total_seconds() / 3600,
+        'horizon_start': horizon_start.isoformat(),
+        'horizon_end': horizon_end.isoformat(),
+        'results': [
+            {
+                'car': car_summary(cars[slot['car_id']]),
+                'start': slot['start'].isoformat(),
+                'free_until': slot['end'].isoformat(),
+            }
+            for slot in slots
+        ],
+    })
+
+
+MAX_CALENDAR_DAYS = 366
+
+
+def calendar_view(request):
+    """
+    GET /api/availability/calendar/?hotel_id=<uuid>|car_id=<uuid>&from=YYYY-MM-DD&to=YYYY-MM-DD
+    Booked days per car for date pickers. Days not listed are fully free.
+    """
+    car_id = request.GET.get('car_id')
+    hotel_id = request.GET.get('hotel_id')
+    if not car_id and not hotel_id:
+        return JsonResponse({'error': 'car_id or hotel_id is required'}, status=400)
+
+    start_date = parse_date(request.GET.get('from', '')) if request.GET.get('from') else timezone.localdate()
+    end_date = parse_date(request.GET.get('to', '')) if request.GET.get('to') else start_date + timedelta(days=90)
+    if not start_date or not end_date:
+        return JsonResponse({'error': 'from and to must be dates in YYYY-MM-DD format'}, status=400)
+    if start_date > end_date or (end_date - start_date).days >= MAX_CALENDAR_DAYS:
+        return JsonResponse({'error': f'from must be before to, at most {MAX_CALENDAR_DAYS} days apart'}, status=400)
+
+    days = CarDayAvailability.objects.filter(date__gte=start_date, date__lte=end_date)
+    try:
+        if car_id:
+            days = days.filter(car_id=uuid.UUID(car_id))
+        else:
+            days = days.filter(car__hotel_link__hotel_id=uuid.UUID(hotel_id))
+    except ValueError:
+        return JsonResponse({'error': 'car_id and hotel_id must be UUIDs'}, status=400)
+
+    calendar = {}
+    for day in days.order_by('car_id', 'date'):
+        calendar.setdefault(str(day.car_id), []).append({
+            'date': day.date.isoformat(),
+            'status': 'full' if day.is_fully_booked else 'partial',
+            'booked_minutes': day.booked_minutes,
+            'first_free': day.first_free.strftime('%H:%M') if day.first_free else None,
+            'last_free': day.last_free.strftime('%H:%M') if day.last_free else None,
+        })
+
+    return JsonResponse({
+        'from': start_date.isoformat(),
+        'to': end_date.isoformat(),
+        'cars': calendar,
+    })
+
+
+MAX_NEAREST_CARS = 50
+
+
+def nearest_cars_view(request):
+    """
+    GET /api/availability/nearest-cars/?lat=..&lon=..&start_time=..&end_time=..&k=5[&max_radius=<km>]
+    The k closest cars free for the whole window, with their hotel, distance and price.
+    max_radius defaults to NEAREST_CARS_DEFAULT_RADIUS_KM and may not exceed HOTEL_MAX_RADIUS_KM.
+    """
+    start_time, end_time, error = parse_time_window(request)
+    if error:
+        return error
+
+    try:
+        lat = float(request.GET['lat'])
+        lon = float(request.GET['lon'])
+        k = min(int(request.GET.get('k', 5)), MAX_NEAREST_CARS)
+        max_radius = float(request.GET.get('max_radius') or settings.NEAREST_CARS_DEFAULT_RADIUS_KM)
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'lat and lon are required; lat, lon, k and max_radius must be numbers'}, status=400)
+    if k <= 0:
+        return JsonResponse({'error': 'k must be positive'}, status=400)
+    if not 0 < max_radius <= settings.HOTEL_MAX_RADIUS_KM:
+        return JsonResponse(
+            {'error': f'max_radius must be greater than 0 and at most {settings.HOTEL_MAX_RADIUS_KM:g} km'}, status=400
+        )
+
+    with count_queries() as counter:
+        found = nearest_available_cars(lat, lon, start_time, end_time, k=k, max_radius_km=max_radius)
+
+    response = JsonResponse({
+        'start_time': start_time.isoformat(),
+        'end_time': end_time.isoformat(),
+        'results': [
+            {
+                'car': car_summary(item['car']),
+                'hotel': {
+                    'id': str(item['hotel'].id),
+                    'name': item['hotel'].name,
+                    'location': item['hotel'].location,
+                    'latitude': float(item['hotel'].latitude),
+                    'longitude': float(item['hotel'].longitude),
+                },
+                'distance_km': round(item['distance_km'], 2),
+                'price': item['price'],
+            }
+            for item in found
+        ],
+    })
+    response['X-Query-Count'] = counter.count
+    return response
@@ -1,20 +1,32 @@
 import uuid
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.core.exceptions import ValidationError
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from api.hotel.models import Hotel
 from api.guest.models import Guest  # Ensure correct import path
 
 from datetime import timedelta
 
 from api.garage.models import Car
+from api.availability.index import availability_index
+from api.availability.calendar import refresh_for_intervals
+from api.mixins import DirtyFieldsMixin
 
-class Booking(models.Model):
+# Name of the database guard (PostgreSQL exclusion constraint / SQLite triggers)
+# that rejects overlapping bookings, see migration 0004.
+BOOKING_OVERLAP_CONSTRAINT = 'booking_no_overlap'
+
+class Booking(DirtyFieldsMixin, models.Model):
     STATUS_ACTIVE = 'active'
     STATUS_CANCELLED = 'cancelled'
     STATUS_PENDING_CONFLICT = 'pending_conflict'
     STATUS_COMPLETED = 'completed'  # New status
 
 
+    # Statuses that occupy the vehicle for overlap checks
+    BLOCKING_STATUSES = [STATUS_ACTIVE, STATUS_COMPLETED]
+
     STATUS_CHOICES = [
         (STATUS_ACTIVE, 'Active'),
         (STATUS_CANCELLED, 'Cancelled'),
@@ -39,6 +51,14 @@ class Booking(models.Model):
     )
   # Store buffer time in minutes
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['vehicle', 'status', 'start_time', 'end_time'],
+                name='booking_vehicle_status_time',
+            ),
+        ]
+
     def __str__(self):
         return (
             f"Booking for {self.guest.first_name} {self.guest.last_name} - "
@@ -56,52 +76,77 @@ class Booking(models.Model):
             raise ValidationError("End time must be after start time.")
 
         # Calculate effective end time (with buffer)
-        effective_end = self.end_time
-        if not self.pk:  # New booking
-            if self.buffer_time:
-                effective_end = self.end_time + timedelta(minutes=self.buffer_time)
-        else:  # Existing booking
-            try:
-                original = Booking.objects.get(pk=self.pk)
-                if original.buffer_time != self.buffer_time:
-                    original_duration = original.end_time - original.start_time - timedelta(minutes=original.buffer_time)
-                    effective_end = self.start_time + original_duration + timedelta(minutes=self.buffer_time)
-            except Booking.DoesNotExist:
-                if self.buffer_time:
-                    effective_end = self.end_time + timedelta(minutes=self.buffer_time)
-
-        # Check overlaps
+        effective_end = self._buffered_end_time()
+
+        # Check overlaps against the database: the availability index is per
+        # process and may miss bookings written elsewhere, so it only serves reads
         overlapping_bookings = Booking.objects.filter(
-            vehicle=self.vehicle,
+            vehicle_id=self.vehicle_id,
+            status__in=self.BLOCKING_STATUSES,
             end_time__gt=self.start_time,
-            start_time__lt=self.end_time
-        ).exclude(id=self.id).exclude(status__in=[self.STATUS_CANCELLED, self.STATUS_PENDING_CONFLICT])
+            start_time__lt=effective_end,
+        ).exclude(id=self.id)
 
         if overlapping_bookings.exists():
             raise ValidationError("This vehicle is already booked for the selected time.")
 
 
-    def save(self, *args, **kwargs):
-        # For new bookings (creation)
-        if not self.pk:
+    def _buffered_end_time(self):
+        """
+        End time including the buffer, as save() will store it.
+        New bookings get the buffer appended; when the buffer of an existing
+        booking changes, the end time is rebuilt from the original duration.
+        """
+        if self._state.adding:
             if self.buffer_time:
-                self.end_time = self.end_time + timedelta(minutes=self.buffer_time)
-        else:
-            try:
-                # For existing bookings (update)
-                original = Booking.objects.get(pk=self.pk)
-                if original.buffer_time != self.buffer_time:
-                    # Calculate the original duration without buffer
-                    original_duration = original.end_time - original.start_time - timedelta(minutes=original.buffer_time)
-                    # Set new end time based on original duration + new buffer
-                    self.end_time = self.start_time + original_duration + timedelta(minutes=self.buffer_time)
-            except Booking.DoesNotExist:
-                # If original booking was deleted, treat as new booking
-                if self.buffer_time:
-                    self.end_time = self.end_time + timedelta(minutes=self.buffer_time)
-        
-        # Always call clean() for validation
-        self.clean()
-        
-        super().save(*args, **kwargs)
-    
+                return self.end_time + timedelta(minutes=self.buffer_time)
+            return self.end_time
+
+        if self.has_changed('buffer_time'):
+            # Calculate the original duration without buffer
+            original_duration = (
+                self.original('end_time') - self.original('start_time')
+                - timedelta(minutes=self.original('buffer_time'))
+            )
+            # New end time is the original duration + new buffer
+            return self.start_time + original_duration + timedelta(minutes=self.buffer_time)
+        return self.end_time
+
+    def save(self, *args, **kwargs):
+        self.end_time = self._buffered_end_time()
+
+        if self.status in self.BLOCKING_STATUSES and self.start_time >= self.end_time:
+            raise ValidationError("End time must be after start time.")
+
+        # Overlaps are rejected by the database guard, so the write is a single
+        # INSERT/UPDATE. The savepoint keeps an outer transaction usable.
+        try:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+        except IntegrityError as e:
+            if BOOKING_OVERLAP_CONSTRAINT in str(e):
+                raise ValidationError("This vehicle is already booked for the selected time.") from e
+            raise
+
+
+@receiver(post_save, sender=Booking)
+def sync_availability_index_on_save(sender, instance, **kwargs):
+    values = (instance.pk, instance.vehicle_id, instance.start_time, instance.end_time, instance.status)
+    transaction.on_commit(lambda: availability_index.update(*values))
+
+
+@receiver(post_save, sender=Booking)
+def sync_day_calendar_on_save(sender, instance, created, **kwargs):
+    # Refresh the days the booking covers now and, for updates, the days it covered before
+    intervals = [(instance.vehicle_id, instance.start_time, instance.end_time)]
+    if not created:
+        intervals.append((instance.original('vehicle'), instance.original('start_time'), instance.original('end_time')))
+    transaction.on_commit(lambda: refresh_for_intervals(intervals))
+
+
+@receiver(post_delete, sender=Booking)
+def sync_availability_index_on_delete(sender, instance, **kwargs):
+    booking_id = instance.pk
+    intervals = [(instance.vehicle_id, instance.start_time, instance.end_time)]
+    transaction.on_commit(lambda: availability_index.remove(booking_id))
+    transaction.on_commit(lambda: refresh_for_intervals(intervals))
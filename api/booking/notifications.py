@@ -0,0 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, transaction
+
+from api.booking.email_service import Email
+
+
+# Small pool so SMTP round trips never run on the request thread
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='booking-notifications')
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception as e:
+        print(f"Background notification failed: {e}")
+    finally:
+        close_old_connections()
+
+
+def send_after_commit(func, *args, **kwargs):
+    """
+    Runs `func(*args, **kwargs)` on the notification pool once the current
+    transaction commits (immediately when not in a transaction).
+    Nothing is sent if the transaction rolls back.
+    """
+    transaction.on_commit(lambda: _executor.submit(_run, func, args, kwargs))
+
+
+def notify_pending_conflicts(conflicting_bookings, extending_booking, new_end_time):
+    """Emails each guest whose booking became pending_conflict, plus admin and hotel."""
+    email_service = Email()
+    for conflicting_booking in conflicting_bookings:
+        email_service.send_pending_conflict_email(conflicting_booking, extending_booking, new_end_time)
+        email_service.notify_admin_of_pending_conflict(conflicting_booking, extending_booking, new_end_time)
@@ -0,0 +1,39 @@
+from api.lazy import LazyModule
+
+
+np = LazyModule('numpy')
+
+HOURS_PER_DAY = 24
+
+
+def quote_price(price_per_hour, max_price_per_day, start_time, end_time):
+    """
+    Price of renting a car from start_time to end_time.
+
+    The period is split into 24-hour blocks from start_time; every block costs
+    its hours x price_per_hour, capped at max_price_per_day. All full blocks
+    cost the same, so this is full_days x min(24 x rate, cap) plus the capped
+    remainder.
+    """
+    hours = (end_time - start_time).total_seconds() / 3600
+    if hours <= 0:
+        return 0.0
+
+    full_days, remainder = divmod(hours, HOURS_PER_DAY)
+    day_price = min(HOURS_PER_DAY * price_per_hour, max_price_per_day)
+    return full_days * day_price + min(remainder * price_per_hour, max_price_per_day)
+
+
+def quote_prices(prices_per_hour, max_prices_per_day, hours):
+    """
+    Vectorized quote_price(): element-wise prices for arrays of hourly rates,
+    daily caps and rental durations in hours.
+    """
+    prices_per_hour = np.asarray(prices_per_hour, dtype=np.float64)
+    max_prices_per_day = np.asarray(max_prices_per_day, dtype=np.float64)
+    hours = np.maximum(np.asarray(hours, dtype=np.float64), 0.0)
+
+    full_days = np.floor(hours / HOURS_PER_DAY)
+    remainder = hours - full_days * HOURS_PER_DAY
+    day_price = np.minimum(HOURS_PER_DAY * prices_per_hour, max_prices_per_day)
+    return full_days * day_price + np.minimum(remainder * prices_per_hour, max_prices_per_day)
@@ -0,0 +1,94 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from api.cache import BoundedCache
+
+
+class PriceQuoteCache:
+    """
+    Caches car price quotes keyed on (car id, price version, duration).
+
+    A car's price depends only on the rental duration, so the time window is
+    normalized to its length in whole seconds. The price version of a car is
+    bumped whenever its price_per_hour or max_price_per_day change, which
+    orphans every quote cached under the old version.
+
+    Quotes live in a bounded in-process LRU. When PRICE_QUOTE_CACHE_BACKEND
+    names an entry of CACHES (e.g. a Redis cache shared by all workers),
+    quotes and versions are also stored there, so a price change made in one
+    process is seen by all of them. Without it, the LRU TTL bounds how long
+    another process can serve a stale quote.
+    """
+
+    def __init__(self):
+        self._local = None
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.shared_hits = 0
+
+    @property
+    def local(self):
+        if self._local is None:
+            self._local = BoundedCache(
+                max_size=getattr(settings, 'PRICE_QUOTE_CACHE_SIZE', 2048),
+                ttl=getattr(settings, 'PRICE_QUOTE_CACHE_TTL', 300),
+            )
+        return self._local
+
+    @property
+    def shared(self):
+        alias = getattr(settings, 'PRICE_QUOTE_CACHE_BACKEND', '')
+        return caches[alias] if alias else None
+
+    def _version_key(self, car_id):
+        return f'price_quote:version:{car_id}'
+
+    def version(self, car_id):
+        if self.shared is not None:
+            return self.shared.get(self._version_key(car_id), 0)
+        return self._versions.get(car_id, 0)
+
+    def bump_version(self, car_id):
+        if self.shared is not None:
+            key = self._version_key(car_id)
+            if not self.shared.add(key, 1, timeout=None):
+                self.shared.incr(key)
+        with self._lock:
+            self._versions[car_id] = self._versions.get(car_id, 0) + 1
+
+    def get_or_compute(self, car_id, duration_seconds, compute):
+        """
+        Cached price for renting `car_id` for `duration_seconds`.
+        `compute()` is called on a miss; a None result is not cached.
+        """
+        key = f'price_quote:{car_id}:{self.version(car_id)}:{int(round(duration_seconds))}'
+
+        price = self.local.get(key)
+        if price is not None:
+            return price
+
+        shared = self.shared
+        if shared is not None:
+            price = shared.get(key)
+            if price is not None:
+                self.shared_hits += 1
+                self.local.set(key, price)
+                return price
+
+        price = compute()
+        if price is not None:
+            self.local.set(key, price)
+            if shared is not None:
+                shared.set(key, price, timeout=getattr(settings, 'PRICE_QUOTE_CACHE_TTL', 300))
+        return price
+
+    def stats(self):
+        stats = self.local.stats()
+        stats['shared_backend'] = getattr(settings, 'PRICE_QUOTE_CACHE_BACKEND', '') or None
+        stats['shared_hits'] = self.shared_hits
+        return stats
+
+
+price_quote_cache = PriceQuoteCache()
@@ -153,4 +153,8 @@ class PriceCalculationSerializer(serializers.Serializer):
         # Ensure end time is after start time
         if data['start_time'] >= data['end_time']:
             raise serializers.ValidationError("End time must be after start time.")
-        return data
\ No newline at end of file
+        return data
+
+
+class BatchPriceCalculationSerializer(serializers.Serializer):
+    quotes = PriceCalculationSerializer(many=True, allow_empty=False, max_length=500)
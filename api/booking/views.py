@@ -1,10 +1,10 @@
 from datetime import timedelta
-from requests import Response
 from rest_framework import viewsets
 from api.booking.models import Booking
-from api.booking.serializers import BookingSerializer, CancelBookingSerializer, PriceCalculationSerializer
+from api.booking.serializers import BookingSerializer, CancelBookingSerializer, PriceCalculationSerializer, BatchPriceCalculationSerializer
 from rest_framework.views import APIView
 from rest_framework import status
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response 
 from rest_framework import viewsets
 from api.booking.models import Booking
@@ -13,8 +13,9 @@ from rest_framework.views import APIView
 from rest_framework import status
 from api.bookingConflict.models import BookingConflict
 from decimal import Decimal
+from django.core.exceptions import ValidationError
 from django.utils import timezone
-import stripe
+from payments.stripe_client import stripe
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -25,6 +26,11 @@ from api.booking.serializers import CancelBookingSerializer  # Assuming you have
 
 
 from api.booking.email_service import Email
+from api.booking.notifications import notify_pending_conflicts, send_after_commit
+from api.booking.pricing import quote_price, quote_prices
+from api.booking.quote_cache import price_quote_cache
+from api.availability.index import availability_index
+from api.availability.calendar import refresh_for_intervals
 from api.garage.models import Car
 from middleware_platform import settings
 from payments.models import Payment
@@ -70,23 +76,17 @@ class ExtendBookingView(APIView):
         - Send plain text cancellation emails to affected bookings
         """
         try:
-            booking = Booking.objects.get(id=booking_id)
+            booking = Booking.objects.select_related('guest', 'vehicle').get(id=booking_id)
             serializer = ExtendBookingSerializer(booking, data=request.data, partial=True)
 
             if not serializer.is_valid():
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-            email_service = Email()  # Instantiate the Email class
-
             # --------------------
             # HANDLE END TIME CHANGE
             # --------------------
             if 'new_end_time' in serializer.validated_data:
                 raw_new_end_time = serializer.validated_data['new_end_time']
-                actual_end_time = booking.end_time - timedelta(minutes=booking.buffer_time)
-
-                # Validate new end time is after current end time
-               
 
                 # Calculate buffered new end time for storage
                 buffered_new_end_time = raw_new_end_time + timedelta(minutes=booking.buffer_time)
@@ -109,51 +109,60 @@ class ExtendBookingView(APIView):
 
                 booking.start_time = raw_new_start_time
 
-            # --------------------
-            # FIND CONFLICTING BOOKINGS
-            # --------------------
-            conflicting_bookings = Booking.objects.filter(
-                vehicle_id=booking.vehicle_id,
-                end_time__gt=booking.start_time,
-                start_time__lt=buffered_new_end_time
-            ).exclude(id=booking.id)
-
-            canceled_details = []
-            if conflicting_bookings.exists():
-                for conflicting_booking in conflicting_bookings:
-                    if conflicting_booking.status == Booking.STATUS_CANCELLED:
-                        continue
-
-                    canceled_details.append({
-                        'id': str(conflicting_booking.id),
-                        'guest_email': conflicting_booking.guest.email,
-                        'start_time': conflicting_booking.start_time,
-                        'end_time': conflicting_booking.end_time
-                    })
-
-                    # Send plain text notification
-                    email_service.send_pending_conflict_email(conflicting_booking, booking, buffered_new_end_time)
-
-                    # Mark as pending_conflict
-                    conflicting_booking.status = Booking.STATUS_PENDING_CONFLICT
-                    conflicting_booking.save()
-
-                    # Log conflict
-                    BookingConflict.objects.create(
-                        original_booking=booking,
-                        conflicting_booking=conflicting_booking,
-                        status=BookingConflict.STATUS_PENDING
-                    )
-
-                    # Notify admin
-                    email_service.notify_admin_of_pending_conflict(conflicting_booking, booking, buffered_new_end_time)
+            with transaction.atomic():
+                # --------------------
+                # FIND CONFLICTING BOOKINGS
+                # --------------------
+                # Queried from the database, not the per-process availability
+                # index, which can lag behind bookings written by other processes
+                conflicting_bookings = list(
+                    Booking.objects.select_related('guest', 'vehicle', 'hotel').filter(
+                        vehicle_id=booking.vehicle_id,
+                        status__in=[Booking.STATUS_ACTIVE, Booking.STATUS_PENDING_CONFLICT, Booking.STATUS_COMPLETED],
+                        end_time__gt=booking.start_time,
+                        start_time__lt=buffered_new_end_time,
+                    ).exclude(id=booking.id)
+                )
 
-            # --------------------
-            # UPDATE ORIGINAL BOOKING
-            # --------------------
-            if 'new_end_time' in serializer.validated_data:
-                booking.end_time = buffered_new_end_time
-            booking.save()
+                canceled_details = [{
+                    'id': str(conflicting_booking.id),
+                    'guest_email': conflicting_booking.guest.email,
+                    'start_time': conflicting_booking.start_time,
+                    'end_time': conflicting_booking.end_time
+                } for conflicting_booking in conflicting_bookings]
+
+                if conflicting_bookings:
+                    # Mark all as pending_conflict and log the conflicts in bulk
+                    Booking.objects.filter(id__in=[b.id for b in conflicting_bookings]).update(
+                        status=Booking.STATUS_PENDING_CONFLICT
+                    )
+                    for conflicting_booking in conflicting_bookings:
+                        conflicting_booking.status = Booking.STATUS_PENDING_CONFLICT
+                    BookingConflict.objects.bulk_create([
+                        BookingConflict(
+                            original_booking=booking,
+                            conflicting_booking=conflicting_booking,
+                            status=BookingConflict.STATUS_PENDING
+                        )
+                        for conflicting_booking in conflicting_bookings
+                    ])
+                    # .update() skips the Booking signals, so reload this car's timeline
+                    # and recompute the calendar days the conflicting bookings freed
+                    vehicle_id = booking.vehicle_id
+                    freed = [(b.vehicle_id, b.start_time, b.end_time) for b in conflicting_bookings]
+                    transaction.on_commit(lambda: availability_index.invalidate([vehicle_id]))
+                    transaction.on_commit(lambda: refresh_for_intervals(freed))
+
+                # --------------------
+                # UPDATE ORIGINAL BOOKING
+                # --------------------
+                if 'new_end_time' in serializer.validated_data:
+                    booking.end_time = buffered_new_end_time
+                booking.save()
+
+                if conflicting_bookings:
+                    # Guest, admin and hotel emails go out after commit, off the request thread
+                    send_after_commit(notify_pending_conflicts, conflicting_bookings, booking, buffered_new_end_time)
 
             if canceled_details:
                 return Response({
@@ -169,6 +178,12 @@ class ExtendBookingView(APIView):
                 {"detail": "Booking not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
+        except ValidationError as e:
+            # The overlap guard rejected the write (e.g. a booking committed meanwhile)
+            return Response(
+                {"detail": " ".join(e.messages)},
+                status=status.HTTP_409_CONFLICT
+            )
 
 
             
@@ -186,11 +201,6 @@ class PriceCalculationView(APIView):
             original_end_time = serializer.validated_data.get('original_end_time')
             original_start_time = serializer.validated_data.get('original_start_time')
 
-            try:
-                car = Car.objects.get(id=vehicle_id)
-            except Car.DoesNotExist:
-                return Response({"error": "Car not found."}, status=status.HTTP_404_NOT_FOUND)
-
             # Determine calculation start
             if original_start_time and original_end_time:
                 if new_start_time == original_start_time and new_end_time > original_end_time:
@@ -205,17 +215,17 @@ class PriceCalculationView(APIView):
                 calculation_start = new_start_time
                 is_extension = False
 
-            total_price = 0.0
-            current_time = calculation_start
+            def compute_price():
+                car_prices = Car.objects.filter(id=vehicle_id).values_list('price_per_hour', 'max_price_per_day').first()
+                if car_prices is None:
+                    return None
+                return quote_price(*car_prices, calculation_start, new_end_time)
 
-            while current_time < new_end_time:
-                block_end_time = min(current_time + timedelta(hours=24), new_end_time)
-                hours_in_block = (block_end_time - current_time).total_seconds() / 3600
-
-                block_price = hours_in_block * car.price_per_hour
-                block_price = min(block_price, car.max_price_per_day)
-                total_price += block_price
-                current_time = block_end_time
+            total_price = price_quote_cache.get_or_compute(
+                vehicle_id, (new_end_time - calculation_start).total_seconds(), compute_price
+            )
+            if total_price is None:
+                return Response({"error": "Car not found."}, status=status.HTTP_404_NOT_FOUND)
 
             duration = (new_end_time - calculation_start).total_seconds() / 3600
 
@@ -228,6 +238,57 @@ class PriceCalculationView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class BatchPriceCalculationView(APIView):
+    """
+    POST {"quotes": [{"vehicle": <uuid>, "start_time": ..., "end_time": ...}, ...]}
+    Prices every quote with one Car query and one vectorized pass.
+    """
+    def post(self, request, *args, **kwargs):
+        serializer = BatchPriceCalculationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        quotes = serializer.validated_data['quotes']
+        car_prices = {
+            car_id: (price_per_hour, max_price_per_day)
+            for car_id, price_per_hour, max_price_per_day in Car.objects.filter(
+                id__in={quote['vehicle'] for quote in quotes}
+            ).values_list('id', 'price_per_hour', 'max_price_per_day')
+        }
+
+        known = [quote for quote in quotes if quote['vehicle'] in car_prices]
+        hours = [(quote['end_time'] - quote['start_time']).total_seconds() / 3600 for quote in known]
+        prices = quote_prices(
+            [car_prices[quote['vehicle']][0] for quote in known],
+            [car_prices[quote['vehicle']][1] for quote in known],
+            hours,
+        )
+
+        results = [
+            {
+                'vehicle': str(quote['vehicle']),
+                'start_time': quote['start_time'],
+                'end_time': quote['end_time'],
+                'total_price': round(float(price), 2),
+                'duration_hours': round(duration, 2),
+            }
+            for quote, price, duration in zip(known, prices, hours)
+        ]
+        errors = [
+            {'vehicle': str(quote['vehicle']), 'error': 'Car not found.'}
+            for quote in quotes if quote['vehicle'] not in car_prices
+        ]
+        return Response({'results': results, 'errors': errors}, status=status.HTTP_200_OK)
+
+
+class PriceQuoteCacheStatsView(APIView):
+    """Hit/miss counters of the price quote cache, for monitoring."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(price_quote_cache.stats(), status=status.HTTP_200_OK)
+
+
 from pytz import timezone as pytz_timezone
 
 # class CancelBookingAPIView(APIView):
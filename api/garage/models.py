@@ -3,13 +3,16 @@ from django.db import models
 import uuid
 
 from django.dispatch import receiver
-from django.db.models.signals import post_delete
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.forms import ValidationError
 from api.rental_company.models import RentalCompany
 from api.hotel.models import Hotel  # ✅ Import Hotel model
+from api.mixins import DirtyFieldsMixin
+from api.booking.quote_cache import price_quote_cache
 
 
-class Car(models.Model):
+class Car(DirtyFieldsMixin, models.Model):
     """
     Represents a rental car without QR code functionality.
     """
@@ -112,14 +115,12 @@ class Car(models.Model):
             os.remove(self.photo.path)
         super().delete(*args, **kwargs)
     def save(self, *args, **kwargs):
-        try:
-            # Check if updating existing photo
-            this = Car.objects.get(id=self.id)
-            if this.photo and this.photo != self.photo:
-                if os.path.isfile(this.photo.path):
-                    os.remove(this.photo.path)
-        except Car.DoesNotExist:
-            pass  # It's a new object, no file to remove
+        # Remove the previous photo file when it is being replaced
+        old_photo = self.original('photo')  # None for new objects
+        if old_photo and self.has_changed('photo'):
+            old_path = self.photo.storage.path(old_photo)
+            if os.path.isfile(old_path):
+                os.remove(old_path)
 
         super().save(*args, **kwargs)
         
@@ -144,4 +145,14 @@ def delete_car_photo_on_delete(sender, instance, **kwargs):
             os.remove(instance.photo.path)
         except Exception as e:
             # Optionally log the error
-            print(f"Error deleting file: {e}")
\ No newline at end of file
+            print(f"Error deleting file: {e}")
+
+
+@receiver(post_save, sender=Car)
+def bump_price_version_on_price_change(sender, instance, created, **kwargs):
+    """
+    Invalidates cached price quotes of a car whose pricing changed.
+    """
+    if not created and (instance.has_changed('price_per_hour') or instance.has_changed('max_price_per_day')):
+        car_id = instance.id
+        transaction.on_commit(lambda: price_quote_cache.bump_version(car_id))
@@ -0,0 +1,127 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from api.guest.models import OCRJob
+from api.guest.ocr import OCRWorkerUnavailable
+from api.guest.ocr_cache import ocr_result_cache
+from api.guest.utils import is_driver_license_easyocr
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Pool running OCR jobs in this process, OCR_MAX_CONCURRENT_JOBS at a time.
+    The cap is per process: each web worker has its own pool.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'OCR_MAX_CONCURRENT_JOBS', 2),
+                    thread_name_prefix='ocr-jobs',
+                )
+    return _executor
+
+
+def _run(job_id):
+    try:
+        job = process_job(job_id)
+        if job is not None and job.status == OCRJob.STATUS_PENDING:
+            retry_later(job)
+    except Exception as e:
+        print(f"OCR job {job_id} failed: {e}")
+    finally:
+        close_old_connections()
+
+
+def retry_delay(attempts):
+    """Seconds before retrying a job after `attempts` tries: OCR_JOB_RETRY_DELAY, doubled every attempt."""
+    return getattr(settings, 'OCR_JOB_RETRY_DELAY', 5) * 2 ** max(attempts - 1, 0)
+
+
+def retry_later(job):
+    """Resubmits a job the OCR worker pool did not answer to this process's pool after a backoff."""
+    timer = threading.Timer(retry_delay(job.attempts), lambda: get_executor().submit(_run, job.id))
+    timer.daemon = True
+    timer.start()
+
+
+def enqueue_job(job):
+    """
+    Queues `job` once the current transaction commits. Pending jobs are picked up
+    by this process's pool when OCR_JOBS_IN_WEB_PROCESS is on, and by
+    `manage.py process_ocr_jobs` in any case.
+    """
+    if getattr(settings, 'OCR_JOBS_IN_WEB_PROCESS', True):
+        transaction.on_commit(lambda job_id=job.id: get_executor().submit(_run, job_id))
+
+
+def claim_job(job_id):
+    """Marks a pending job as processing; False if another worker got it first."""
+    return OCRJob.objects.filter(id=job_id, status=OCRJob.STATUS_PENDING).update(
+        status=OCRJob.STATUS_PROCESSING, started_at=timezone.now(), attempts=F('attempts') + 1
+    ) == 1
+
+
+def process_job(job_id):
+    """
+    Runs the OCR check of a pending job and returns the job, or None if another
+    worker claimed it. A job the OCR worker pool does not answer goes back to
+    pending, until OCR_JOB_MAX_ATTEMPTS tries have been made; it then fails
+    as retryable, so the client knows to upload again.
+    """
+    if not claim_job(job_id):
+        return None
+    job = OCRJob.objects.get(id=job_id)
+
+    try:
+        with default_storage.open(job.path, 'rb') as f:
+            is_valid, expiry_date, is_expired = is_driver_license_easyocr(BytesIO(f.read()))
+    except OCRWorkerUnavailable as e:
+        # Not the image's fault; leave it for the next attempt
+        if job.attempts < getattr(settings, 'OCR_JOB_MAX_ATTEMPTS', 4):
+            job.status = OCRJob.STATUS_PENDING
+            job.error = str(e)
+            job.save(update_fields=['status', 'error'])
+            return job
+        job.status = OCRJob.STATUS_FAILED
+        job.retryable = True
+        job.error = f"OCR unavailable after {job.attempts} attempts, please upload again: {e}"
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'retryable', 'error', 'finished_at'])
+        return job
+    except Exception as e:
+        job.status = OCRJob.STATUS_FAILED
+        job.error = f"{type(e).__name__}: {e}"
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        return job
+
+    if is_valid:
+        job.status = OCRJob.STATUS_VALID
+        job.expiry_date = expiry_date
+        job.is_expired = is_expired
+        ocr_result_cache.set(job.digest, {
+            'is_valid': True, 'path': job.path, 'expiry_date': expiry_date, 'is_expired': is_expired,
+        })
+    else:
+        # Rejected images are not kept, as with the synchronous upload
+        default_storage.delete(job.path)
+        job.status = OCRJob.STATUS_INVALID
+        job.path = ''
+        ocr_result_cache.set(job.digest, {'is_valid': False})
+    job.error = ''
+    job.finished_at = timezone.now()
+    job.save()
+    return job
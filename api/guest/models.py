@@ -44,3 +44,39 @@ def delete_driver_license_file(sender, instance, **kwargs):
                 print(f"Deleted license image: {file_path}")
             except Exception as e:
                 print(f"Error deleting license image: {e}")
+
+
+class OCRJob(models.Model):
+    """
+    A driver license upload waiting for, or done with, its OCR check.
+    The stored image is processed in the background; clients poll the status.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_VALID = 'valid'
+    STATUS_INVALID = 'invalid'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_VALID, 'Valid'),
+        (STATUS_INVALID, 'Invalid'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    path = models.CharField(max_length=255, blank=True, help_text="Stored temp image, emptied once rejected")
+    digest = models.CharField(max_length=64, help_text="sha256 of the uploaded bytes")
+    expiry_date = models.CharField(max_length=20, blank=True, null=True)
+    is_expired = models.BooleanField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0, help_text="Times a worker has claimed the job")
+    retryable = models.BooleanField(default=False, help_text="Failed because OCR was unavailable, not because of the image")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"OCR job {self.id} ({self.status})"
@@ -0,0 +1,137 @@
+import socket
+import struct
+from io import BytesIO
+from multiprocessing.connection import Connection, answer_challenge, deliver_challenge
+
+from django.conf import settings
+from PIL import Image
+
+from api.guest.ocr_backends import get_backend
+from api.guest.preprocessing import preprocess_image, preprocessing_options
+
+
+class OCRWorkerUnavailable(Exception):
+    """The OCR worker pool could not be reached or did not answer in time."""
+
+
+# OCR passes, cheapest first: the full pass only runs when the fast one is not conclusive
+FAST = 'fast'
+FULL = 'full'
+TIERS = (FAST, FULL)
+
+
+def ocr_languages(tier=FULL):
+    """Languages recognized by a pass: OCR_FAST_LANGUAGES for the fast one, OCR_LANGUAGES otherwise."""
+    full = getattr(settings, 'OCR_LANGUAGES', ['en', 'de', 'fr', 'it'])
+    if tier == FAST:
+        return getattr(settings, 'OCR_FAST_LANGUAGES', None) or full
+    return full
+
+
+def tier_preprocessing(tier):
+    """Preprocessing overrides of a pass; the fast one reads a smaller image (OCR_FAST_MAX_IMAGE_SIDE)."""
+    if tier == FAST:
+        return {'max_side': getattr(settings, 'OCR_FAST_MAX_IMAGE_SIDE', 1024)}
+    return {}
+
+
+def read_texts(images, tier=FULL, backend=None, **preprocess):
+    """
+    Runs one OCR pass (FAST or FULL) in this process over a list of image
+    bytes and returns the recognized text of each image, joined by spaces.
+    Several images go through the model in one batched call. `backend` names
+    an OCR backend (default OCR_BACKEND, see ocr_backends). Images are
+    preprocessed first; keyword arguments override the pass's preprocessing
+    settings (see preprocessing_options()).
+    """
+    options = preprocessing_options(**{**tier_preprocessing(tier), **preprocess})
+    prepared = [preprocess_image(Image.open(BytesIO(image_bytes)), **options) for image_bytes in images]
+    results = get_backend(backend).read(prepared, ocr_languages(tier))
+    return [" ".join(result) for result in results]
+
+
+def read_text(image_bytes, tier=FULL, backend=None, **preprocess):
+    """Text of a single image, see read_texts()."""
+    return read_texts([image_bytes], tier, backend, **preprocess)[0]
+
+
+def load_readers(backend=None):
+    """
+    Loads the models of every pass that will run. Only OCR worker processes,
+    or the web process when no worker is configured, ever load them.
+    """
+    backend = get_backend(backend)
+    backend.load(ocr_languages(FULL))
+    if getattr(settings, 'OCR_TIERED', True):
+        backend.load(ocr_languages(FAST))
+
+
+def init_worker():
+    """Pool initializer: loads the models once per worker process, before the first image arrives."""
+    load_readers()
+
+
+def parse_worker_address(address):
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def socket_connection(sock, timeout):
+    """
+    multiprocessing Connection over a connected socket. Connections read and
+    write the raw descriptor, so the socket is left blocking and any single
+    read or write is bounded by `timeout` seconds at the OS level instead.
+    """
+    sock.settimeout(None)
+    interval = struct.pack('ll', int(timeout), int(timeout % 1 * 1_000_000))
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, interval)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDTIMEO, interval)
+    return Connection(sock.detach())
+
+
+def connect_to_worker(address, timeout):
+    """
+    Authenticated connection to the OCR worker pool. Unlike Client(), gives up
+    when connecting or the authkey handshake stalls for `timeout` seconds.
+    """
+    conn = socket_connection(socket.create_connection(parse_worker_address(address), timeout=timeout), timeout)
+    try:
+        authkey = settings.OCR_WORKER_AUTHKEY.encode()
+        answer_challenge(conn, authkey)
+        deliver_challenge(conn, authkey)
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+
+def ocr_texts(images, tier=FULL):
+    """
+    Text recognized in each of a list of images by one OCR pass, in a single
+    batched call. Sent to the OCR worker pool (`manage.py ocr_worker`) when
+    OCR_WORKER_ADDRESS is set, so web processes never load the model; runs
+    in-process otherwise. Raises OCRWorkerUnavailable if the pool cannot be
+    reached or does not answer within OCR_WORKER_TIMEOUT seconds.
+    """
+    address = getattr(settings, 'OCR_WORKER_ADDRESS', '')
+    if not address:
+        return read_texts(images, tier)
+
+    timeout = getattr(settings, 'OCR_WORKER_TIMEOUT', 30)
+    try:
+        with connect_to_worker(address, timeout) as conn:
+            conn.send({'images': list(images), 'tier': tier})
+            if not conn.poll(timeout):
+                raise OCRWorkerUnavailable(f"OCR worker did not answer within {timeout} seconds")
+            response = conn.recv()
+    except (OSError, EOFError) as e:
+        raise OCRWorkerUnavailable(f"OCR worker unreachable at {address}: {e}")
+
+    if 'error' in response:
+        raise RuntimeError(response['error'])
+    return response['texts']
+
+
+def ocr_text(image_bytes, tier=FULL):
+    """Text recognized in a single image, see ocr_texts()."""
+    return ocr_texts([image_bytes], tier)[0]
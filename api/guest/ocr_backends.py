@@ -0,0 +1,143 @@
+import threading
+
+from django.conf import settings
+from PIL import Image
+
+from api.lazy import LazyModule
+
+
+np = LazyModule('numpy')
+
+
+class OCRBackend:
+    """
+    Turns preprocessed license images (PIL images) into text. Models are loaded
+    on first use and kept for the life of the process; `languages` is a hint
+    that backends with a single multilingual model may ignore.
+    """
+
+    name = None
+
+    def load(self, languages):
+        """Loads the models for `languages` ahead of the first read."""
+        raise NotImplementedError
+
+    def read(self, images, languages):
+        """Recognized text lines of each image, in one batched call where the backend supports it."""
+        raise NotImplementedError
+
+
+def pad_to_common_size(images):
+    """
+    The images pasted at the top left of white canvases of the largest width
+    and height among them, for backends whose batches need equal shapes.
+    Padding instead of resizing keeps the text undistorted.
+    """
+    width = max(image.width for image in images)
+    height = max(image.height for image in images)
+    padded = []
+    for image in images:
+        if image.size != (width, height):
+            canvas = Image.new(image.mode, (width, height), 'white')
+            canvas.paste(image, (0, 0))
+            image = canvas
+        padded.append(image)
+    return padded
+
+
+class EasyOCRBackend(OCRBackend):
+    """
+    EasyOCR, one public `easyocr.Reader` per language list (OCR_LANGUAGES,
+    OCR_FAST_LANGUAGES). Each reader loads its own detector, which costs
+    memory but stays on the documented API.
+    """
+
+    name = 'easyocr'
+
+    def __init__(self):
+        self._readers = {}
+        self._lock = threading.Lock()
+
+    def get_reader(self, languages):
+        languages = tuple(languages)
+        reader = self._readers.get(languages)
+        if reader is None:
+            with self._lock:
+                reader = self._readers.get(languages)
+                if reader is None:
+                    import easyocr
+
+                    reader = self._readers[languages] = easyocr.Reader(list(languages), gpu=False)
+        return reader
+
+    def load(self, languages):
+        self.get_reader(languages)
+
+    def read(self, images, languages):
+        reader = self.get_reader(languages)
+        if len(images) == 1:
+            return [reader.readtext(np.array(images[0]), detail=0)]
+        return reader.readtext_batched([np.array(image) for image in pad_to_common_size(images)], detail=0)
+
+
+class PaddleOCRBackend(OCRBackend):
+    """
+    PaddleOCR through the PaddleX OCR pipeline. A single recognition model
+    (OCR_PADDLE_TEXT_RECOGNITION_MODEL, by default the Latin-script one) covers
+    every license language, so `languages` is ignored. Document orientation,
+    unwarping and text line orientation are turned off: uploads are already
+    upright after preprocessing and those models only add latency.
+    """
+
+    name = 'paddleocr'
+
+    def __init__(self):
+        self._pipeline = None
+        self._lock = threading.Lock()
+
+    def get_pipeline(self):
+        if self._pipeline is None:
+            with self._lock:
+                if self._pipeline is None:
+                    from paddlex import create_pipeline
+                    from paddlex.inference.pipelines import load_pipeline_config
+
+                    config = load_pipeline_config('OCR')
+                    config['use_doc_preprocessor'] = False
+                    config['use_textline_orientation'] = False
+                    model = getattr(settings, 'OCR_PADDLE_TEXT_RECOGNITION_MODEL', '')
+                    if model:
+                        config['SubModules']['TextRecognition'].update(model_name=model, model_dir=None)
+                    self._pipeline = create_pipeline(config=config, device='cpu')
+        return self._pipeline
+
+    def load(self, languages):
+        self.get_pipeline()
+
+    def read(self, images, languages):
+        # The pipeline takes BGR arrays of any size and batches them itself
+        arrays = [np.array(image.convert('RGB'))[:, :, ::-1] for image in images]
+        results = self.get_pipeline().predict(
+            arrays, use_doc_orientation_classify=False, use_doc_unwarping=False, use_textline_orientation=False,
+        )
+        return [list(result['rec_texts']) for result in results]
+
+
+BACKENDS = {backend.name: backend for backend in (EasyOCRBackend, PaddleOCRBackend)}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name=None):
+    """The process-wide instance of OCR backend `name`, by default the one selected by OCR_BACKEND."""
+    name = name or getattr(settings, 'OCR_BACKEND', 'easyocr')
+    backend = _backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                if name not in BACKENDS:
+                    raise ValueError(f"Unknown OCR_BACKEND: {name!r} (choose from {', '.join(BACKENDS)})")
+                backend = _backends[name] = BACKENDS[name]()
+    return backend
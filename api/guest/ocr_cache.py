@@ -0,0 +1,66 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+from api.cache import BoundedCache
+
+
+class OCRResultCache:
+    """
+    Driver license check results keyed by the sha256 of the uploaded bytes, so
+    a re-uploaded photo skips OCR and reuses the temp file already stored.
+
+    Entries are dicts: {'is_valid'} for rejected images, plus 'path',
+    'expiry_date' and 'is_expired' for accepted ones, and 'paths' when
+    several images were uploaded together. They live in a bounded
+    in-process LRU (OCR_RESULT_CACHE_SIZE, OCR_RESULT_CACHE_TTL seconds) and,
+    when OCR_RESULT_CACHE_BACKEND names an entry of CACHES, also in that
+    shared cache so a retry served by another web worker hits too.
+    """
+
+    def __init__(self):
+        self._local = None
+
+    @property
+    def local(self):
+        if self._local is None:
+            self._local = BoundedCache(
+                max_size=getattr(settings, 'OCR_RESULT_CACHE_SIZE', 512),
+                ttl=getattr(settings, 'OCR_RESULT_CACHE_TTL', 3600),
+            )
+        return self._local
+
+    @property
+    def shared(self):
+        alias = getattr(settings, 'OCR_RESULT_CACHE_BACKEND', '')
+        return caches[alias] if alias else None
+
+    @staticmethod
+    def digest(*images):
+        """sha256 of an upload; for several images, of their digests in upload order."""
+        digests = [hashlib.sha256(image_bytes).hexdigest() for image_bytes in images]
+        if len(digests) == 1:
+            return digests[0]
+        return hashlib.sha256(','.join(digests).encode()).hexdigest()
+
+    def _key(self, digest):
+        return f'ocr_result:{digest}'
+
+    def get(self, digest):
+        key = self._key(digest)
+        result = self.local.get(key)
+        if result is None and self.shared is not None:
+            result = self.shared.get(key)
+            if result is not None:
+                self.local.set(key, result)
+        return result
+
+    def set(self, digest, result):
+        key = self._key(digest)
+        self.local.set(key, result)
+        if self.shared is not None:
+            self.shared.set(key, result, timeout=getattr(settings, 'OCR_RESULT_CACHE_TTL', 3600))
+
+
+ocr_result_cache = OCRResultCache()
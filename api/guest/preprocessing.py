@@ -0,0 +1,29 @@
+from django.conf import settings
+from PIL import Image, ImageOps
+
+
+def preprocessing_options(**overrides):
+    """Preprocessing settings (OCR_MAX_IMAGE_SIDE, OCR_GRAYSCALE, OCR_AUTOCONTRAST) with per-call overrides."""
+    options = {
+        'max_side': getattr(settings, 'OCR_MAX_IMAGE_SIDE', 1600),
+        'grayscale': getattr(settings, 'OCR_GRAYSCALE', True),
+        'autocontrast': getattr(settings, 'OCR_AUTOCONTRAST', True),
+    }
+    options.update(overrides)
+    return options
+
+
+def preprocess_image(image, max_side=None, grayscale=True, autocontrast=True):
+    """
+    Prepares a license photo for OCR: applies the EXIF orientation, downscales
+    so the longest side is at most `max_side` pixels (None keeps the size),
+    converts to grayscale and stretches the contrast, ignoring the darkest and
+    brightest 1% of pixels so glare and shadows don't flatten the text.
+    """
+    image = ImageOps.exif_transpose(image)
+    if max_side and max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    image = image.convert('L' if grayscale else 'RGB')
+    if autocontrast:
+        image = ImageOps.autocontrast(image, cutoff=1)
+    return image
@@ -1,21 +1,18 @@
+import logging
 import re
-from typing import Optional, Tuple
-import easyocr
-from PIL import Image
-import numpy as np
+from typing import List, Optional, Tuple
 from datetime import datetime
 
+from django.conf import settings
+
+from api.guest.ocr import FAST, FULL, ocr_texts
+
+
+logger = logging.getLogger(__name__)
 
 
 
-# Lazy-load the EasyOCR reader (reuse it for performance)
-_reader = None
 
-def get_reader():
-    global _reader
-    if _reader is None:
-        _reader = easyocr.Reader(['en', 'de', 'fr', 'it'], gpu=False)
-    return _reader
 def extract_expiry_date(text: str) -> Optional[str]:
     # First try to find Italian license format with 4a and 4b markers
     italian_pattern = r"4a\.\s*(\d{2}/\d{2}/\d{4}).*?4b\.\s*(\d{2}/\d{2}/\d{4})"
@@ -78,12 +75,28 @@ def is_driver_license_expired(expiry_date: str) -> Tuple[bool, Optional[datetime
 
 
 
-def is_driver_license_easyocr(image_stream) -> Tuple[bool, Optional[str], Optional[bool]]:
-    image = Image.open(image_stream)
-    image_np = np.array(image)
-    results = get_reader().readtext(image_np, detail=0)
-    text = " ".join(results)
-    print("EasyOCR text:", text)
+def recognize_license_text(images: List[bytes], read=None) -> str:
+    """
+    OCR text of the images of one license (e.g. front and back), merged into
+    one string, cheapest pass first. The fast pass is enough when it already
+    finds the license keywords and an expiry date; otherwise the full
+    multi-language pass runs and its text is used instead. Each pass reads
+    all images in one batched call: `read(images, tier)` returns their texts
+    (default: ocr_texts).
+    """
+    read = read or ocr_texts
+    if getattr(settings, 'OCR_TIERED', True):
+        text = " ".join(read(images, FAST))
+        if validate_driver_license(text) and extract_expiry_date(text):
+            return text
+    return " ".join(read(images, FULL))
+
+
+def is_driver_license_easyocr(*image_streams) -> Tuple[bool, Optional[str], Optional[bool]]:
+    # Several streams are the sides of one license; runs in the OCR worker pool when one is configured
+    text = recognize_license_text([image_stream.read() for image_stream in image_streams])
+    # Only the size: the recognized text holds the guest's personal data
+    logger.debug("OCR read %d characters from %d images", len(text), len(image_streams))
     
     # First validate it's a driver's license
     if not validate_driver_license(text):
@@ -94,7 +107,7 @@ def is_driver_license_easyocr(image_stream) -> Tuple[bool, Optional[str], Option
     is_expired = None
     
     if expiry_date:
-        print(f"Expiry Date Found: {expiry_date}")
+        logger.debug("Expiry date found")
         is_expired, _ = is_driver_license_expired(expiry_date)
         if is_expired:
             print("License has expired.")
@@ -2,12 +2,16 @@ from io import BytesIO
 import uuid
 from django.http import JsonResponse
 from rest_framework import viewsets
-from api.guest.models import Guest
+from api.guest.models import Guest, OCRJob
 from api.guest.serializers import GuestSerializer
 from django.views.decorators.csrf import csrf_exempt
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
+from django.conf import settings
 
+from api.guest.jobs import enqueue_job
+from api.guest.ocr import OCRWorkerUnavailable
+from api.guest.ocr_cache import ocr_result_cache
 from api.guest.utils import is_driver_license_easyocr
 
 
@@ -18,48 +22,94 @@ class GuestViewSet(viewsets.ModelViewSet):
     serializer_class = GuestSerializer
 
 
+def license_check_response(result):
+    if not result['is_valid']:
+        return JsonResponse({
+            'is_valid': False,
+            'error': 'The uploaded image does not appear to be a valid driver\'s license. Please ensure the entire license is visible and try again.'
+        }, status=200)
+
+    expiry_date = result['expiry_date']
+    return JsonResponse({
+        'is_valid': True,
+        'Temp_path': default_storage.url(result['path']),
+        'Temp_paths': [default_storage.url(path) for path in result.get('paths', [result['path']])],
+        'expiry_date': expiry_date if expiry_date else 'Expiry date not found',
+        'is_expired': result['is_expired'] if expiry_date else None
+    })
+
+
+def stored_result_usable(result):
+    """A cached check can be replayed unless the temp files it points to were cleaned up since."""
+    if not result['is_valid']:
+        return True
+    return all(default_storage.exists(path) for path in result.get('paths', [result['path']]))
+
+
 @csrf_exempt
 def upload_driver_license_temp(request):
+    """
+    POST with one or more files in `temp_driver_license`, e.g. the front and
+    the back of the same license (at most OCR_MAX_LICENSE_IMAGES). All images
+    are read in one batched OCR call and checked as one license; Temp_path is
+    the first image, Temp_paths lists them all.
+    """
     if request.method == 'POST' and request.FILES.get('temp_driver_license'):
-        image = request.FILES['temp_driver_license']
+        images = request.FILES.getlist('temp_driver_license')
+        max_images = getattr(settings, 'OCR_MAX_LICENSE_IMAGES', 4)
+        if len(images) > max_images:
+            return JsonResponse({
+                'is_valid': False,
+                'error': f'Too many images. Upload at most {max_images} per license.'
+            }, status=400)
 
-        # Validate file extension
-        ext = image.name.split('.')[-1].lower()
-        if ext not in ['jpg', 'jpeg', 'png']:
+        # Validate file extensions
+        extensions = [image.name.split('.')[-1].lower() for image in images]
+        if any(ext not in ['jpg', 'jpeg', 'png'] for ext in extensions):
             return JsonResponse({
                 'is_valid': False,
                 'error': 'Invalid file type. Only JPG, JPEG, and PNG are allowed.'
             }, status=200)
 
         try:
-            # Read the image into memory once
-            image_bytes = image.read()
-            image_stream = BytesIO(image_bytes)
+            # Read the images into memory once
+            images_bytes = [image.read() for image in images]
+
+            # Identical re-uploads reuse the earlier result and temp files
+            digest = ocr_result_cache.digest(*images_bytes)
+            cached = ocr_result_cache.get(digest)
+            if cached is not None and stored_result_usable(cached):
+                return license_check_response(cached)
+
+            # OCR check and expiry date extraction over the merged text of all images
+            is_valid, expiry_date, is_expired = is_driver_license_easyocr(
+                *(BytesIO(image_bytes) for image_bytes in images_bytes)
+            )
 
-            # OCR check and expiry date extraction
-            is_valid, expiry_date, is_expired = is_driver_license_easyocr(image_stream)
-            
             if not is_valid:
-                return JsonResponse({
-                    'is_valid': False,
-                    'error': 'The uploaded image does not appear to be a valid driver\'s license. Please ensure the entire license is visible and try again.'
-                }, status=200)
-
-            # Reset stream for saving
-            image_stream.seek(0)
-            filename = f"temp_driver_licenses/{uuid.uuid4()}.{ext}"
-            path = default_storage.save(filename, ContentFile(image_stream.read()))
-            temp_url = default_storage.url(path)
-
-            response_data = {
-                'is_valid': True,
-                'Temp_path': temp_url,
-                'expiry_date': expiry_date if expiry_date else 'Expiry date not found',
-                'is_expired': is_expired if expiry_date else None
-            }
-
-            return JsonResponse(response_data)
+                result = {'is_valid': False}
+            else:
+                paths = [
+                    default_storage.save(f"temp_driver_licenses/{uuid.uuid4()}.{ext}", ContentFile(image_bytes))
+                    for image_bytes, ext in zip(images_bytes, extensions)
+                ]
+                result = {
+                    'is_valid': True,
+                    'path': paths[0],
+                    'expiry_date': expiry_date,
+                    'is_expired': is_expired,
+                }
+                if len(paths) > 1:
+                    result['paths'] = paths
+
+            ocr_result_cache.set(digest, result)
+            return license_check_response(result)
 
+        except OCRWorkerUnavailable as e:
+            return JsonResponse({
+                'is_valid': False,
+                'error': f'License check is temporarily unavailable, please try again. ({e})'
+            }, status=503)
         except Exception as e:
             return JsonResponse({
                 'is_valid': False,
@@ -69,4 +119,74 @@ def upload_driver_license_temp(request):
     return JsonResponse({
         'is_valid': False,
         'error': 'No image provided'
-    }, status=400)
\ No newline at end of file
+    }, status=400)
+
+
+def ocr_job_status(job):
+    data = {
+        'job_id': str(job.id),
+        # Jobs being processed are still pending for the client
+        'status': OCRJob.STATUS_PENDING if job.status == OCRJob.STATUS_PROCESSING else job.status,
+    }
+    if job.status == OCRJob.STATUS_VALID:
+        data.update({
+            'is_valid': True,
+            'Temp_path': default_storage.url(job.path),
+            'expiry_date': job.expiry_date if job.expiry_date else 'Expiry date not found',
+            'is_expired': job.is_expired if job.expiry_date else None,
+        })
+    elif job.status == OCRJob.STATUS_INVALID:
+        data.update({
+            'is_valid': False,
+            'error': 'The uploaded image does not appear to be a valid driver\'s license. Please ensure the entire license is visible and try again.',
+        })
+    elif job.status == OCRJob.STATUS_FAILED:
+        data.update({'is_valid': False, 'error': f'Processing error: {job.error}', 'retryable': job.retryable})
+    return data
+
+
+@csrf_exempt
+def upload_driver_license_job(request):
+    """
+    POST /api/driver-license-jobs/ with file `temp_driver_license`.
+    Stores the image and answers 202 with a job id right away; the OCR check
+    runs in the background. Poll /api/driver-license-jobs/<job_id>/ for the result.
+    """
+    if request.method != 'POST' or not request.FILES.get('temp_driver_license'):
+        return JsonResponse({'is_valid': False, 'error': 'No image provided'}, status=400)
+
+    image = request.FILES['temp_driver_license']
+    ext = image.name.split('.')[-1].lower()
+    if ext not in ['jpg', 'jpeg', 'png']:
+        return JsonResponse({
+            'is_valid': False,
+            'error': 'Invalid file type. Only JPG, JPEG, and PNG are allowed.'
+        }, status=200)
+
+    image_bytes = image.read()
+    digest = ocr_result_cache.digest(image_bytes)
+    cached = ocr_result_cache.get(digest)
+    if cached is not None and stored_result_usable(cached):
+        # Same bytes as an earlier upload: the job is done before it starts
+        job = OCRJob.objects.create(
+            digest=digest,
+            status=OCRJob.STATUS_VALID if cached['is_valid'] else OCRJob.STATUS_INVALID,
+            path=cached.get('path', ''),
+            expiry_date=cached.get('expiry_date'),
+            is_expired=cached.get('is_expired'),
+        )
+        return JsonResponse(ocr_job_status(job), status=200)
+
+    path = default_storage.save(f"temp_driver_licenses/{uuid.uuid4()}.{ext}", ContentFile(image_bytes))
+    job = OCRJob.objects.create(digest=digest, path=path)
+    enqueue_job(job)
+    return JsonResponse(ocr_job_status(job), status=202)
+
+
+def driver_license_job_status(request, job_id):
+    """GET /api/driver-license-jobs/<job_id>/: pending, valid (with expiry), invalid or failed."""
+    try:
+        job = OCRJob.objects.get(id=job_id)
+    except OCRJob.DoesNotExist:
+        return JsonResponse({'error': 'Job not found'}, status=404)
+    return JsonResponse(ocr_job_status(job))
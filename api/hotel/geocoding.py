@@ -0,0 +1,110 @@
+import re
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+
+
+Location = namedtuple('Location', ['latitude', 'longitude'])
+
+_COORDINATES = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*[,;]\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+def normalize_address(address):
+    """Cache key for an address: lowercased, whitespace collapsed, stray separators trimmed."""
+    address = re.sub(r'\s+', ' ', (address or '').lower())
+    address = re.sub(r'\s*,\s*', ', ', address)
+    return address.strip(' ,')
+
+
+class LocalGeocoder:
+    """
+    Offline stand-in for Nominatim, for tests and development.
+    Resolves addresses listed in GEOCODER_LOCAL_COORDINATES
+    ({address: (latitude, longitude)}) and literal "lat, lon" strings.
+    """
+
+    def __init__(self, coordinates=None):
+        if coordinates is None:
+            coordinates = getattr(settings, 'GEOCODER_LOCAL_COORDINATES', {})
+        self.coordinates = {normalize_address(address): point for address, point in coordinates.items()}
+
+    def geocode(self, query, **kwargs):
+        point = self.coordinates.get(normalize_address(query))
+        if point is None:
+            match = _COORDINATES.match(query or '')
+            point = (float(match.group(1)), float(match.group(2))) if match else None
+        return Location(*point) if point else None
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder():
+    """The process-wide geocoder client selected by GEOCODER_BACKEND ('nominatim' or 'local')."""
+    global _geocoder
+    if _geocoder is None:
+        with _geocoder_lock:
+            if _geocoder is None:
+                backend = getattr(settings, 'GEOCODER_BACKEND', 'nominatim')
+                if backend == 'local':
+                    _geocoder = LocalGeocoder()
+                elif backend == 'nominatim':
+                    from geopy.geocoders import Nominatim
+
+                    _geocoder = Nominatim(
+                        user_agent=getattr(settings, 'GEOCODER_USER_AGENT', 'hotel_booking'),
+                        timeout=getattr(settings, 'GEOCODER_TIMEOUT', 5),
+                    )
+                else:
+                    raise ValueError(f"Unknown GEOCODER_BACKEND: {backend!r}")
+    return _geocoder
+
+
+def reset_geocoder():
+    """Drops the shared client so the next call re-reads the settings."""
+    global _geocoder
+    _geocoder = None
+
+
+def cached_geocode(address):
+    """
+    Coordinates of `address` from the GeocodeCache table, without touching the network.
+    Returns (found, location): found is False when the address was never looked up,
+    location is None when it was looked up and could not be resolved.
+    """
+    from api.hotel.models import GeocodeCache
+
+    entry = GeocodeCache.objects.filter(address=normalize_address(address)).first()
+    if entry is None:
+        return False, None
+    if entry.latitude is None or entry.longitude is None:
+        return True, None
+    return True, Location(entry.latitude, entry.longitude)
+
+
+def geocode(address, lookup=None):
+    """
+    Read-through geocoding: answers from the GeocodeCache table and only calls
+    the geocoder (or `lookup`, e.g. a rate-limited wrapper around it) on a miss.
+    Unresolvable addresses are cached as well so they are not retried on
+    every call. Returns a Location or None.
+    """
+    from api.hotel.models import GeocodeCache
+
+    found, location = cached_geocode(address)
+    if found:
+        return location
+
+    lookup = lookup or get_geocoder().geocode
+    result = lookup(address)
+    location = Location(result.latitude, result.longitude) if result else None
+    GeocodeCache.objects.update_or_create(
+        address=normalize_address(address),
+        defaults={
+            'latitude': location.latitude if location else None,
+            'longitude': location.longitude if location else None,
+        },
+    )
+    return location
@@ -0,0 +1,77 @@
+import math
+
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 12  # ~4 cm cells, the precision stored on Hotel.geohash
+MAX_COVERING_CELLS = 32  # The whole world is 32 cells at precision 1
+
+
+def encode(lat, lon, precision=PRECISION):
+    """Geohash of (lat, lon) with `precision` characters."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True  # Bits alternate between longitude (even) and latitude
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a cell with `precision` characters."""
+    lat_bits = 5 * precision // 2
+    lon_bits = 5 * precision - lat_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def _cell_ranges(min_lat, max_lat, min_lon, max_lon, precision):
+    height, width = cell_size(precision)
+    rows = round(180 / height)
+    columns = round(360 / width)
+    first_row = max(math.floor((min_lat + 90) / height), 0)
+    last_row = min(math.floor((max_lat + 90) / height), rows - 1)
+    first_column = math.floor((min_lon + 180) / width)
+    last_column = math.floor((max_lon + 180) / width)
+    if last_column - first_column + 1 >= columns:
+        column_range = range(columns)
+    else:
+        # Columns wrap around the antimeridian
+        column_range = [column % columns for column in range(first_column, last_column + 1)]
+    return range(first_row, last_row + 1), column_range, height, width
+
+
+def covering_cells(lat, lon, radius_km, max_cells=MAX_COVERING_CELLS):
+    """
+    Geohash prefixes whose cells together cover the circle of `radius_km`
+    around (lat, lon), at the finest precision needing at most `max_cells`.
+    """
+    lat_span = radius_km / 111.32
+    lon_span = radius_km / (111.32 * max(math.cos(math.radians(min(abs(lat) + lat_span, 89.9))), 1e-6))
+    bounds = (lat - lat_span, lat + lat_span, lon - min(lon_span, 180), lon + min(lon_span, 180))
+
+    chosen = None
+    for precision in range(1, PRECISION + 1):
+        row_range, column_range, height, width = _cell_ranges(*bounds, precision)
+        if len(row_range) * len(column_range) > max_cells:
+            break
+        chosen = (precision, row_range, column_range, height, width)
+
+    precision, row_range, column_range, height, width = chosen
+    return sorted({
+        encode((row + 0.5) * height - 90, (column + 0.5) * width - 180, precision)
+        for row in row_range
+        for column in column_range
+    })
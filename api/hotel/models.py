@@ -1,79 +1,60 @@
 from io import BytesIO
 from django.db import models
 import uuid
-from geopy.geocoders import Nominatim
-from geopy.geocoders import Nominatim
 from django.core.exceptions import ValidationError
 import re
 from django.core.files.base import ContentFile
-from numpy import atan2, cos, radians, sin, sqrt
-import qrcode
+from api.lazy import LazyModule
 from api.rental_company.models import RentalCompany  # Adjust if needed
-from django.db.models.signals import pre_delete
+from api.mixins import DirtyFieldsMixin
+from api.hotel.geocoding import cached_geocode, geocode
+from api.hotel.geohash import PRECISION as GEOHASH_PRECISION, encode as encode_geohash
+from api.hotel.spatial import get_spatial_index, hotel_spatial_index
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 import os
 from django.conf import settings
 
+qrcode = LazyModule('qrcode')
+
+
+def geohash_of(latitude, longitude):
+    if latitude is None or longitude is None:
+        return ''
+    return encode_geohash(float(latitude), float(longitude))
+
+
 class HotelManager(models.Manager):
     
-    def nearby_hotels(self, lat, lon, radius_km=10, max_results=20):
+    def nearby_hotels(self, lat, lon, radius_km=10, max_results=20, after=None):
         """
         Find hotels within a given radius (in kilometers) of a point.
         Returns a list of dictionaries with hotel info and distance.
-        
+        Served from the in-process spatial index without a query, or from the
+        database when HOTEL_SPATIAL_STRATEGY is 'database'.
+
         Args:
             lat (float): Latitude of the center point
             lon (float): Longitude of the center point
             radius_km (float): Search radius in kilometers (default 10)
-            max_results (int): Maximum number of results to return (default 20)
+            max_results (int): Maximum number of results to return (default 20, None for all)
+            after (tuple): (distance_km, hotel_id) of the last hotel of the previous page
         """
-        # Convert latitude and longitude from degrees to radians
-        lat_rad = radians(float(lat))
-        lon_rad = radians(float(lon))
-        
-        # Earth's radius in km
-        R = 6371.0
-        
-        # First, filter hotels within a rough bounding box for performance
-        # Calculate approximate degree distances (1 degree ≈ 111 km)
-        degree_buffer = radius_km / 111
-        min_lat = float(lat) - degree_buffer
-        max_lat = float(lat) + degree_buffer
-        min_lon = float(lon) - degree_buffer
-        max_lon = float(lon) + degree_buffer
-        
-        # Get all hotels in the bounding box
-        hotels_in_box = self.get_queryset().filter(
-            latitude__gte=min_lat,
-            latitude__lte=max_lat,
-            longitude__gte=min_lon,
-            longitude__lte=max_lon
-        )
-        
-        nearby_hotels = []
-        for hotel in hotels_in_box:
-            # Convert hotel coordinates to radians
-            hotel_lat = radians(float(hotel.latitude))
-            hotel_lon = radians(float(hotel.longitude))
-            
-            # Haversine formula
-            dlon = hotel_lon - lon_rad
-            dlat = hotel_lat - lat_rad
-            a = sin(dlat / 2)**2 + cos(lat_rad) * cos(hotel_lat) * sin(dlon / 2)**2
-            c = 2 * atan2(sqrt(a), sqrt(1 - a))
-            distance = R * c
-            
-            if distance <= radius_km:
-                nearby_hotels.append({
-                    'hotel': hotel,
-                    'distance_km': distance
-                })
-        
-        # Sort by distance and limit results
-        nearby_hotels.sort(key=lambda x: x['distance_km'])
-        return nearby_hotels[:max_results]
-
-class Hotel(models.Model):
+        nearby = get_spatial_index().within(lat, lon, radius_km, max_results, after)
+        return [{'hotel': hotel, 'distance_km': distance} for distance, hotel in nearby]
+
+    def nearest_hotels(self, lat, lon, k=5, max_radius_km=None):
+        """
+        The k hotels closest to a point, optionally within max_radius_km.
+        Same result format as nearby_hotels().
+        """
+        return [
+            {'hotel': hotel, 'distance_km': distance}
+            for distance, hotel in get_spatial_index().nearest(lat, lon, k, max_radius_km)
+        ]
+
+class Hotel(DirtyFieldsMixin, models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=100)
     location = models.CharField(max_length=255)
@@ -92,28 +73,35 @@ class Hotel(models.Model):
     qr_code = models.ImageField(upload_to='hotel_qr_codes/', blank=True, null=True)
     latitude = models.DecimalField(max_digits=19, decimal_places=10, null=True, blank=True)
     longitude = models.DecimalField(max_digits=19, decimal_places=10, null=True, blank=True)
+    geohash = models.CharField(
+        max_length=GEOHASH_PRECISION,
+        blank=True,
+        default='',
+        db_index=True,
+        editable=False,
+        help_text="Geohash of latitude/longitude, kept in sync on save for prefix lookups"
+    )
     
     # Add the custom manager
     objects = HotelManager()
-    def geocode_address(self):
+    def geocode_address(self, use_network=True):
         """
-        Uses the OpenStreetMap Nominatim API to get latitude and longitude from the address.
+        Sets latitude and longitude from the address, answering from the GeocodeCache
+        table first and only calling the geocoder (OpenStreetMap Nominatim) on a miss.
+        With use_network=False only the cache is consulted and False is returned on a miss.
         """
-        geolocator = Nominatim(user_agent="hotel_booking")
-        location = geolocator.geocode(self.location)
-
-        if location:
-            self.latitude = location.latitude
-            self.longitude = location.longitude
+        if use_network:
+            location = geocode(self.location)
+            if not location:
+                raise ValidationError(f"Could not geocode the address: {self.location}")
         else:
-            raise ValidationError(f"Could not geocode the address: {self.location}")
-
-    def save(self, *args, **kwargs):
-        # Automatically set latitude and longitude if the location changes
-        if self.location and not self.latitude and not self.longitude:
-            self.geocode_address()
+            _, location = cached_geocode(self.location)
+            if not location:
+                return False
 
-        super().save(*args, **kwargs)
+        self.latitude = location.latitude
+        self.longitude = location.longitude
+        return True
 
     def generate_guest_booking_url(self):
         """
@@ -152,16 +140,20 @@ class Hotel(models.Model):
 
     def save(self, *args, **kwargs):
         is_new = self._state.adding  # True if this is a new object
-        old_name = None
-        if not is_new:
-            old_name = Hotel.objects.get(pk=self.pk).name
 
         if not self.guest_booking_url:
             self.guest_booking_url = self.generate_guest_booking_url()
 
-        if is_new or not self.qr_code or (old_name and old_name != self.name):
+        if is_new or not self.qr_code or self.has_changed('name'):
             self.generate_qr_code()
 
+        # Cache only, saves never wait on the geocoder; addresses that are not
+        # cached yet are resolved in bulk by `manage.py geocode_hotels`
+        if self.location and not self.latitude and not self.longitude:
+            self.geocode_address(use_network=False)
+
+        self.geohash = geohash_of(self.latitude, self.longitude)
+
         super().save(*args, **kwargs)
 
     # Signal to delete the QR code file when a hotel is deleted
@@ -176,3 +168,26 @@ class Hotel(models.Model):
 
     def __str__(self):
         return f"{self.name} ({self.location})  - {self.email}  {self.phone}"
+
+
+class GeocodeCache(models.Model):
+    """
+    Geocoding results keyed by normalized address, shared by every process.
+    Empty coordinates record an address the geocoder could not resolve.
+    """
+    address = models.CharField(max_length=255, unique=True)
+    latitude = models.DecimalField(max_digits=19, decimal_places=10, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=19, decimal_places=10, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        if self.latitude is None:
+            return f"{self.address} (unresolved)"
+        return f"{self.address} ({self.latitude}, {self.longitude})"
+
+
+@receiver(post_save, sender=Hotel)
+@receiver(post_delete, sender=Hotel)
+def mark_spatial_index_dirty(sender, **kwargs):
+    transaction.on_commit(hotel_spatial_index.mark_dirty)
@@ -0,0 +1,68 @@
+import math
+import re
+from datetime import timedelta
+
+from api.lazy import LazyModule
+
+
+np = LazyModule('numpy')
+
+SLOT_PATTERN = re.compile(r'^(\d+)\s*([mhd])$')
+SLOT_UNITS = {'m': 'minutes', 'h': 'hours', 'd': 'days'}
+
+# Upper bound on cars x slots to keep a single response bounded
+MAX_GRID_CELLS = 2_000_000
+
+
+def parse_slot(value):
+    """Parses a slot size such as '15m', '1h' or '1d' into a timedelta."""
+    match = SLOT_PATTERN.match((value or '').strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError("slot must look like '15m', '1h' or '1d'")
+    return timedelta(**{SLOT_UNITS[match.group(2)]: int(match.group(1))})
+
+
+def build_occupancy_grid(car_ids, bookings, start, end, slot):
+    """
+    Boolean matrix (cars x slots), True where a car is booked during a slot.
+
+    `bookings` is a sequence of (car_id, start_time, end_time). A slot counts
+    as booked if any booking touches part of it. Slot indices are computed for
+    all bookings at once and the rows are filled with a difference array and
+    a cumulative sum, so there is no per-slot Python loop.
+    """
+    slot_seconds = slot.total_seconds()
+    n_slots = math.ceil((end - start).total_seconds() / slot_seconds)
+    if len(car_ids) * n_slots > MAX_GRID_CELLS:
+        raise ValueError("Requested occupancy grid is too large; use a larger slot or a shorter range.")
+
+    row_of = {car_id: row for row, car_id in enumerate(car_ids)}
+    bookings = [booking for booking in bookings if booking[0] in row_of]
+
+    origin = start.timestamp()
+    rows = np.fromiter((row_of[car_id] for car_id, _, _ in bookings), dtype=np.intp, count=len(bookings))
+    starts = np.fromiter((b_start.timestamp() for _, b_start, _ in bookings), dtype=np.float64, count=len(bookings))
+    ends = np.fromiter((b_end.timestamp() for _, _, b_end in bookings), dtype=np.float64, count=len(bookings))
+
+    first_slot = np.clip(np.floor((starts - origin) / slot_seconds), 0, n_slots).astype(np.intp)
+    last_slot = np.clip(np.ceil((ends - origin) / slot_seconds), 0, n_slots).astype(np.intp)
+    keep = last_slot > first_slot
+
+    diff = np.zeros((len(car_ids), n_slots + 1), dtype=np.int32)
+    np.add.at(diff, (rows[keep], first_slot[keep]), 1)
+    np.add.at(diff, (rows[keep], last_slot[keep]), -1)
+    return np.cumsum(diff[:, :-1], axis=1) > 0
+
+
+def run_length_encode(grid):
+    """
+    Booked runs of every row as [[first_slot, length], ...], one list per row.
+    """
+    padded = np.pad(grid.astype(np.int8), ((0, 0), (1, 1)))
+    edges = np.diff(padded, axis=1)
+    run_rows, run_starts = np.nonzero(edges == 1)
+    _, run_ends = np.nonzero(edges == -1)
+    # np.nonzero walks row-major, so starts and ends pair up in order
+    runs = np.stack([run_starts, run_ends - run_starts], axis=1)
+    counts = np.bincount(run_rows, minlength=grid.shape[0])
+    return [chunk.tolist() for chunk in np.split(runs, np.cumsum(counts)[:-1])]
@@ -0,0 +1,354 @@
+import itertools
+import math
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Q
+
+from api.hotel import geohash
+from api.lazy import LazyModule
+
+
+np = LazyModule('numpy')
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+INITIAL_RADIUS_KM = 10
+
+
+def haversine_distances(lat, lon, lats, lons):
+    """Great-circle distances in km from (lat, lon) to every point of the `lats`/`lons` arrays (degrees)."""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def nearest_points(lat, lon, lats, lons, radius_km=None, k=None, keys=None, after=None):
+    """
+    Positions and distances of the points closest to (lat, lon), nearest first.
+    Points farther than `radius_km` are masked out and only the `k` closest
+    are sorted, selected with argpartition rather than a full sort.
+    Equal distances are ordered by `keys` when given; `after=(distance, key)`
+    then skips every point up to and including that one, for cursor paging.
+    """
+    distances = haversine_distances(lat, lon, lats, lons)
+    positions = np.arange(len(distances))
+    mask = None
+    if radius_km is not None:
+        mask = distances <= radius_km
+    if after is not None:
+        after_distance, after_key = after
+        later = (distances > after_distance) | ((distances == after_distance) & (keys > after_key))
+        mask = later if mask is None else mask & later
+    if mask is not None:
+        positions, distances = positions[mask], distances[mask]
+    if k is not None and k < len(distances):
+        kth = distances[np.argpartition(distances, k - 1)[k - 1]]
+        # Keep every tie with the k-th distance so the key order decides the cut
+        keep = distances <= kth
+        positions, distances = positions[keep], distances[keep]
+    if keys is not None:
+        order = np.lexsort((keys[positions], distances))
+    else:
+        order = np.argsort(distances, kind='stable')
+    return positions[order][:k], distances[order][:k]
+
+
+class _SpatialSearch:
+    """k-nearest and best-first search on top of a subclass's within() radius query."""
+
+    def within(self, lat, lon, radius_km, limit=None, after=None):
+        raise NotImplementedError
+
+    def size(self):
+        """Number of searchable hotels (with coordinates)."""
+        raise NotImplementedError
+
+    def nearest(self, lat, lon, k, max_radius_km=None):
+        """
+        The k hotels nearest to (lat, lon), optionally within max_radius_km.
+        Doubles the search radius from INITIAL_RADIUS_KM until k hotels are
+        found, or every hotel has been.
+        """
+        size = self.size()
+        if not size:
+            return []
+        limit = max_radius_km if max_radius_km is not None else math.pi * EARTH_RADIUS_KM
+        radius = min(INITIAL_RADIUS_KM, limit)
+        while True:
+            found = self.within(lat, lon, radius, k)
+            if len(found) >= min(k, size) or radius >= limit:
+                return found
+            radius = min(radius * 2, limit)
+
+    def iter_nearest(self, lat, lon, batch_size=16, max_radius_km=None):
+        """
+        Yields batches of (distance_km, hotel) in increasing distance, so callers
+        can stop as soon as they have what they need. Searches INITIAL_RADIUS_KM
+        first and doubles the radius whenever it is exhausted; everything inside a
+        radius is closer than anything outside it, so batches stay in global order.
+        """
+        size = self.size()
+        if not size:
+            return
+        limit = max_radius_km if max_radius_km is not None else math.pi * EARTH_RADIUS_KM
+        radius = min(INITIAL_RADIUS_KM, limit)
+        after = None
+        seen = 0
+        while True:
+            found = self.within(lat, lon, radius, batch_size, after)
+            if found:
+                yield found
+                after = (found[-1][0], found[-1][1].id)
+                seen += len(found)
+            if seen >= size:
+                return  # Every hotel has been yielded, a wider radius finds nothing new
+            if len(found) < batch_size:
+                if radius >= limit:
+                    return
+                radius = min(radius * 2, limit)
+
+
+# One immutable build of HotelSpatialIndex, published with a single assignment.
+# cells maps (row, col) to (first, last + 1) into hotels/lats/lons/keys (ids, to
+# break distance ties); generation is the mark_dirty() count the build started from
+# and shared_version the HOTEL_SPATIAL_INDEX_CACHE_BACKEND version it saw.
+_Grid = namedtuple('_Grid', ['cells', 'hotels', 'lats', 'lons', 'keys', 'generation', 'shared_version', 'built_at'])
+
+
+class HotelSpatialIndex(_SpatialSearch):
+    """
+    Process-level uniform grid over hotel coordinates.
+
+    Hotels are bucketed into CELL_DEGREES x CELL_DEGREES cells and stored
+    contiguously by cell, so a radius query only measures the hotels of the
+    cells overlapping the search circle, in one vectorized pass.
+    The grid is built from one query the first time it is used, marked dirty
+    by Hotel save/delete signals and rebuilt lazily on the next query. It is
+    also rebuilt after HOTEL_SPATIAL_INDEX_TTL seconds to pick up edits made
+    by other processes. When HOTEL_SPATIAL_INDEX_CACHE_BACKEND names an entry
+    of CACHES shared by all workers, mark_dirty() also bumps a version stored
+    there, and every process rebuilds on its next query instead.
+    A build is published as one immutable _Grid and every query reads the
+    grid once, so requests running during a rebuild see either the old or
+    the new grid, never a mix.
+    """
+
+    CELL_DEGREES = 0.1  # ~11 km of latitude
+    COLUMNS = round(360 / CELL_DEGREES)
+    VERSION_KEY = 'hotel_spatial_index:version'
+
+    def __init__(self):
+        self._grid = None
+        self._generations = itertools.count(1)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'HOTEL_SPATIAL_INDEX_TTL', 300)
+
+    @property
+    def shared(self):
+        alias = getattr(settings, 'HOTEL_SPATIAL_INDEX_CACHE_BACKEND', '')
+        return caches[alias] if alias else None
+
+    def shared_version(self):
+        shared = self.shared
+        return shared.get(self.VERSION_KEY, 0) if shared is not None else 0
+
+    def mark_dirty(self):
+        # Lock-free, so a save during a rebuild never waits for it; next() on a count is atomic
+        self._generation = next(self._generations)
+        shared = self.shared
+        if shared is not None and not shared.add(self.VERSION_KEY, 1, timeout=None):
+            shared.incr(self.VERSION_KEY)
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.CELL_DEGREES), self._wrap(math.floor(lon / self.CELL_DEGREES)))
+
+    def _wrap(self, col):
+        # Columns wrap around the antimeridian
+        half = self.COLUMNS // 2
+        return (col + half) % self.COLUMNS - half
+
+    def _columns(self, lon, lon_span):
+        first = math.floor((lon - lon_span) / self.CELL_DEGREES)
+        last = math.floor((lon + lon_span) / self.CELL_DEGREES)
+        if last - first + 1 >= self.COLUMNS:
+            return range(-(self.COLUMNS // 2), self.COLUMNS // 2)
+        return [self._wrap(col) for col in range(first, last + 1)]
+
+    def _is_current(self, grid, shared_version):
+        return (
+            grid is not None
+            and grid.generation == self._generation
+            and grid.shared_version == shared_version
+            and time.monotonic() - grid.built_at < self.ttl
+        )
+
+    def _current_grid(self):
+        """The grid to answer one query from, rebuilt first if it is dirty or expired."""
+        grid = self._grid
+        shared_version = self.shared_version()
+        if self._is_current(grid, shared_version):
+            return grid
+        from api.hotel.models import Hotel
+
+        with self._lock:
+            grid = self._grid
+            if self._is_current(grid, shared_version):
+                return grid
+            # Edits arriving during the rebuild bump the generation and trigger another one
+            generation = self._generation
+            entries = []
+            for hotel in Hotel.objects.filter(latitude__isnull=False, longitude__isnull=False):
+                lat, lon = float(hotel.latitude), float(hotel.longitude)
+                entries.append((self._cell(lat, lon), lat, lon, hotel))
+            entries.sort(key=lambda entry: entry[0])
+
+            cells = {}
+            for position, (cell, _, _, _) in enumerate(entries):
+                first, _ = cells.get(cell, (position, position))
+                cells[cell] = (first, position + 1)
+            grid = self._grid = _Grid(
+                cells=cells,
+                hotels=[entry[3] for entry in entries],
+                lats=np.array([entry[1] for entry in entries], dtype=float),
+                lons=np.array([entry[2] for entry in entries], dtype=float),
+                keys=np.array([str(entry[3].id) for entry in entries], dtype=str),
+                generation=generation,
+                shared_version=shared_version,
+                built_at=time.monotonic(),
+            )
+            return grid
+
+    def _candidates(self, grid, lat, lon, radius_km):
+        """Array positions of the hotels in every cell overlapping the search circle."""
+        lat_span = radius_km / KM_PER_DEGREE
+        lon_span = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(min(abs(lat) + lat_span, 89.9))), 1e-6))
+        min_row = math.floor((lat - lat_span) / self.CELL_DEGREES)
+        max_row = math.floor((lat + lat_span) / self.CELL_DEGREES)
+        columns = self._columns(lon, min(lon_span, 180))
+
+        if (max_row - min_row + 1) * len(columns) > len(grid.cells):
+            # Wide searches: fewer populated cells than cells in the window
+            columns = set(columns)
+            ranges = [
+                span for (row, col), span in grid.cells.items()
+                if min_row <= row <= max_row and col in columns
+            ]
+        else:
+            ranges = [
+                grid.cells[(row, col)]
+                for row in range(min_row, max_row + 1)
+                for col in columns
+                if (row, col) in grid.cells
+            ]
+        if not ranges:
+            return np.empty(0, dtype=int)
+        return np.concatenate([np.arange(first, last) for first, last in ranges])
+
+    def within(self, lat, lon, radius_km, limit=None, after=None):
+        """
+        [(distance_km, hotel), ...] within radius_km of (lat, lon), ordered by
+        (distance, hotel id), at most `limit`. `after=(distance_km, hotel_id)`
+        starts right after that hotel.
+        """
+        grid = self._current_grid()
+        lat, lon = float(lat), float(lon)
+        candidates = self._candidates(grid, lat, lon, radius_km)
+        positions, distances = nearest_points(
+            lat, lon, grid.lats[candidates], grid.lons[candidates], radius_km, limit,
+            keys=grid.keys[candidates],
+            after=(float(after[0]), str(after[1])) if after else None,
+        )
+        return [
+            (float(distance), grid.hotels[candidates[position]])
+            for position, distance in zip(positions, distances)
+        ]
+
+    def size(self):
+        return len(self._current_grid().hotels)
+
+
+hotel_spatial_index = HotelSpatialIndex()
+
+
+class DatabaseSpatialIndex(_SpatialSearch):
+    """
+    Radius search answered by the database, for deployments where a per-process
+    index is impractical (many workers, frequent edits).
+
+    Uses an ST_DWithin query when PostGIS is installed on a PostgreSQL
+    database, otherwise prefix lookups on the indexed Hotel.geohash column for
+    the cells covering the search circle. Exact distances, ordering and paging
+    are then computed with the same kernel as the in-process index.
+    """
+
+    _postgis = None
+
+    def postgis_available(self):
+        if self._postgis is None:
+            available = False
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")
+                    available = cursor.fetchone() is not None
+            DatabaseSpatialIndex._postgis = available
+        return self._postgis
+
+    def candidates(self, lat, lon, radius_km):
+        from api.hotel.models import Hotel
+
+        if self.postgis_available():
+            return list(Hotel.objects.raw(
+                """
+                SELECT * FROM api_hotel
+                WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+                  AND ST_DWithin(
+                    ST_SetSRID(ST_MakePoint(longitude::float8, latitude::float8), 4326)::geography,
+                    ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography,
+                    %s
+                  )
+                """,
+                [lon, lat, radius_km * 1000],
+            ))
+
+        cells = Q()
+        for prefix in geohash.covering_cells(lat, lon, radius_km):
+            cells |= Q(geohash__startswith=prefix)
+        return list(Hotel.objects.filter(cells, latitude__isnull=False, longitude__isnull=False))
+
+    def within(self, lat, lon, radius_km, limit=None, after=None):
+        lat, lon = float(lat), float(lon)
+        hotels = self.candidates(lat, lon, radius_km)
+        positions, distances = nearest_points(
+            lat, lon,
+            np.array([float(hotel.latitude) for hotel in hotels], dtype=float),
+            np.array([float(hotel.longitude) for hotel in hotels], dtype=float),
+            radius_km, limit,
+            keys=np.array([str(hotel.id) for hotel in hotels], dtype=str),
+            after=(float(after[0]), str(after[1])) if after else None,
+        )
+        return [(float(distance), hotels[position]) for position, distance in zip(positions, distances)]
+
+    def size(self):
+        from api.hotel.models import Hotel
+
+        return Hotel.objects.filter(latitude__isnull=False, longitude__isnull=False).count()
+
+
+database_spatial_index = DatabaseSpatialIndex()
+
+
+def get_spatial_index():
+    """The hotel search selected by HOTEL_SPATIAL_STRATEGY: 'memory' (default) or 'database'."""
+    if getattr(settings, 'HOTEL_SPATIAL_STRATEGY', 'memory') == 'database':
+        return database_spatial_index
+    return hotel_spatial_index
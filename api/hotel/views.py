@@ -1,11 +1,21 @@
 # api/hotel/views.py
 
-from django.http import JsonResponse
-from rest_framework import viewsets
+import base64
+import json
 
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from api.availability.services import car_summary, hotel_car_availability
+from api.availability.utils import count_queries
 from api.booking.models import Booking
 from api.linkCarandHotel.models import CarHotelLink
 from .models import Hotel
+from .occupancy import build_occupancy_grid, parse_slot, run_length_encode
 from .serializers import HotelSerializer
 from rest_framework.permissions import IsAuthenticatedOrReadOnly  # Optional
 from django.utils.dateparse import parse_datetime
@@ -15,13 +25,126 @@ class HotelViewSet(viewsets.ModelViewSet):
     serializer_class = HotelSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]  # Or adjust as needed
 
+    @action(detail=True, methods=['get'], url_path='occupancy')
+    def occupancy(self, request, pk=None):
+        """
+        GET /api/hotels/<id>/occupancy/?from=...&to=...&slot=15m
+        Booked slots of every linked car, run-length encoded as
+        [[first_slot, length], ...] per car.
+        """
+        hotel = self.get_object()
+        start = parse_datetime(request.query_params.get('from', ''))
+        end = parse_datetime(request.query_params.get('to', ''))
+        if not start or not end:
+            return Response({'detail': 'from and to are required datetimes'}, status=status.HTTP_400_BAD_REQUEST)
+        # Naive bounds are local time; comparing them with the aware booking times would raise
+        if timezone.is_naive(start):
+            start = timezone.make_aware(start, timezone.get_current_timezone())
+        if timezone.is_naive(end):
+            end = timezone.make_aware(end, timezone.get_current_timezone())
+        if start >= end:
+            return Response({'detail': 'from must be before to'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            slot = parse_slot(request.query_params.get('slot', '15m'))
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        cars = [link.car for link in CarHotelLink.objects.filter(hotel=hotel).select_related('car').order_by('car__model')]
+        bookings = Booking.objects.filter(
+            vehicle_id__in=[car.id for car in cars],
+            status__in=Booking.BLOCKING_STATUSES,
+            end_time__gt=start,
+            start_time__lt=end,
+        ).values_list('vehicle_id', 'start_time', 'end_time')
+
+        try:
+            grid = build_occupancy_grid([car.id for car in cars], list(bookings), start, end, slot)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'hotel_id': str(hotel.id),
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'slot_minutes': slot.total_seconds() / 60,
+            'slots': grid.shape[1],
+            'cars': [
+                {
+                    'id': str(car.id),
+                    'model': car.model,
+                    'plate_number': car.plate_number,
+                    'booked_runs': runs,
+                }
+                for car, runs in zip(cars, run_length_encode(grid))
+            ],
+        })
+
     
     
     
+NEARBY_PAGE_SIZE = 20
+NEARBY_MAX_PAGE_SIZE = 100
+
+
+def encode_nearby_cursor(distance_km, hotel_id):
+    """Opaque cursor pointing right after a hotel in (distance, id) order."""
+    return base64.urlsafe_b64encode(json.dumps([distance_km, str(hotel_id)]).encode()).decode()
+
+
+def decode_nearby_cursor(cursor):
+    try:
+        distance_km, hotel_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(distance_km), str(hotel_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def nearby_results(nearby, start_time, end_time):
+    """Response rows for a page of nearby hotels; one availability query for the whole page."""
+    availability = hotel_car_availability([item['hotel'].id for item in nearby], start_time, end_time)
+    results = []
+    for item in nearby:
+        hotel = item['hotel']
+        available_cars = [
+            car_summary(car)
+            for car, is_available in availability.get(hotel.id, [])
+            if is_available
+        ]
+
+        results.append({
+            'id': str(hotel.id),
+            'name': hotel.name,
+            'distance_km': round(item['distance_km'], 2),
+            'location': hotel.location,
+            'latitude': float(hotel.latitude),
+            'longitude': float(hotel.longitude),
+            'phone': hotel.phone,
+            'qr_code_url': hotel.qr_code.url if hotel.qr_code else None,
+            'available_linked_cars': available_cars,
+        })
+    return results
+
+
 def nearby_hotels_view(request):
+    """
+    GET /hotels/nearby/?lat&lon&radius&start_time&end_time[&limit&cursor&format=ndjson]
+    Hotels ordered by distance, `limit` per page (default 20, max 100); pass
+    `next_cursor` back as `cursor` for the next page. With format=ndjson (or
+    Accept: application/x-ndjson) every hotel in the radius is streamed as one
+    JSON object per line, `limit` hotels per availability query.
+    `radius` (km, default 10) must be greater than 0 and at most HOTEL_MAX_RADIUS_KM.
+    """
     lat = request.GET.get('lat')
     lon = request.GET.get('lon')
-    radius = float(request.GET.get('radius', 10))  # default 10 km
+    try:
+        radius = float(request.GET.get('radius', 10))  # default 10 km
+    except ValueError:
+        return JsonResponse({'error': 'radius must be a number'}, status=400)
+    if not 0 < radius <= settings.HOTEL_MAX_RADIUS_KM:
+        return JsonResponse(
+            {'error': f'radius must be greater than 0 and at most {settings.HOTEL_MAX_RADIUS_KM:g} km'}, status=400
+        )
     start_time_str = request.GET.get('start_time')
     end_time_str = request.GET.get('end_time')
 
@@ -29,6 +152,7 @@ def nearby_hotels_view(request):
         return JsonResponse({'error': 'Latitude, longitude, start_time, and end_time are required'}, status=400)
 
     try:
+        lat, lon = float(lat), float(lon)
         start_time = parse_datetime(start_time_str)
         end_time = parse_datetime(end_time_str)
         if not start_time or not end_time:
@@ -37,48 +161,36 @@ def nearby_hotels_view(request):
         if start_time >= end_time:
             return JsonResponse({'error': 'start_time must be before end_time'}, status=400)
 
-        nearby = Hotel.objects.nearby_hotels(lat, lon, radius)
-
-        results = []
-
-        for item in nearby:
-            hotel = item['hotel']
-            linked_cars = CarHotelLink.objects.filter(hotel=hotel).select_related('car')
-            
-            available_cars = []
-            for link in linked_cars:
-                car = link.car
-                has_conflict = Booking.objects.filter(
-                    vehicle=car,
-                    status__in=[Booking.STATUS_ACTIVE],
-                    end_time__gt=start_time,
-                    start_time__lt=end_time
-                ).exists()
-                if not has_conflict:
-                    available_cars.append({
-                        'id': str(car.id),
-                        'model': car.model,
-                        'plate_number': car.plate_number,
-                        'status': car.status,
-                        'price_per_hour': car.price_per_hour,
-                        'passengers': car.passengers,
-                        'transmission': car.transmission,
-                        'fuel_type': car.fuel_type,
-                    })
-
-            results.append({
-                'id': str(hotel.id),
-                'name': hotel.name,
-                'distance_km': round(item['distance_km'], 2),
-                'location': hotel.location,
-                'latitude': float(hotel.latitude),
-                'longitude': float(hotel.longitude),
-                'phone': hotel.phone,
-                'qr_code_url': hotel.qr_code.url if hotel.qr_code else None,
-                'available_linked_cars': available_cars,
-            })
-
-        return JsonResponse({'results': results})
+        limit = min(max(int(request.GET.get('limit', NEARBY_PAGE_SIZE)), 1), NEARBY_MAX_PAGE_SIZE)
+        cursor = request.GET.get('cursor')
+        after = decode_nearby_cursor(cursor) if cursor else None
+
+        stream = (
+            request.GET.get('format') == 'ndjson'
+            or 'application/x-ndjson' in request.headers.get('Accept', '')
+        )
+        if stream:
+            nearby = Hotel.objects.nearby_hotels(lat, lon, radius, max_results=None, after=after)
+
+            def lines():
+                for first in range(0, len(nearby), limit):
+                    for row in nearby_results(nearby[first:first + limit], start_time, end_time):
+                        yield json.dumps(row) + '\n'
+
+            return StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+
+        with count_queries() as counter:
+            nearby = Hotel.objects.nearby_hotels(lat, lon, radius, max_results=limit + 1, after=after)
+            page = nearby[:limit]
+            results = nearby_results(page, start_time, end_time)
+
+        next_cursor = None
+        if len(nearby) > limit:
+            next_cursor = encode_nearby_cursor(page[-1]['distance_km'], page[-1]['hotel'].id)
+
+        response = JsonResponse({'results': results, 'next_cursor': next_cursor})
+        response['X-Query-Count'] = counter.count
+        return response
 
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=400)
\ No newline at end of file
+        return JsonResponse({'error': str(e)}, status=400)
@@ -0,0 +1,46 @@
+import importlib
+import threading
+
+
+class LazyModule:
+    """
+    Stand-in for a heavy module that is imported on first attribute access.
+
+        np = LazyModule('numpy')
+        stripe = LazyModule('stripe', on_import=configure_stripe)
+
+    Code keeps using `np.array(...)` or `stripe.Refund.create(...)` unchanged,
+    but importing the module that declares it stays cheap, so management
+    commands and web workers only pay for dependencies they actually use.
+    `on_import(module)` runs once, right after the real import.
+    """
+
+    def __init__(self, name, on_import=None):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_on_import', on_import)
+        object.__setattr__(self, '_module', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    module = importlib.import_module(self._name)
+                    if self._on_import is not None:
+                        self._on_import(module)
+                    object.__setattr__(self, '_module', module)
+        return self._module
+
+    def __getattr__(self, attr):
+        # Only reached for attributes not cached on the proxy yet
+        value = getattr(self._load(), attr)
+        object.__setattr__(self, attr, value)
+        return value
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+        object.__setattr__(self, attr, value)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<LazyModule {self._name!r} ({state})>"
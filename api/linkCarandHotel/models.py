@@ -9,10 +9,12 @@ from api.garage.models import Car
 from io import BytesIO
 
 import os
-import qrcode
+from api.lazy import LazyModule
 from django.core.files.base import ContentFile
 from django.conf import settings
 
+qrcode = LazyModule('qrcode')
+
 class CarHotelLink(models.Model):
     """
     A link between a car and a hotel with QR code functionality.
@@ -0,0 +1,70 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from api.hotel.spatial import nearest_points
+
+
+def per_hotel_loop(lat, lon, lats, lons, radius_km, k):
+    """The distance loop nearby_hotels used before the vectorized kernel, kept as a baseline."""
+    lat_rad, lon_rad = np.radians(lat), np.radians(lon)
+    found = []
+    for position in range(len(lats)):
+        hotel_lat = np.radians(lats[position])
+        hotel_lon = np.radians(lons[position])
+        dlon = hotel_lon - lon_rad
+        dlat = hotel_lat - lat_rad
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat_rad) * np.cos(hotel_lat) * np.sin(dlon / 2) ** 2
+        distance = 6371.0 * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+        if distance <= radius_km:
+            found.append((distance, position))
+    found.sort()
+    return found[:k]
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the vectorized hotel distance kernel against the per-hotel loop on synthetic hotels'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 10_000, 100_000],
+                            help='Hotel counts to benchmark (default 100 10000 100000)')
+        parser.add_argument('--radius', type=float, default=10, help='Search radius in km (default 10)')
+        parser.add_argument('--k', type=int, default=20, help='Results kept per query (default 20)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per size, best is reported (default 5)')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1 or options['k'] < 1:
+            raise CommandError('--repeat and --k must be at least 1')
+        rng = np.random.default_rng(options['seed'])
+        lat, lon = 45.4642, 9.1900  # Milan
+        radius, k = options['radius'], options['k']
+
+        self.stdout.write(f"{'hotels':>8}  {'loop ms':>10}  {'kernel ms':>10}  {'speedup':>8}  {'in radius':>9}")
+        for size in options['sizes']:
+            # Hotels spread over roughly 200 x 200 km around the query point
+            lats = lat + rng.uniform(-1, 1, size)
+            lons = lon + rng.uniform(-1.3, 1.3, size)
+
+            loop_time, expected = self._best(options['repeat'], per_hotel_loop, lat, lon, lats, lons, radius, k)
+            kernel_time, (positions, distances) = self._best(
+                options['repeat'], nearest_points, lat, lon, lats, lons, radius, k
+            )
+            if [position for _, position in expected] != positions.tolist():
+                raise CommandError(f'Kernel and loop disagree for {size} hotels')
+
+            in_radius = int((nearest_points(lat, lon, lats, lons, radius)[1]).size)
+            self.stdout.write(
+                f"{size:>8}  {loop_time * 1000:>10.3f}  {kernel_time * 1000:>10.3f}  "
+                f"{loop_time / kernel_time:>7.1f}x  {in_radius:>9}"
+            )
+
+    def _best(self, repeat, func, *args):
+        best, result = None, None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func(*args)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
@@ -0,0 +1,152 @@
+import argparse
+import csv
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.guest.ocr import FAST, FULL, load_readers, read_texts
+from api.guest.ocr_backends import BACKENDS
+from api.guest.utils import extract_expiry_date, recognize_license_text, validate_driver_license
+from api.lazy import LazyModule
+
+
+np = LazyModule('numpy')
+
+MODES = ('tiered', FULL, FAST)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (ru_maxrss is in KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class Command(BaseCommand):
+    help = ('Runs every OCR backend over a labeled directory of license images and reports p50/p95 '
+            'latency, peak RSS and detection accuracy, each backend in its own process')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=os.path.join(settings.MEDIA_ROOT, 'driver_licenses'),
+                            help='Directory of sample license images (default MEDIA_ROOT/driver_licenses)')
+        parser.add_argument('--labels', required=True,
+                            help='CSV with filename,is_valid,expiry_date for the images in --dir')
+        parser.add_argument('--backends', nargs='+', choices=list(BACKENDS), default=list(BACKENDS),
+                            help=f"Backends to compare (default {' '.join(BACKENDS)})")
+        parser.add_argument('--mode', choices=MODES, default='tiered',
+                            help='tiered (as in production), or only the full or fast pass (default tiered)')
+        parser.add_argument('--limit', type=int, default=None, help='Only use the first N labeled images')
+        parser.add_argument('--min-accuracy', type=float, default=0.95,
+                            help='Detection accuracy a backend needs to be recommended (default 0.95)')
+        # Set on the per-backend child processes
+        parser.add_argument('--run-backend', default=None, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(options['dir']):
+            raise CommandError(f"No such directory: {options['dir']}")
+        labels = self.load_labels(options['labels'])
+        names = sorted(name for name in labels if os.path.exists(os.path.join(options['dir'], name)))
+        names = names[:options['limit']]
+        if not names:
+            raise CommandError(f"None of the labeled images are in {options['dir']}")
+
+        if options['run_backend']:
+            result = self.measure(options['run_backend'], options['dir'], names, labels, options['mode'])
+            self.stdout.write(json.dumps(result))
+            return
+
+        self.stdout.write(f"{len(names)} labeled images from {options['dir']}, {options['mode']} mode")
+        self.stdout.write(
+            f"{'backend':<12} {'load s':>7} {'p50 ms':>9} {'p95 ms':>9} {'peak MB':>8} {'valid':>7} {'expiry':>7}"
+        )
+        results = {}
+        for backend in options['backends']:
+            result = results[backend] = self.run_child(backend, options)
+            if 'error' in result:
+                self.stdout.write(f"{backend:<12} {result['error']}")
+                continue
+            self.stdout.write(
+                f"{backend:<12} {result['load_s']:>7.1f} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+                f"{result['peak_rss_mb']:>8.0f} {result['valid_accuracy']:>7.0%} {result['expiry_accuracy']:>7.0%}"
+            )
+
+        accurate = [
+            (result['p50_ms'], backend) for backend, result in results.items()
+            if 'error' not in result and result['valid_accuracy'] >= options['min_accuracy']
+        ]
+        if accurate:
+            self.stdout.write(self.style.SUCCESS(
+                f"Fastest backend with at least {options['min_accuracy']:.0%} detection accuracy: {min(accurate)[1]}"
+            ))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f"No backend reached {options['min_accuracy']:.0%} detection accuracy"
+            ))
+
+    def run_child(self, backend, options):
+        """Measures one backend in a fresh interpreter, so its peak RSS does not include the other backends."""
+        command = [
+            sys.executable, '-m', 'django', 'benchmark_ocr_backends', '--run-backend', backend,
+            '--dir', options['dir'], '--labels', os.path.abspath(options['labels']), '--mode', options['mode'],
+        ]
+        if options['limit'] is not None:
+            command += ['--limit', str(options['limit'])]
+        process = subprocess.run(command, cwd=settings.BASE_DIR, env=os.environ.copy(), capture_output=True, text=True)
+        lines = process.stdout.strip().splitlines()
+        if process.returncode != 0 or not lines:
+            error = (process.stderr.strip().splitlines() or ['failed'])[-1]
+            return {'error': error}
+        return json.loads(lines[-1])
+
+    def measure(self, backend, directory, names, labels, mode):
+        def read(images, tier):
+            return read_texts(images, tier, backend)
+
+        try:
+            # Model loading and a first warm-up read are kept out of the latencies
+            started = time.perf_counter()
+            load_readers(backend)
+            with open(os.path.join(directory, names[0]), 'rb') as f:
+                read([f.read()], FULL)
+            load_s = time.perf_counter() - started
+        except ImportError as e:
+            return {'error': f"not installed ({e})"}
+
+        latencies, valid_hits, expiry_hits = [], 0, 0
+        for name in names:
+            with open(os.path.join(directory, name), 'rb') as f:
+                image_bytes = f.read()
+            started = time.perf_counter()
+            if mode == 'tiered':
+                text = recognize_license_text([image_bytes], read=read)
+            else:
+                text = read([image_bytes], mode)[0]
+            latencies.append(time.perf_counter() - started)
+
+            is_valid, expiry_date = labels[name]
+            detected = validate_driver_license(text)
+            valid_hits += detected == is_valid
+            expiry_hits += (extract_expiry_date(text) if detected else None) == (expiry_date if is_valid else None)
+
+        return {
+            'load_s': load_s,
+            'p50_ms': float(np.percentile(latencies, 50)) * 1000,
+            'p95_ms': float(np.percentile(latencies, 95)) * 1000,
+            'peak_rss_mb': peak_rss_mb(),
+            'valid_accuracy': valid_hits / len(names),
+            'expiry_accuracy': expiry_hits / len(names),
+        }
+
+    def load_labels(self, path):
+        if not os.path.exists(path):
+            raise CommandError(f"No such labels file: {path}")
+        with open(path, newline='') as f:
+            return {
+                row['filename']: (row['is_valid'].strip().lower() in ('true', '1', 'yes'), row['expiry_date'] or None)
+                for row in csv.DictReader(f)
+            }
@@ -0,0 +1,89 @@
+import csv
+import os
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.guest.ocr import FAST, load_readers, read_text, read_texts
+from api.guest.utils import extract_expiry_date, recognize_license_text, validate_driver_license
+
+
+class Command(BaseCommand):
+    help = ('Benchmarks OCR latency and license detection accuracy for several image preprocessing settings '
+            'and for the fast and tiered OCR passes')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=os.path.join(settings.MEDIA_ROOT, 'driver_licenses'),
+                            help='Directory of sample license images (default MEDIA_ROOT/driver_licenses)')
+        parser.add_argument('--sides', type=int, nargs='+', default=[2048, 1600, 1280, 1024, 800],
+                            help='Maximum image sides to try (default 2048 1600 1280 1024 800)')
+        parser.add_argument('--limit', type=int, default=None, help='Only use the first N images')
+        parser.add_argument('--labels', default=None,
+                            help='CSV with filename,is_valid,expiry_date; without it the unprocessed '
+                                 'images are the reference')
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(options['dir']):
+            raise CommandError(f"No such directory: {options['dir']}")
+        names = sorted(
+            name for name in os.listdir(options['dir'])
+            if name.lower().rsplit('.', 1)[-1] in ('jpg', 'jpeg', 'png')
+        )[:options['limit']]
+        if not names:
+            raise CommandError(f"No images in {options['dir']}")
+        images = {}
+        for name in names:
+            with open(os.path.join(options['dir'], name), 'rb') as f:
+                images[name] = f.read()
+
+        configurations = [
+            ('original', {'max_side': None, 'grayscale': False, 'autocontrast': False}),
+            ('full size, gray', {'max_side': None, 'grayscale': True, 'autocontrast': True}),
+        ] + [
+            (f'{side}px, gray', {'max_side': side, 'grayscale': True, 'autocontrast': True})
+            for side in options['sides']
+        ]
+        runs = [
+            (label, lambda image_bytes, preprocess=preprocess: read_text(image_bytes, **preprocess))
+            for label, preprocess in configurations
+        ] + [
+            ('fast pass', lambda image_bytes: read_text(image_bytes, FAST)),
+            ('tiered', lambda image_bytes: recognize_license_text([image_bytes], read=read_texts)),
+        ]
+
+        load_readers()  # Keep model loading out of the timings
+        reference = self.load_labels(options['labels']) if options['labels'] else None
+
+        self.stdout.write(f"{len(images)} images from {options['dir']}")
+        self.stdout.write(
+            f"{'setting':<18} {'mean ms':>9} {'p95 ms':>9} {'valid':>7} {'expiry':>7} {'agree':>7}"
+        )
+        for label, read in runs:
+            latencies, results = [], {}
+            for name, image_bytes in images.items():
+                started = time.perf_counter()
+                text = read(image_bytes)
+                latencies.append(time.perf_counter() - started)
+                results[name] = (validate_driver_license(text), extract_expiry_date(text))
+
+            if reference is None:
+                reference = results  # The first setting is the unprocessed baseline
+            agree = sum(results[name] == reference.get(name) for name in results)
+            self.stdout.write(
+                f"{label:<18} {np.mean(latencies) * 1000:>9.1f} {np.percentile(latencies, 95) * 1000:>9.1f} "
+                f"{self.percent(sum(valid for valid, _ in results.values()), len(results)):>7} "
+                f"{self.percent(sum(bool(expiry) for _, expiry in results.values()), len(results)):>7} "
+                f"{self.percent(agree, len(results)):>7}"
+            )
+
+    def load_labels(self, path):
+        with open(path, newline='') as f:
+            return {
+                row['filename']: (row['is_valid'].strip().lower() in ('true', '1', 'yes'), row['expiry_date'] or None)
+                for row in csv.DictReader(f)
+            }
+
+    def percent(self, count, total):
+        return f"{100 * count / total:.0f}%"
@@ -0,0 +1,105 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Dependencies that must stay off the startup path and load on first use
+HEAVY_MODULES = ['easyocr', 'torch', 'numpy', 'geopy', 'stripe', 'requests', 'qrcode']
+
+# Runs in a fresh interpreter so every measurement starts with cold module caches
+STARTUP_SCRIPT = """
+import importlib, json, sys, time
+import django
+from django.conf import settings
+
+started = time.perf_counter()
+django.setup()
+setup_done = time.perf_counter()
+importlib.import_module(settings.ROOT_URLCONF)
+urls_done = time.perf_counter()
+print(json.dumps({
+    'setup_ms': (setup_done - started) * 1000,
+    'urls_ms': (urls_done - setup_done) * 1000,
+    'loaded': [name for name in %(heavy)r if name in sys.modules],
+}))
+"""
+
+IMPORT_SCRIPT = """
+import json, time
+started = time.perf_counter()
+try:
+    import %(module)s
+except ImportError:
+    print(json.dumps(None))
+else:
+    print(json.dumps((time.perf_counter() - started) * 1000))
+"""
+
+
+class Command(BaseCommand):
+    help = ('Measures Django startup time (settings, app registry and URLconf) in fresh interpreters, '
+            'the packages it spends the most import time on, and the cold import cost of heavy dependencies')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement, best is reported (default 3)')
+        parser.add_argument('--top', type=int, default=15, help='Packages listed by import time (default 15)')
+        parser.add_argument('--modules', nargs='+', default=HEAVY_MODULES,
+                            help=f"Modules whose cold import is timed (default {' '.join(HEAVY_MODULES)})")
+        parser.add_argument('--budget-ms', type=float, default=None,
+                            help='Fail when startup takes longer than this many milliseconds')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+        modules = options['modules']
+
+        runs = [self._startup(modules) for _ in range(options['repeat'])]
+        best = min(runs, key=lambda run: run['setup_ms'] + run['urls_ms'])
+        total = best['setup_ms'] + best['urls_ms']
+        self.stdout.write(f"{'django.setup()':<26} {best['setup_ms']:9.1f} ms")
+        self.stdout.write(f"{settings.ROOT_URLCONF:<26} {best['urls_ms']:9.1f} ms")
+        self.stdout.write(f"{'startup':<26} {total:9.1f} ms")
+
+        self.stdout.write(f"\n{'package':<26} {'self ms':>9}")
+        for package, ms in self._import_profile(options['top']):
+            self.stdout.write(f"{package:<26} {ms:9.1f}")
+
+        self.stdout.write(f"\n{'module':<26} {'import ms':>13}  loaded at startup")
+        for module in modules:
+            timings = [self._run(IMPORT_SCRIPT % {'module': module})[0] for _ in range(options['repeat'])]
+            cost = 'not installed' if timings[0] is None else f"{min(timings):.1f}"
+            loaded = 'yes' if module in best['loaded'] else 'no'
+            self.stdout.write(f"{module:<26} {cost:>13}  {loaded}")
+
+        if options['budget_ms'] is not None and total > options['budget_ms']:
+            raise CommandError(f"Startup took {total:.1f} ms, over the {options['budget_ms']:.0f} ms budget")
+
+    def _run(self, script, *flags):
+        result = subprocess.run(
+            [sys.executable, *flags, '-c', script],
+            cwd=settings.BASE_DIR, env=os.environ.copy(), capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Benchmark interpreter failed:\n{result.stderr.strip()}")
+        return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+    def _startup(self, modules):
+        measurement, _ = self._run(STARTUP_SCRIPT % {'heavy': list(modules)})
+        return measurement
+
+    def _import_profile(self, top):
+        """Self import time of the startup run grouped by top-level package, from `python -X importtime`."""
+        _, stderr = self._run(STARTUP_SCRIPT % {'heavy': []}, '-X', 'importtime')
+        packages = defaultdict(float)
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or '|' not in line:
+                continue
+            self_us, _, name = (part.strip() for part in line[len('import time:'):].split('|'))
+            if self_us.isdigit():
+                packages[name.split('.')[0]] += int(self_us) / 1000
+        return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
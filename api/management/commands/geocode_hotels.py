@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from geopy.exc import GeopyError
+from geopy.extra.rate_limiter import RateLimiter
+
+from api.hotel.geocoding import geocode, get_geocoder, normalize_address
+from api.hotel.models import GeocodeCache, Hotel, geohash_of
+from api.hotel.spatial import hotel_spatial_index
+
+
+class Command(BaseCommand):
+    help = 'Resolves missing hotel coordinates through the geocode cache and the geocoder'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-geocode every hotel, not only those without coordinates')
+        parser.add_argument('--retry-unresolved', action='store_true',
+                            help='Query the geocoder again for addresses cached as unresolvable')
+        parser.add_argument('--delay', type=float, default=None,
+                            help='Minimum seconds between geocoder requests (default GEOCODER_MIN_DELAY)')
+        parser.add_argument('--retries', type=int, default=2, help='Retries per address on geocoder errors (default 2)')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after this many distinct addresses')
+
+    def handle(self, *args, **options):
+        delay = options['delay'] if options['delay'] is not None else getattr(settings, 'GEOCODER_MIN_DELAY', 1)
+        if delay < 0 or options['retries'] < 0:
+            raise CommandError('--delay and --retries must not be negative')
+
+        hotels = Hotel.objects.exclude(location='')
+        if not options['all']:
+            hotels = hotels.filter(Q(latitude__isnull=True) | Q(longitude__isnull=True))
+
+        by_address = {}
+        for hotel_id, location in hotels.values_list('id', 'location'):
+            by_address.setdefault(normalize_address(location), (location, []))[1].append(hotel_id)
+        addresses = list(by_address.items())[:options['limit']]
+
+        if options['all']:
+            GeocodeCache.objects.filter(address__in=[address for address, _ in addresses]).delete()
+        elif options['retry_unresolved']:
+            GeocodeCache.objects.filter(
+                address__in=[address for address, _ in addresses], latitude__isnull=True
+            ).delete()
+
+        # Throttles only real geocoder calls; cached addresses are answered immediately
+        lookup = RateLimiter(
+            get_geocoder().geocode,
+            min_delay_seconds=delay,
+            max_retries=options['retries'],
+            error_wait_seconds=max(delay, 2.0),
+            swallow_exceptions=False,
+        )
+
+        resolved = unresolved = failed = 0
+        for _, (location, hotel_ids) in addresses:
+            try:
+                point = geocode(location, lookup=lookup)
+            except GeopyError as e:
+                failed += 1
+                self.stderr.write(f"Geocoder error for '{location}': {e}")
+                continue
+
+            if point is None:
+                unresolved += 1
+                self.stdout.write(self.style.WARNING(f"Could not geocode '{location}'"))
+                continue
+
+            # Bulk update skips Hotel.save(), so mark the spatial index dirty explicitly. Web
+            # processes see it through HOTEL_SPATIAL_INDEX_CACHE_BACKEND, else within the TTL
+            Hotel.objects.filter(id__in=hotel_ids).update(
+                latitude=point.latitude,
+                longitude=point.longitude,
+                geohash=geohash_of(point.latitude, point.longitude),
+            )
+            transaction.on_commit(hotel_spatial_index.mark_dirty)
+            resolved += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Geocoded {resolved} of {len(addresses)} addresses ({unresolved} unresolved, {failed} failed)"
+        ))
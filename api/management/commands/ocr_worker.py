@@ -0,0 +1,76 @@
+import socket
+import threading
+from multiprocessing import AuthenticationError, Pool
+from multiprocessing.connection import answer_challenge, deliver_challenge
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.guest.ocr import FULL, init_worker, parse_worker_address, read_text, read_texts, socket_connection
+
+
+# Every web worker may connect at once; the Listener default of 1 drops connections
+LISTEN_BACKLOG = 128
+
+
+class Command(BaseCommand):
+    help = 'Runs the driver license OCR worker pool that web processes send images to'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='OCR processes, each holding one model copy (default OCR_WORKERS)')
+        parser.add_argument('--address', default=None, help='host:port to listen on (default OCR_WORKER_ADDRESS)')
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or getattr(settings, 'OCR_WORKERS', 2)
+        address = options['address'] or getattr(settings, 'OCR_WORKER_ADDRESS', '')
+        if not address:
+            raise CommandError('Set OCR_WORKER_ADDRESS or pass --address host:port')
+        if workers < 1:
+            raise CommandError('--workers must be at least 1')
+
+        # Images wait in the pool's task queue while every worker is busy
+        with Pool(workers, initializer=init_worker) as pool, \
+                socket.create_server(parse_worker_address(address), backlog=LISTEN_BACKLOG) as server:
+            self.stdout.write(self.style.SUCCESS(f"OCR worker pool ({workers} processes) listening on {address}"))
+            try:
+                self.serve_forever(server, pool)
+            except KeyboardInterrupt:
+                pass
+
+    def serve_forever(self, server, pool):
+        """
+        Accepts clients until `server` is closed. The authkey handshake runs in
+        each client's thread, so a client that stalls never holds up the others.
+        """
+        while True:
+            try:
+                sock, _ = server.accept()
+            except OSError as e:
+                if server.fileno() == -1:
+                    return  # Server socket closed
+                self.stderr.write(f"Could not accept OCR client: {e!r}")
+                continue
+            threading.Thread(target=self.serve, args=(pool, sock), daemon=True).start()
+
+    def serve(self, pool, sock):
+        conn = socket_connection(sock, getattr(settings, 'OCR_WORKER_TIMEOUT', 30))
+        try:
+            authkey = settings.OCR_WORKER_AUTHKEY.encode()
+            deliver_challenge(conn, authkey)
+            answer_challenge(conn, authkey)
+            request = conn.recv()
+            try:
+                tier = request.get('tier', FULL)
+                if 'images' in request:
+                    conn.send({'texts': pool.apply(read_texts, (request['images'], tier))})
+                else:  # Single-image requests from web processes not yet upgraded
+                    conn.send({'text': pool.apply(read_text, (request['image'], tier))})
+            except Exception as e:
+                conn.send({'error': f"{type(e).__name__}: {e}"})
+        except AuthenticationError as e:
+            self.stderr.write(f"Rejected OCR client: {e!r}")
+        except (OSError, EOFError):
+            pass  # Client went away or stalled, e.g. after its timeout
+        finally:
+            conn.close()
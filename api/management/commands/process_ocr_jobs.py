@@ -0,0 +1,66 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from api.guest.jobs import process_job
+from api.guest.models import OCRJob
+
+
+class Command(BaseCommand):
+    help = 'Processes pending driver license OCR jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help='OCR jobs run at once (default OCR_MAX_CONCURRENT_JOBS)')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new jobs instead of exiting when idle')
+        parser.add_argument('--interval', type=float, default=2, help='Seconds between polls with --loop (default 2)')
+        parser.add_argument('--stale-after', type=int, default=600,
+                            help='Re-queue jobs stuck in processing for this many seconds (default 600)')
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency'] or getattr(settings, 'OCR_MAX_CONCURRENT_JOBS', 2)
+        if concurrency < 1:
+            raise CommandError('--concurrency must be at least 1')
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='ocr-jobs') as executor:
+            while True:
+                # Jobs of a worker that died mid-run
+                stale = OCRJob.objects.filter(
+                    status=OCRJob.STATUS_PROCESSING,
+                    started_at__lt=timezone.now() - timedelta(seconds=options['stale_after']),
+                ).update(status=OCRJob.STATUS_PENDING)
+                if stale:
+                    self.stdout.write(f"Re-queued {stale} stale jobs")
+
+                job_ids = list(
+                    OCRJob.objects.filter(status=OCRJob.STATUS_PENDING)
+                    .order_by('created_at')
+                    .values_list('id', flat=True)[:concurrency * 4]
+                )
+                if job_ids:
+                    list(executor.map(self.run, job_ids))
+                    retry = OCRJob.objects.filter(id__in=job_ids, status=OCRJob.STATUS_PENDING).count()
+                    self.stdout.write(f"Processed {len(job_ids) - retry} jobs")
+                    if retry < len(job_ids):
+                        continue
+                    # Nothing went through, e.g. the OCR worker pool is down: back off
+                    self.stderr.write(f"{retry} jobs still pending, OCR unavailable")
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+
+        pending = OCRJob.objects.filter(status=OCRJob.STATUS_PENDING).count()
+        self.stdout.write(self.style.SUCCESS(f"Done, {pending} OCR jobs pending"))
+
+    def run(self, job_id):
+        try:
+            process_job(job_id)
+        except Exception as e:
+            self.stderr.write(f"OCR job {job_id} failed: {e}")
+        finally:
+            close_old_connections()
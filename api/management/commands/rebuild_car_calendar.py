@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from api.availability.calendar import rebuild_calendar
+from api.garage.models import Car
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-day car availability calendar from bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', help='First date to rebuild (YYYY-MM-DD), default today')
+        parser.add_argument('--days', type=int, default=180, help='Number of days to rebuild (default 180)')
+        parser.add_argument('--car', action='append', dest='cars', help='Only rebuild this car id (repeatable)')
+
+    def handle(self, *args, **options):
+        start_date = parse_date(options['start']) if options['start'] else timezone.localdate()
+        if start_date is None:
+            raise CommandError('--from must be a date in YYYY-MM-DD format')
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+        end_date = start_date + timedelta(days=options['days'] - 1)
+
+        cars = Car.objects.all()
+        if options['cars']:
+            cars = cars.filter(id__in=options['cars'])
+        car_ids = list(cars.values_list('id', flat=True))
+
+        rows = rebuild_calendar(car_ids, start_date, end_date)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt calendar for {len(car_ids)} cars from {start_date} to {end_date} ({rows} booked days)"
+        ))
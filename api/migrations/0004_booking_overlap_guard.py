@@ -0,0 +1,122 @@
+from django.db import migrations, models
+
+
+OVERLAP_STATUSES = "('active', 'completed')"
+
+POSTGRES_CREATE = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    f"""
+    ALTER TABLE api_booking ADD CONSTRAINT booking_no_overlap
+    EXCLUDE USING gist (
+        vehicle_id WITH =,
+        tstzrange(start_time, end_time, '[)') WITH &&
+    ) WHERE (status IN {OVERLAP_STATUSES})
+    """,
+]
+
+POSTGRES_DROP = [
+    "ALTER TABLE api_booking DROP CONSTRAINT IF EXISTS booking_no_overlap",
+]
+
+# SQLite has no exclusion constraints; equivalent BEFORE INSERT/UPDATE triggers.
+SQLITE_OVERLAP_CHECK = f"""
+    SELECT RAISE(ABORT, 'booking_no_overlap')
+    WHERE EXISTS (
+        SELECT 1 FROM api_booking b
+        WHERE b.vehicle_id = NEW.vehicle_id
+          AND b.id != NEW.id
+          AND b.status IN {OVERLAP_STATUSES}
+          AND b.end_time > NEW.start_time
+          AND b.start_time < NEW.end_time
+    );
+"""
+
+SQLITE_CREATE = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS booking_no_overlap_insert
+    BEFORE INSERT ON api_booking
+    WHEN NEW.status IN {OVERLAP_STATUSES}
+    BEGIN {SQLITE_OVERLAP_CHECK} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS booking_no_overlap_update
+    BEFORE UPDATE OF vehicle_id, start_time, end_time, status ON api_booking
+    WHEN NEW.status IN {OVERLAP_STATUSES}
+    BEGIN {SQLITE_OVERLAP_CHECK} END
+    """,
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS booking_no_overlap_insert",
+    "DROP TRIGGER IF EXISTS booking_no_overlap_update",
+]
+
+
+def _run(schema_editor, statements_by_vendor):
+    for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def find_overlaps(rows):
+    """
+    (earlier_id, later_id) pairs of overlapping bookings among `rows` of
+    (id, vehicle_id, start_time, end_time), ordered by vehicle and start time.
+    """
+    overlaps = []
+    vehicle_id, latest_id, latest_end = None, None, None
+    for booking_id, booking_vehicle_id, start, end in rows:
+        if booking_vehicle_id != vehicle_id:
+            vehicle_id, latest_id, latest_end = booking_vehicle_id, booking_id, end
+            continue
+        if start < latest_end:
+            overlaps.append((latest_id, booking_id))
+        if end > latest_end:
+            latest_id, latest_end = booking_id, end
+    return overlaps
+
+
+def check_no_overlaps(apps, schema_editor):
+    """
+    Stops the migration if existing bookings already overlap: PostgreSQL would
+    refuse the constraint with an opaque error and the SQLite triggers would
+    leave the rows in place. Clean up by cancelling one booking of each pair
+    listed (or moving it to 'pending_conflict'), then migrate again.
+    """
+    Booking = apps.get_model('api', 'Booking')
+    rows = (
+        Booking.objects.using(schema_editor.connection.alias)
+        .filter(status__in=['active', 'completed'])
+        .order_by('vehicle_id', 'start_time')
+        .values_list('id', 'vehicle_id', 'start_time', 'end_time')
+    )
+    overlaps = find_overlaps(rows)
+    if overlaps:
+        pairs = '\n'.join(f"  {first} overlaps {second}" for first, second in overlaps)
+        raise RuntimeError(
+            f"Found {len(overlaps)} pairs of overlapping active or completed bookings of the same car. "
+            f"Cancel one booking of each pair (or set it to 'pending_conflict') and migrate again:\n{pairs}"
+        )
+
+
+def create_overlap_guard(apps, schema_editor):
+    check_no_overlaps(apps, schema_editor)
+    _run(schema_editor, {'postgresql': POSTGRES_CREATE, 'sqlite': SQLITE_CREATE})
+
+
+def drop_overlap_guard(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_DROP, 'sqlite': SQLITE_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_alter_booking_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['vehicle', 'status', 'start_time', 'end_time'], name='booking_vehicle_status_time'),
+        ),
+        migrations.RunPython(create_overlap_guard, drop_overlap_guard),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.11 on 2026-10-18 18:10
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_booking_overlap_guard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarDayAvailability',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('booked_minutes', models.PositiveIntegerField(default=0)),
+                ('first_free', models.TimeField(blank=True, help_text='Earliest free minute of the day (empty if fully booked).', null=True)),
+                ('last_free', models.TimeField(blank=True, help_text='Latest free minute of the day (empty if fully booked).', null=True)),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_availability', to='api.car')),
+            ],
+            options={
+                'ordering': ['car', 'date'],
+                'constraints': [models.UniqueConstraint(fields=('car', 'date'), name='car_day_availability_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.11 on 2026-10-18 18:18
+
+from django.db import migrations, models
+
+
+POSTGIS_INDEX = 'hotel_location_gist'
+
+# Copy of api.hotel.geohash.encode as of this migration, so later changes to
+# that module cannot change the stored values (or break the migration)
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode(lat, lon, precision=12):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True  # Bits alternate between longitude (even) and latitude
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = value = 0
+    return ''.join(chars)
+
+
+def backfill_geohash(apps, schema_editor):
+    Hotel = apps.get_model('api', 'Hotel')
+    hotels = Hotel.objects.filter(latitude__isnull=False, longitude__isnull=False).only('id', 'latitude', 'longitude')
+    for hotel in hotels.iterator():
+        hotel.geohash = encode(float(hotel.latitude), float(hotel.longitude))
+        hotel.save(update_fields=['geohash'])
+
+
+def _postgis_installed(schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'postgis'")
+        return cursor.fetchone() is not None
+
+
+def create_postgis_index(apps, schema_editor):
+    # Only where PostGIS is already installed; the geohash column covers the rest
+    if _postgis_installed(schema_editor):
+        schema_editor.execute(
+            f"""
+            CREATE INDEX IF NOT EXISTS {POSTGIS_INDEX} ON api_hotel USING gist (
+                (ST_SetSRID(ST_MakePoint(longitude::float8, latitude::float8), 4326)::geography)
+            ) WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+            """
+        )
+
+
+def drop_postgis_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {POSTGIS_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_geocodecache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, help_text='Geohash of latitude/longitude, kept in sync on save for prefix lookups', max_length=12),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+        migrations.RunPython(create_postgis_index, drop_postgis_index),
+    ]
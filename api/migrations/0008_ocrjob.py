@@ -0,0 +1,29 @@
+# Generated by Django 5.2.11 on 2026-10-18 18:25
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_hotel_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OCRJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('valid', 'Valid'), ('invalid', 'Invalid'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20)),
+                ('path', models.CharField(blank=True, help_text='Stored temp image, emptied once rejected', max_length=255)),
+                ('digest', models.CharField(help_text='sha256 of the uploaded bytes', max_length=64)),
+                ('expiry_date', models.CharField(blank=True, max_length=20, null=True)),
+                ('is_expired', models.BooleanField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.11 on 2026-10-18 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_ocrjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrjob',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, help_text='Times a worker has claimed the job'),
+        ),
+        migrations.AddField(
+            model_name='ocrjob',
+            name='retryable',
+            field=models.BooleanField(default=False, help_text='Failed because OCR was unavailable, not because of the image'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+from django.db.models.fields.files import FieldFile
+
+
+class DirtyFieldsMixin:
+    """
+    Remembers the field values a model instance was loaded with, so save()
+    can tell what changed without re-fetching the row.
+
+    Usage:
+        class Hotel(DirtyFieldsMixin, models.Model):
+            def save(self, *args, **kwargs):
+                if self.has_changed('name'):
+                    ...
+
+    New (unsaved) instances report every field as changed and have no
+    original values. File fields are tracked by their stored name.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_loaded_fields()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._snapshot_loaded_fields()
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self._snapshot_loaded_fields()
+            return
+        # Only the written fields are stored now; other in-memory edits stay changed
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for name in update_fields:
+            field = self._meta.get_field(name)
+            loaded[field.attname] = self._tracked_value(field)
+
+    def _tracked_value(self, field):
+        value = getattr(self, field.attname)
+        if isinstance(value, FieldFile):
+            return value.name or None
+        return value
+
+    def _snapshot_loaded_fields(self):
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            field.attname: self._tracked_value(field)
+            for field in self._meta.concrete_fields
+            if field.attname not in deferred
+        }
+
+    def original(self, field_name):
+        """Value of `field_name` when the instance was loaded (None for new instances)."""
+        if self._state.adding:
+            return None
+        field = self._meta.get_field(field_name)
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        if field.attname not in loaded:
+            # Field was deferred when loading; read just that column once
+            loaded[field.attname] = (
+                type(self)._base_manager.using(self._state.db)
+                .filter(pk=self.pk)
+                .values_list(field.attname, flat=True)
+                .first()
+            )
+        return loaded[field.attname]
+
+    def has_changed(self, field_name):
+        if self._state.adding:
+            return True
+        field = self._meta.get_field(field_name)
+        return self.original(field_name) != self._tracked_value(field)
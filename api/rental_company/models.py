@@ -2,8 +2,9 @@ from django.core.exceptions import ValidationError
 from django.db import models
 import uuid
 from django.contrib.auth import get_user_model
+from api.mixins import DirtyFieldsMixin
 
-class RentalCompany(models.Model):
+class RentalCompany(DirtyFieldsMixin, models.Model):
     """
     Represents a vehicle rental company integrated into the platform.
     """
@@ -22,12 +23,8 @@ class RentalCompany(models.Model):
         return self.name
 
     def save(self, *args, **kwargs):
-        # Detect if email changed
-        try:
-            old_instance = RentalCompany.objects.get(pk=self.pk)
-            email_changed = old_instance.email != self.email
-        except RentalCompany.DoesNotExist:
-            email_changed = True  # New instance
+        # Detect if email changed (always True for a new instance)
+        email_changed = self.has_changed('email')
 
         super().save(*args, **kwargs)
 
@@ -1,3 +1,1298 @@
-from django.test import TestCase
+import importlib
+import json
+import math
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from io import BytesIO, StringIO
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from PIL import Image
+from django.contrib import admin
+from django.contrib.messages import get_messages
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from api.apps import ApiConfig
+from api.availability.calendar import summarize_day
+from api.availability.index import availability_index
+from api.availability.models import CarDayAvailability
+from api.availability.services import nearest_available_cars
+from api.availability.views import MAX_FREE_SLOT_HORIZON_HOURS
+from api.booking.email_service import Email
+from api.booking.models import Booking
+from api.booking.pricing import quote_price, quote_prices
+from api.booking.quote_cache import PriceQuoteCache, price_quote_cache
+from api.bookingConflict.models import BookingConflict
+from api.garage.models import Car
+from api.guest import jobs, ocr, ocr_backends, views as guest_views
+from api.guest.models import Guest, OCRJob
+from api.guest.ocr import FAST, FULL, OCRWorkerUnavailable
+from api.guest.ocr_backends import OCRBackend
+from api.guest.ocr_cache import ocr_result_cache
+from api.guest.preprocessing import preprocess_image, preprocessing_options
+from api.guest.utils import recognize_license_text
+from api.hotel import geohash
+from api.hotel.geocoding import geocode, reset_geocoder
+from api.hotel.models import GeocodeCache, Hotel, geohash_of
+from api.hotel.occupancy import build_occupancy_grid, parse_slot, run_length_encode
+from api.hotel.spatial import EARTH_RADIUS_KM, HotelSpatialIndex, hotel_spatial_index
+from api.management.commands.benchmark_ocr_backends import Command as BenchmarkOCRBackendsCommand
+from api.management.commands.benchmark_startup import HEAVY_MODULES, Command as BenchmarkStartupCommand
+from api.management.commands.ocr_worker import Command as OCRWorkerCommand
+from api.lazy import LazyModule
+from api.linkCarandHotel.models import CarHotelLink
+from api.rental_company.models import RentalCompany
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Plain-Python reference distance the vectorized kernels are checked against."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class FixturesTestCase(TestCase):
+    """Rental company and hotels created without the QR code and geocoding work of Hotel.save()."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        self.company = RentalCompany.objects.create(
+            name='RC', address='Via Roma 1', phone_number='100', email='rc@example.com'
+        )
+        # Signals only update the indexes on commit, which TestCase never reaches
+        hotel_spatial_index.mark_dirty()
+        availability_index.invalidate()
+
+    def create_hotels(self, points):
+        start = Hotel.objects.count()
+        hotels = Hotel.objects.bulk_create([
+            Hotel(
+                name=f'Hotel {start + i}', location='x', phone=f'{start + i}', email=f'h{start + i}@example.com',
+                rental_company=self.company, latitude=round(lat, 6), longitude=round(lon, 6),
+                qr_code='x', guest_booking_url=f'hotel-{start + i}',
+            )
+            for i, (lat, lon) in enumerate(points)
+        ])
+        hotel_spatial_index.mark_dirty()
+        return hotels
+
+    def create_car(self, price_per_hour=10, max_price_per_day=60):
+        number = Car.objects.count()
+        return Car.objects.create(
+            rental_company=self.company, model=f'Model {number}', plate_number=f'AB{number:03d}CD',
+            price_per_hour=price_per_hour, max_price_per_day=max_price_per_day,
+        )
+
+    def create_booking(self, car, start_time, end_time, status=Booking.STATUS_ACTIVE, buffer_time=0):
+        if not hasattr(self, 'guest'):
+            self.guest = Guest.objects.create(
+                first_name='Ada', last_name='Rossi', email='ada@example.com', phone='200', driver_license='X1'
+            )
+        if not hasattr(self, 'hotel'):
+            self.hotel = self.create_hotels([(45.46, 9.19)])[0]
+        # Run the on_commit hooks (availability index, calendar) as a real commit would
+        with self.captureOnCommitCallbacks(execute=True):
+            return Booking.objects.create(
+                vehicle=car, hotel=self.hotel, guest=self.guest,
+                start_time=start_time, end_time=end_time, buffer_time=buffer_time, status=status,
+            )
+
+
+class HotelSpatialIndexTests(FixturesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        rng = random.Random(0)
+        points = [(45.46 + rng.uniform(-1, 1), 9.19 + rng.uniform(-1, 1)) for _ in range(200)]
+        points += [(45.5, 9.2)] * 5  # Ties at the same distance
+        points += [(-33.87, 151.21), (64.15, -21.94), (0.0, 179.99), (0.0, -179.99)]
+        self.create_hotels(points)
+
+    def brute_force(self, lat, lon, radius_km=None):
+        found = sorted(
+            (haversine_km(lat, lon, float(h.latitude), float(h.longitude)), str(h.id))
+            for h in Hotel.objects.all()
+        )
+        return [(d, key) for d, key in found if radius_km is None or d <= radius_km]
+
+    def assert_same(self, found, expected):
+        self.assertEqual([str(hotel.id) for _, hotel in found], [key for _, key in expected])
+        for (distance, _), (expected_distance, _) in zip(found, expected):
+            self.assertAlmostEqual(distance, expected_distance, places=6)
+
+    def test_within_matches_brute_force(self):
+        for lat, lon, radius in [(45.46, 9.19, 10), (45.46, 9.19, 80), (45.5, 9.2, 0.5), (0.0, 180.0, 50)]:
+            with self.subTest(lat=lat, lon=lon, radius=radius):
+                self.assert_same(hotel_spatial_index.within(lat, lon, radius), self.brute_force(lat, lon, radius))
+
+    def test_nearest_matches_brute_force(self):
+        for lat, lon, k in [(45.46, 9.19, 1), (45.5, 9.2, 7), (10.0, 10.0, 3), (0.0, 179.0, 2)]:
+            with self.subTest(lat=lat, lon=lon, k=k):
+                self.assert_same(hotel_spatial_index.nearest(lat, lon, k), self.brute_force(lat, lon)[:k])
+
+    def test_wide_searches_stay_fast(self):
+        Hotel.objects.exclude(pk__in=list(Hotel.objects.values_list('pk', flat=True)[:3])).delete()
+        hotel_spatial_index.mark_dirty()
+        started = time.perf_counter()
+        self.assertEqual(len(hotel_spatial_index.nearest(45.46, 9.19, 5)), 3)
+        self.assertEqual(len(hotel_spatial_index.within(45.46, 9.19, 20000)), 3)
+        self.assertEqual(sum(len(batch) for batch in hotel_spatial_index.iter_nearest(0, 0, batch_size=2)), 3)
+        self.assertLess(time.perf_counter() - started, 0.5)
+
+
+class NearestCarsTests(FixturesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.create_hotels([(45.46, 9.19), (45.47, 9.2), (45.45, 9.18)])
+        self.start_time = timezone.now() + timedelta(days=1)
+        self.end_time = self.start_time + timedelta(hours=3)
+
+    def test_unbounded_search_stops_once_every_hotel_is_seen(self):
+        with mock.patch.object(hotel_spatial_index, 'within', wraps=hotel_spatial_index.within) as within:
+            found = nearest_available_cars(45.46, 9.19, self.start_time, self.end_time, k=5, max_radius_km=None)
+        self.assertEqual(found, [])
+        # The first radius already holds all three hotels, so it is never widened to the whole globe
+        self.assertEqual(within.call_count, 1)
+
+    def test_view_bounds_max_radius(self):
+        params = {
+            'lat': 45.46, 'lon': 9.19,
+            'start_time': self.start_time.isoformat(), 'end_time': self.end_time.isoformat(),
+        }
+        self.assertEqual(self.client.get('/api/availability/nearest-cars/', params).status_code, 200)
+        for max_radius in ['0', '-5', 'inf', 'nan', '1e9']:
+            with self.subTest(max_radius=max_radius):
+                response = self.client.get('/api/availability/nearest-cars/', {**params, 'max_radius': max_radius})
+                self.assertEqual(response.status_code, 400)
+
+
+class NearbyHotelsViewTests(FixturesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        rng = random.Random(1)
+        points = [(45.46 + rng.uniform(-0.1, 0.1), 9.19 + rng.uniform(-0.1, 0.1)) for _ in range(20)]
+        points += [(45.47, 9.2)] * 5  # Ties that straddle page boundaries
+        self.create_hotels(points)
+        start_time = timezone.now() + timedelta(days=1)
+        self.params = {
+            'lat': 45.46, 'lon': 9.19, 'radius': 20,
+            'start_time': start_time.isoformat(), 'end_time': (start_time + timedelta(hours=2)).isoformat(),
+        }
+
+    def test_cursor_pages_have_no_duplicates_or_gaps(self):
+        ids, distances, cursor = [], [], None
+        while True:
+            params = {**self.params, 'limit': 4, **({'cursor': cursor} if cursor else {})}
+            response = self.client.get('/hotels/nearby/', params)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            ids += [row['id'] for row in body['results']]
+            distances += [row['distance_km'] for row in body['results']]
+            cursor = body['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), {str(pk) for pk in Hotel.objects.values_list('pk', flat=True)})
+        self.assertEqual(distances, sorted(distances))
+
+    def add_hotels_with_cars(self, count):
+        hotels = self.create_hotels([(45.465, 9.195)] * count)
+        for hotel in hotels:
+            for _ in range(2):
+                CarHotelLink.objects.create(car=self.create_car(), hotel=hotel)
+        booked = CarHotelLink.objects.filter(hotel=hotels[0]).first().car
+        start_time = datetime.fromisoformat(self.params['start_time'])
+        self.create_booking(booked, start_time, start_time + timedelta(hours=1))
+        return booked
+
+    def get_all_nearby(self, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get('/hotels/nearby/', {**self.params, 'limit': 100})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_query_count_does_not_grow_with_hotels_or_cars(self):
+        for count in (2, 30):
+            with self.subTest(count=count):
+                booked = self.add_hotels_with_cars(count)
+                hotel_spatial_index.mark_dirty()
+                availability_index.invalidate()
+                # Hotel grid, availability index and car links; only the links query once both are loaded
+                self.get_all_nearby(3)
+                results = self.get_all_nearby(1)
+                self.assertEqual(len(results), Hotel.objects.count())
+                cars = [car['id'] for row in results for car in row['available_linked_cars']]
+                self.assertEqual(len(cars), CarHotelLink.objects.count() - Booking.objects.count())
+                self.assertNotIn(str(booked.id), cars)
+
+    def test_radius_must_be_bounded(self):
+        for radius in ['0', '-1', 'inf', 'nan', '1e9', 'far']:
+            with self.subTest(radius=radius):
+                response = self.client.get('/hotels/nearby/', {**self.params, 'radius': radius})
+                self.assertEqual(response.status_code, 400)
+
+
+class BookingOverlapTests(FixturesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.car = self.create_car()
+        self.t0 = timezone.now().replace(microsecond=0) + timedelta(days=1)
+
+    def hours(self, n):
+        return self.t0 + timedelta(hours=n)
+
+    def test_index_matches_database_query(self):
+        rng = random.Random(2)
+        cars = [self.car, self.create_car(), self.create_car()]
+        statuses = [Booking.STATUS_ACTIVE, Booking.STATUS_COMPLETED, Booking.STATUS_CANCELLED]
+        for car in cars:
+            start = 0
+            for _ in range(15):
+                start += rng.randint(0, 5)
+                length = rng.randint(1, 4)
+                self.create_booking(car, self.hours(start), self.hours(start + length), rng.choice(statuses))
+                start += length
+
+        for _ in range(200):
+            car = rng.choice(cars)
+            start = rng.randint(-5, 100)
+            window = (self.hours(start), self.hours(start + rng.randint(1, 12)))
+            expected = set(Booking.objects.filter(
+                vehicle=car, status__in=Booking.BLOCKING_STATUSES,
+                end_time__gt=window[0], start_time__lt=window[1],
+            ).values_list('id', flat=True))
+            found = set(availability_index.overlapping(car.id, *window, statuses=Booking.BLOCKING_STATUSES))
+            self.assertEqual(found, expected)
+
+    def test_clean_sees_bookings_written_by_another_process(self):
+        other = self.create_booking(self.car, self.hours(10), self.hours(12))
+        self.assertTrue(availability_index.is_free(self.car.id, self.hours(0), self.hours(2), Booking.BLOCKING_STATUSES))
+        # A bulk update skips the signals, like a write from another process
+        Booking.objects.filter(id=other.id).update(start_time=self.hours(0), end_time=self.hours(2))
+
+        booking = Booking(
+            vehicle=self.car, hotel=self.hotel, guest=self.guest,
+            start_time=self.hours(1), end_time=self.hours(3), buffer_time=0,
+        )
+        with self.assertRaises(ValidationError):
+            booking.clean()
+
+    def test_extension_conflicts_with_bookings_written_by_another_process(self):
+        booking = self.create_booking(self.car, self.hours(0), self.hours(2))
+        other = self.create_booking(self.car, self.hours(10), self.hours(12))
+        availability_index.ensure_loaded([self.car.id])
+        Booking.objects.filter(id=other.id).update(start_time=self.hours(3), end_time=self.hours(5))
+
+        response = self.client.patch(
+            f'/api/booking/{booking.id}/extend/', {'new_end_time': self.hours(4).isoformat()},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()['canceled_bookings']], [str(other.id)])
+        other.refresh_from_db()
+        self.assertEqual(other.status, Booking.STATUS_PENDING_CONFLICT)
+
+    def test_extension_rejected_by_the_overlap_guard_is_a_conflict(self):
+        booking = self.create_booking(self.car, self.hours(0), self.hours(2))
+        rejected = ValidationError('This vehicle is already booked for the selected time.')
+        with mock.patch.object(Booking, 'save', side_effect=rejected):
+            response = self.client.patch(
+                f'/api/booking/{booking.id}/extend/', {'new_end_time': self.hours(4).isoformat()},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 409)
+
+
+class FreeSlotsViewTests(FixturesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.car = self.create_car()
+        self.t0 = datetime(2030, 1, 1, 8, tzinfo=dt_timezone.utc)
+
+    def get(self, **params):
+        return self.client.get('/api/availability/free-slots/', {'car_id': self.car.id, **params})
+
+    def test_finds_the_gaps_between_bookings(self):
+        self.create_booking(self.car, self.t0 + timedelta(hours=2), self.t0 + timedelta(hours=4))
+        response = self.get(duration_hours=1, horizon_hours=8, **{'from': self.t0.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        # The new booking's 30 minute buffer must fit as well
+        self.assertEqual(
+            [(row['start'], row['free_until']) for row in response.json()['results']],
+            [
+                (self.t0.isoformat(), (self.t0 + timedelta(hours=2)).isoformat()),
+                ((self.t0 + timedelta(hours=4)).isoformat(), (self.t0 + timedelta(hours=8)).isoformat()),
+            ],
+        )
+
+    def test_rejects_unusable_durations_and_horizons(self):
+        for params in [
+            {'duration_hours': 'inf'}, {'duration_hours': 'nan'}, {'duration_hours': '1e300'},
+            {'duration_hours': '-1'}, {'duration_hours': 1, 'horizon_hours': 'nan'},
+            {'duration_hours': 1, 'horizon_hours': '0'}, {'duration_hours': 1, 'from': '9999-12-31T00:00:00+00:00'},
+        ]:
+            with self.subTest(**params):
+                self.assertEqual(self.get(**params).status_code, 400)
+
+    def test_caps_the_horizon(self):
+        response = self.get(duration_hours=1, horizon_hours='inf', **{'from': self.t0.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        horizon_end = datetime.fromisoformat(response.json()['horizon_end'])
+        self.assertEqual(horizon_end - self.t0, timedelta(hours=MAX_FREE_SLOT_HORIZON_HOURS))
+
+    def test_naive_from_is_read_in_the_current_time_zone(self):
+        response = self.get(duration_hours=1, **{'from': '2030-01-01T08:00:00'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['horizon_start'], self.t0.isoformat())
+
+
+class OCRJobTests(FixturesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        ocr_result_cache.local.clear()
+        image_bytes = b'license image'
+        self.job = OCRJob.objects.create(
+            digest=ocr_result_cache.digest(image_bytes),
+            path=default_storage.save('driver_licenses/temp/license.jpg', ContentFile(image_bytes)),
+        )
+
+    def process(self, **check):
+        with mock.patch.object(jobs, 'is_driver_license_easyocr', **check):
+            job = jobs.process_job(self.job.id)
+        self.job.refresh_from_db()
+        return job
+
+    def test_valid_license(self):
+        self.process(return_value=(True, '2031-05-01', False))
+        self.assertEqual(self.job.status, OCRJob.STATUS_VALID)
+        self.assertEqual((self.job.expiry_date, self.job.is_expired, self.job.attempts), ('2031-05-01', False, 1))
+        self.assertIsNotNone(self.job.finished_at)
+        self.assertEqual(ocr_result_cache.get(self.job.digest)['path'], self.job.path)
+
+    def test_invalid_license_drops_the_image(self):
+        path = self.job.path
+        self.process(return_value=(False, None, None))
+        self.assertEqual((self.job.status, self.job.path), (OCRJob.STATUS_INVALID, ''))
+        self.assertFalse(default_storage.exists(path))
+        self.assertEqual(ocr_result_cache.get(self.job.digest), {'is_valid': False})
+
+    def test_unreadable_image_fails(self):
+        self.process(side_effect=ValueError('cannot identify image file'))
+        self.assertEqual(self.job.status, OCRJob.STATUS_FAILED)
+        self.assertFalse(self.job.retryable)
+        self.assertIn('ValueError', self.job.error)
+
+    def test_claimed_job_is_not_processed_again(self):
+        OCRJob.objects.filter(id=self.job.id).update(status=OCRJob.STATUS_PROCESSING)
+        self.assertIsNone(self.process(return_value=(True, None, None)))
+        self.assertEqual((self.job.status, self.job.attempts), (OCRJob.STATUS_PROCESSING, 0))
+
+    @override_settings(OCR_JOB_MAX_ATTEMPTS=2)
+    def test_worker_outage_retries_then_fails_as_retryable(self):
+        unavailable = OCRWorkerUnavailable('OCR worker unreachable')
+        self.process(side_effect=unavailable)
+        self.assertEqual((self.job.status, self.job.attempts), (OCRJob.STATUS_PENDING, 1))
+
+        self.process(side_effect=unavailable)
+        self.assertEqual((self.job.status, self.job.attempts), (OCRJob.STATUS_FAILED, 2))
+        self.assertTrue(self.job.retryable)
+        response = self.client.get(f'/api/driver-license-jobs/{self.job.id}/')
+        self.assertEqual((response.json()['status'], response.json()['retryable']), (OCRJob.STATUS_FAILED, True))
+
+    @override_settings(OCR_JOB_RETRY_DELAY=5)
+    def test_pool_resubmits_jobs_left_pending_with_backoff(self):
+        with mock.patch.object(jobs, 'is_driver_license_easyocr', side_effect=OCRWorkerUnavailable('down')), \
+                mock.patch.object(jobs, 'retry_later') as retry_later:
+            jobs._run(self.job.id)
+        retry_later.assert_called_once()
+        self.assertEqual(retry_later.call_args.args[0].id, self.job.id)
+        self.assertEqual([jobs.retry_delay(attempts) for attempts in (1, 2, 3)], [5, 10, 20])
+
+
+class BookingConflictAdminTests(FixturesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        t0 = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        self.window = (t0, t0 + timedelta(hours=2))
+        car = self.create_car()
+        original = self.create_booking(car, t0 - timedelta(hours=2), t0 - timedelta(hours=1))
+        conflicting = self.create_booking(car, *self.window)
+        Booking.objects.filter(id=conflicting.id).update(status=Booking.STATUS_PENDING_CONFLICT)
+        self.conflict = BookingConflict.objects.create(original_booking=original, conflicting_booking=conflicting)
+        self.alternative = self.create_car()
+        CarHotelLink.objects.create(car=self.alternative, hotel=self.hotel)
+
+    def resolve(self):
+        request = RequestFactory().post('/')
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        conflict = BookingConflict.objects.get(id=self.conflict.id)
+        conflict.status = BookingConflict.STATUS_RESOLVED
+        form = mock.Mock(changed_data=['status'], cleaned_data={
+            'hotel_car_choice': f'{self.hotel.id}|{self.alternative.id}',
+        })
+        with mock.patch.object(Email, 'send_conflict_resolved_email'):
+            admin.site._registry[BookingConflict].save_model(request, conflict, form, change=True)
+        self.conflict.refresh_from_db()
+        self.conflict.conflicting_booking.refresh_from_db()
+        return [str(message) for message in get_messages(request)]
+
+    def test_moves_the_booking_to_the_selected_car(self):
+        self.assertEqual(self.resolve(), [])
+        self.assertEqual(self.conflict.status, BookingConflict.STATUS_RESOLVED)
+        self.assertEqual(self.conflict.conflicting_booking.vehicle_id, self.alternative.id)
+        self.assertEqual(self.conflict.conflicting_booking.status, Booking.STATUS_ACTIVE)
+
+    def test_selected_car_booked_since_the_suggestion_is_an_error(self):
+        self.create_booking(self.alternative, *self.window)
+        errors = self.resolve()
+        self.assertEqual(len(errors), 1)
+        self.assertIn('already booked', errors[0])
+        self.assertEqual(self.conflict.status, BookingConflict.STATUS_PENDING)
+        self.assertEqual(self.conflict.conflicting_booking.status, Booking.STATUS_PENDING_CONFLICT)
+
+    def test_selected_car_taken_out_of_service_is_an_error(self):
+        Car.objects.filter(id=self.alternative.id).update(status='outofservice')
+        self.assertIn('no longer available', self.resolve()[0])
+        self.assertEqual(self.conflict.status, BookingConflict.STATUS_PENDING)
+
+
+class BookingOverlapGuardTests(FixturesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.car = self.create_car()
+        self.t0 = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        self.booking = self.create_booking(self.car, self.t0, self.t0 + timedelta(hours=2))
+
+    def test_save_rejects_an_overlapping_booking(self):
+        with self.assertRaises(ValidationError):
+            self.create_booking(self.car, self.t0 + timedelta(hours=1), self.t0 + timedelta(hours=3))
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_database_rejects_writes_that_skip_save(self):
+        overlapping = Booking(
+            vehicle=self.car, hotel=self.hotel, guest=self.guest, buffer_time=0,
+            start_time=self.t0 + timedelta(hours=1), end_time=self.t0 + timedelta(hours=3),
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Booking.objects.bulk_create([overlapping])
+
+    def test_cancelled_and_adjacent_bookings_are_allowed(self):
+        self.create_booking(self.car, self.t0, self.t0 + timedelta(hours=2), status=Booking.STATUS_CANCELLED)
+        self.create_booking(self.car, self.t0 + timedelta(hours=2), self.t0 + timedelta(hours=3))
+        self.assertEqual(Booking.objects.count(), 3)
+
+    def test_migration_lists_existing_overlaps(self):
+        find_overlaps = importlib.import_module('api.migrations.0004_booking_overlap_guard').find_overlaps
+        h = lambda n: self.t0 + timedelta(hours=n)
+        rows = [
+            ('a', 1, h(0), h(5)), ('b', 1, h(1), h(2)), ('c', 1, h(4), h(6)), ('d', 1, h(6), h(7)),
+            ('e', 2, h(0), h(1)), ('f', 2, h(1), h(2)),
+        ]
+        self.assertEqual(find_overlaps(rows), [('a', 'b'), ('a', 'c')])
+
+
+class GeohashTests(SimpleTestCase):
+
+    def test_encode(self):
+        self.assertEqual(geohash.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(geohash.encode(-90, -180, 3), '000')
+
+    def test_migration_encoder_matches(self):
+        migration = importlib.import_module('api.migrations.0007_hotel_geohash')
+        rng = random.Random(3)
+        for _ in range(200):
+            lat, lon = rng.uniform(-90, 90), rng.uniform(-180, 180)
+            self.assertEqual(migration.encode(lat, lon), geohash.encode(lat, lon))
+
+    def test_covering_cells_contain_every_point_in_the_circle(self):
+        rng = random.Random(4)
+        for lat, lon, radius in [(45.46, 9.19, 1), (45.46, 9.19, 50), (0.0, 179.9, 30), (-33.87, 151.21, 500), (89.5, 0.0, 100)]:
+            with self.subTest(lat=lat, lon=lon, radius=radius):
+                cells = geohash.covering_cells(lat, lon, radius)
+                self.assertLessEqual(len(cells), geohash.MAX_COVERING_CELLS)
+                span = radius / 111.32
+                checked = 0
+                for _ in range(2000):
+                    point_lat = max(min(lat + rng.uniform(-span, span), 90), -90)
+                    point_lon = (lon + rng.uniform(-1, 1) * min(span / max(math.cos(math.radians(point_lat)), 0.01), 180) + 180) % 360 - 180
+                    if haversine_km(lat, lon, point_lat, point_lon) > radius:
+                        continue
+                    checked += 1
+                    point_hash = geohash.encode(point_lat, point_lon)
+                    self.assertTrue(any(point_hash.startswith(cell) for cell in cells), (point_lat, point_lon))
+                self.assertGreater(checked, 100)
+
+
+class OccupancyGridTests(SimpleTestCase):
+
+    def test_run_length_encoding_round_trips(self):
+        rng = random.Random(5)
+        grids = [[[rng.random() < density for _ in range(40)] for _ in range(6)] for density in (0, 0.2, 0.7, 1)]
+        grids.append([[True, False, True], [False, False, False], [True, True, True]])
+        for grid in grids:
+            with self.subTest(grid=grid):
+                decoded = [[False] * len(grid[0]) for _ in grid]
+                for row, runs in enumerate(run_length_encode(np.array(grid))):
+                    for first, length in runs:
+                        self.assertGreater(length, 0)
+                        for slot in range(first, first + length):
+                            decoded[row][slot] = True
+                self.assertEqual(decoded, grid)
+
+    def test_grid_matches_a_slot_by_slot_check(self):
+        rng = random.Random(6)
+        start = datetime(2030, 1, 1, tzinfo=dt_timezone.utc)
+        slot = parse_slot('15m')
+        car_ids = ['a', 'b', 'c']
+        bookings = []
+        for _ in range(30):
+            booking_start = start + timedelta(minutes=rng.randint(-120, 24 * 60))
+            bookings.append((rng.choice(car_ids + ['other']), booking_start, booking_start + timedelta(minutes=rng.randint(1, 300))))
+
+        end = start + timedelta(hours=24)
+        grid = build_occupancy_grid(car_ids, bookings, start, end, slot)
+        self.assertEqual(grid.shape, (3, 96))
+        for row, car_id in enumerate(car_ids):
+            for index in range(96):
+                slot_start = start + index * slot
+                expected = any(
+                    b_car == car_id and b_start < slot_start + slot and b_end > slot_start
+                    for b_car, b_start, b_end in bookings
+                )
+                self.assertEqual(bool(grid[row, index]), expected, (car_id, index))
+
+
+class OccupancyViewTests(FixturesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.car = self.create_car()
+        self.booking = self.create_booking(
+            self.car, datetime(2030, 1, 1, 10, tzinfo=dt_timezone.utc), datetime(2030, 1, 1, 11, tzinfo=dt_timezone.utc)
+        )
+        CarHotelLink.objects.create(car=self.car, hotel=self.hotel)
+
+    def get(self, start, end):
+        response = self.client.get(f'/api/hotels/{self.hotel.id}/occupancy/', {'from': start, 'to': end, 'slot': '15m'})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_aware_bounds(self):
+        data = self.get('2030-01-01T09:00:00+00:00', '2030-01-01T12:00:00+00:00')
+        self.assertEqual(data['slots'], 12)
+        self.assertEqual(data['cars'][0]['booked_runs'], [[4, 4]])
+
+    @override_settings(TIME_ZONE='Europe/Rome')
+    def test_naive_bounds_are_read_in_the_current_timezone(self):
+        data = self.get('2030-01-01T09:00:00', '2030-01-01T12:00:00')
+        self.assertEqual(data['from'], '2030-01-01T09:00:00+01:00')
+        self.assertEqual(data['cars'][0]['booked_runs'], [[8, 4]])
+
+
+def loop_price(price_per_hour, max_price_per_day, start_time, end_time):
+    """The 24-hour block loop PriceCalculationView used before quote_price()."""
+    total_price = 0.0
+    current_time = start_time
+    while current_time < end_time:
+        block_end_time = min(current_time + timedelta(hours=24), end_time)
+        hours_in_block = (block_end_time - current_time).total_seconds() / 3600
+        total_price += min(hours_in_block * price_per_hour, max_price_per_day)
+        current_time = block_end_time
+    return total_price
+
+
+class PricingTests(SimpleTestCase):
+
+    def setUp(self):
+        rng = random.Random(7)
+        start = datetime(2030, 1, 1, tzinfo=dt_timezone.utc)
+        self.cases = [(12.5, 80.0, start, start + timedelta(hours=hours)) for hours in (0, 0.25, 6.4, 24, 25, 48, 72.5)]
+        self.cases += [
+            (rng.choice([0, 3.0, 9.99, 40.0]), rng.choice([0, 25.0, 100.0, 1000.0]),
+             start, start + timedelta(minutes=rng.randint(-60, 60 * 24 * 30)))
+            for _ in range(300)
+        ]
+
+    def test_closed_form_matches_the_block_loop(self):
+        for case in self.cases:
+            with self.subTest(case=case):
+                self.assertAlmostEqual(quote_price(*case), loop_price(*case), places=6)
+
+    def test_vectorized_matches_the_block_loop(self):
+        rates, caps, starts, ends = zip(*self.cases)
+        hours = [(end - start).total_seconds() / 3600 for start, end in zip(starts, ends)]
+        expected = [loop_price(*case) for case in self.cases]
+        np.testing.assert_allclose(quote_prices(rates, caps, hours), expected, atol=1e-6)
+
+
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'quotes': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'quotes'},
+}
+
+
+class PriceQuoteCacheTests(FixturesTestCase):
+
+    def test_version_bump_orphans_cached_quotes(self):
+        cache = PriceQuoteCache()
+        compute = mock.Mock(side_effect=[10.0, 20.0])
+        self.assertEqual(cache.get_or_compute('car', 3600, compute), 10.0)
+        self.assertEqual(cache.get_or_compute('car', 3600.2, compute), 10.0)
+        cache.bump_version('car')
+        self.assertEqual(cache.get_or_compute('car', 3600, compute), 20.0)
+        self.assertEqual(compute.call_count, 2)
+
+    @override_settings(CACHES=SHARED_CACHES, PRICE_QUOTE_CACHE_BACKEND='quotes')
+    def test_version_bump_reaches_other_processes_through_the_shared_cache(self):
+        here, elsewhere = PriceQuoteCache(), PriceQuoteCache()
+        self.assertEqual(elsewhere.get_or_compute('car', 3600, lambda: 10.0), 10.0)
+        here.bump_version('car')
+        self.assertEqual(elsewhere.get_or_compute('car', 3600, lambda: 20.0), 20.0)
+
+    def test_price_change_invalidates_quotes_served_by_the_view(self):
+        car = self.create_car(price_per_hour=10, max_price_per_day=500)
+        start_time = timezone.now() + timedelta(days=1)
+        data = {'vehicle': str(car.id), 'start_time': start_time.isoformat(),
+                'end_time': (start_time + timedelta(hours=3)).isoformat()}
+        self.assertEqual(self.client.post('/api/calculate-price/', data).json()['total_price'], 30.0)
+
+        version = price_quote_cache.version(car.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            car.model = 'Renamed'
+            car.save()
+        self.assertEqual(price_quote_cache.version(car.id), version)
+        with self.captureOnCommitCallbacks(execute=True):
+            car.price_per_hour = 20
+            car.save()
+        self.assertEqual(price_quote_cache.version(car.id), version + 1)
+        self.assertEqual(self.client.post('/api/calculate-price/', data).json()['total_price'], 60.0)
+
+
+class OCRResultCacheTests(FixturesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        ocr_result_cache.local.clear()
+        patcher = mock.patch.object(guest_views, 'is_driver_license_easyocr', return_value=(True, '2031-05-01', False))
+        self.check = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upload(self, *images, url='/api/upload-driver-license-temp/'):
+        files = [SimpleUploadedFile(f'license{i}.jpg', image, content_type='image/jpeg') for i, image in enumerate(images)]
+        return self.client.post(url, {'temp_driver_license': files})
+
+    def test_identical_bytes_skip_ocr(self):
+        first = self.upload(b'front')
+        second = self.upload(b'front')
+        self.assertEqual(self.check.call_count, 1)
+        self.assertEqual(first.json(), second.json())
+        self.upload(b'other')
+        self.assertEqual(self.check.call_count, 2)
+
+    def test_image_sets_are_cached_as_a_whole(self):
+        self.upload(b'front', b'back')
+        self.upload(b'front', b'back')
+        self.assertEqual(self.check.call_count, 1)
+        self.upload(b'back', b'front')
+        self.upload(b'front')
+        self.assertEqual(self.check.call_count, 3)
+
+    def test_cleaned_up_temp_file_is_checked_again(self):
+        self.upload(b'front')
+        path = ocr_result_cache.get(ocr_result_cache.digest(b'front'))['path']
+        default_storage.delete(path)
+        response = self.upload(b'front')
+        self.assertEqual(self.check.call_count, 2)
+        self.assertTrue(default_storage.exists(ocr_result_cache.get(ocr_result_cache.digest(b'front'))['path']))
+        self.assertNotEqual(response.json()['Temp_path'], default_storage.url(path))
+
+    def test_background_job_for_known_bytes_is_done_at_once(self):
+        self.upload(b'front')
+        with mock.patch.object(guest_views, 'enqueue_job') as enqueue_job:
+            response = self.upload(b'front', url='/api/driver-license-jobs/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], OCRJob.STATUS_VALID)
+        enqueue_job.assert_not_called()
+
+
+LICENSE_TEXT = 'PATENTE DI GUIDA 4a. 01/02/2021 4b. 01/02/2031'
+
+
+@override_settings(OCR_TIERED=True, OCR_LANGUAGES=['en', 'de', 'fr', 'it'], OCR_FAST_LANGUAGES=['en'],
+                   OCR_FAST_MAX_IMAGE_SIDE=1024, OCR_MAX_IMAGE_SIDE=1600)
+class TieredOCRTests(SimpleTestCase):
+
+    def recognize(self, fast_text, full_text='full pass text'):
+        passes = []
+
+        def read(images, tier):
+            passes.append(tier)
+            return [fast_text if tier == FAST else full_text for _ in images]
+
+        return recognize_license_text([b'front', b'back'], read=read), passes
+
+    def test_fast_pass_is_enough_for_a_license_with_expiry(self):
+        self.assertEqual(self.recognize(LICENSE_TEXT), (f'{LICENSE_TEXT} {LICENSE_TEXT}', [FAST]))
+
+    def test_falls_back_to_the_full_pass(self):
+        for fast_text in ['', 'some receipt', 'PATENTE DI GUIDA without a date']:
+            with self.subTest(fast_text=fast_text):
+                self.assertEqual(self.recognize(fast_text), ('full pass text full pass text', [FAST, FULL]))
+
+    @override_settings(OCR_TIERED=False)
+    def test_untiered_reads_once_with_every_language(self):
+        self.assertEqual(self.recognize(LICENSE_TEXT)[1], [FULL])
+
+    def test_passes_use_their_languages_and_image_size(self):
+        image = BytesIO()
+        Image.new('RGB', (3000, 1500), 'white').save(image, format='PNG')
+        backend = mock.Mock()
+        backend.read.side_effect = lambda images, languages: [['text'] for _ in images]
+        with mock.patch.object(ocr, 'get_backend', return_value=backend):
+            for tier, languages, max_side in [(FAST, ['en'], 1024), (FULL, ['en', 'de', 'fr', 'it'], 1600)]:
+                with self.subTest(tier=tier):
+                    self.assertEqual(ocr.read_texts([image.getvalue()], tier), ['text'])
+                    images, read_languages = backend.read.call_args.args
+                    self.assertEqual(read_languages, languages)
+                    self.assertEqual(max(images[0].size), max_side)
+
+    @override_settings(OCR_FAST_LANGUAGES=[])
+    def test_fast_pass_without_languages_uses_the_full_list(self):
+        self.assertEqual(ocr.ocr_languages(FAST), ['en', 'de', 'fr', 'it'])
+
+
+class StubOCRPool:
+    """Runs pool.apply() calls in the worker thread, with the OCR itself replaced by `read_texts`."""
+
+    def __init__(self, read_texts):
+        self.read_texts = read_texts
+
+    def apply(self, func, args):
+        return self.read_texts(*args)
+
+
+class OCRWorkerTests(SimpleTestCase):
+    """The web-process client against the real ocr_worker accept loop, with a stub pool."""
+
+    def setUp(self):
+        self.server = socket.create_server(('127.0.0.1', 0))
+        self.address = f'127.0.0.1:{self.server.getsockname()[1]}'
+        self.stderr = StringIO()
+        self.pool = StubOCRPool(lambda images, tier: [f'{tier}:{image.decode()}' for image in images])
+        worker = OCRWorkerCommand(stdout=StringIO(), stderr=self.stderr)
+        thread = threading.Thread(target=worker.serve_forever, args=(self.server, self.pool), daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(self.server.close)
+        self.addCleanup(self.server.shutdown, socket.SHUT_RDWR)
+
+    def ocr_texts(self, images, tier=FULL):
+        with override_settings(OCR_WORKER_ADDRESS=self.address, OCR_WORKER_TIMEOUT=1):
+            return ocr.ocr_texts(images, tier)
+
+    def test_round_trip(self):
+        self.assertEqual(self.ocr_texts([b'a', b'b'], FAST), ['fast:a', 'fast:b'])
+        self.assertEqual(self.ocr_texts([b'c']), ['full:c'])
+
+    def test_worker_errors_are_raised(self):
+        self.pool.read_texts = mock.Mock(side_effect=ValueError('bad image'))
+        with self.assertRaisesMessage(RuntimeError, 'ValueError: bad image'):
+            self.ocr_texts([b'a'])
+
+    def test_wrong_authkey_is_rejected(self):
+        with self.assertRaises(AuthenticationError):
+            Client(self.server.getsockname(), authkey=b'wrong')
+        self.assertEqual(self.ocr_texts([b'a']), ['full:a'])
+        deadline = time.monotonic() + 5
+        while 'Rejected OCR client' not in self.stderr.getvalue() and time.monotonic() < deadline:
+            time.sleep(0.01)  # Logged by the worker thread after it answers
+        self.assertIn('Rejected OCR client', self.stderr.getvalue())
+
+    def test_a_stalled_client_does_not_block_others(self):
+        with socket.create_connection(self.server.getsockname()):
+            self.assertEqual(self.ocr_texts([b'a']), ['full:a'])
+
+    def test_a_stalled_worker_times_out(self):
+        silent = socket.create_server(('127.0.0.1', 0))  # Accepts connections but never answers the handshake
+        self.addCleanup(silent.close)
+        started = time.monotonic()
+        with override_settings(OCR_WORKER_ADDRESS=f'127.0.0.1:{silent.getsockname()[1]}', OCR_WORKER_TIMEOUT=0.2):
+            with self.assertRaises(OCRWorkerUnavailable):
+                ocr.ocr_texts([b'a'])
+        self.assertLess(time.monotonic() - started, 5)
+
+
+class AvailabilityReadTests(FixturesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.hotel = self.create_hotels([(45.46, 9.19)])[0]
+        self.car = self.create_car()
+        CarHotelLink.objects.create(car=self.car, hotel=self.hotel)
+        start_time = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        self.window = (start_time, start_time + timedelta(hours=2))
+
+    def get(self):
+        response = self.client.get('/api/availability/', {
+            'hotel_ids': str(self.hotel.id),
+            'start_time': self.window[0].isoformat(), 'end_time': self.window[1].isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        return response['X-Query-Count'], response.json()['results'][0]['cars'][0]['available']
+
+    def test_answers_from_the_index_once_loaded(self):
+        self.assertEqual(self.get(), ('2', True))
+        self.assertEqual(self.get(), ('1', True))
+
+    def test_follows_booking_writes(self):
+        self.get()
+        booking = self.create_booking(self.car, *self.window)
+        self.assertEqual(self.get(), ('1', False))
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.status = Booking.STATUS_CANCELLED
+            booking.save()
+        self.assertEqual(self.get(), ('1', True))
+
+
+class HotelSpatialIndexRebuildTests(SimpleTestCase):
+    """Rebuilds against an in-memory hotel list, so reader threads need no database."""
+
+    def hotels(self, count):
+        return [Hotel(latitude=45.46 + i * 1e-4, longitude=9.19) for i in range(count)]
+
+    def test_edit_during_a_rebuild_triggers_another(self):
+        index = HotelSpatialIndex()
+        loads = []
+
+        def load(**kwargs):
+            loads.append(len(loads))
+            if len(loads) == 1:
+                index.mark_dirty()  # A hotel saved while the first build reads the table
+            return self.hotels(len(loads))
+
+        with mock.patch.object(Hotel, 'objects', mock.Mock(filter=load)):
+            self.assertEqual(index.size(), 1)
+            self.assertEqual(index.size(), 2)
+            self.assertEqual(index.size(), 2)
+        self.assertEqual(len(loads), 2)
+
+    def test_queries_during_rebuilds_see_one_whole_grid(self):
+        index = HotelSpatialIndex()
+        sizes = [50, 80]
+        builds = iter(range(10 ** 6))
+        stop = threading.Event()
+        errors = []
+
+        def load(**kwargs):
+            return self.hotels(sizes[next(builds) % 2])
+
+        def read():
+            while not stop.is_set():
+                try:
+                    found = len(index.within(45.46, 9.19, 5))
+                    if found not in sizes:
+                        errors.append(found)
+                except Exception as e:
+                    errors.append(e)
+
+        with mock.patch.object(Hotel, 'objects', mock.Mock(filter=load)):
+            readers = [threading.Thread(target=read) for _ in range(4)]
+            for reader in readers:
+                reader.start()
+            deadline = time.monotonic() + 0.5
+            while time.monotonic() < deadline:
+                index.mark_dirty()
+                time.sleep(0.001)
+            stop.set()
+            for reader in readers:
+                reader.join()
+        self.assertEqual(errors[:3], [])
+
+    def test_shared_version_marks_other_processes_dirty(self):
+        # Two indexes stand in for two worker processes sharing one cache
+        first, second = HotelSpatialIndex(), HotelSpatialIndex()
+        loads = []
+
+        def load(**kwargs):
+            loads.append(len(loads))
+            return self.hotels(1)
+
+        with mock.patch.object(Hotel, 'objects', mock.Mock(filter=load)):
+            first.size(), second.size()
+            first.mark_dirty()
+            second.size()
+            self.assertEqual(len(loads), 2)  # Without a shared cache only the TTL reaches the other process
+
+            with override_settings(CACHES=SHARED_CACHES, HOTEL_SPATIAL_INDEX_CACHE_BACKEND='default'):
+                first.mark_dirty()
+                second.size()
+                second.size()
+                self.assertEqual(len(loads), 3)
+
+
+@override_settings(GEOCODER_BACKEND='local', GEOCODER_LOCAL_COORDINATES={'Via Torino 10, Milano': (45.4613, 9.1843)})
+class GeocodeHotelsTests(FixturesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        reset_geocoder()
+        self.addCleanup(reset_geocoder)
+
+    def create_unlocated_hotels(self, locations):
+        hotels = self.create_hotels([(0, 0)] * len(locations))
+        for hotel, location in zip(hotels, locations):
+            Hotel.objects.filter(id=hotel.id).update(location=location, latitude=None, longitude=None, geohash='')
+        return hotels
+
+    def test_geocode_reads_through_the_cache(self):
+        lookup = mock.Mock(return_value=mock.Mock(latitude=45.5, longitude=9.2))
+        self.assertEqual(geocode('Piazza Duomo, Milano', lookup=lookup), (45.5, 9.2))
+        cached = geocode('  piazza duomo ,milano ', lookup=lookup)
+        self.assertEqual((float(cached.latitude), float(cached.longitude)), (45.5, 9.2))
+        self.assertEqual(lookup.call_count, 1)
+
+        lookup.return_value = None
+        self.assertIsNone(geocode('Nowhere', lookup=lookup))
+        self.assertIsNone(geocode('nowhere', lookup=lookup))
+        self.assertEqual(lookup.call_count, 2)
+        self.assertIsNone(GeocodeCache.objects.get(address='nowhere').latitude)
+
+    def test_command_backfills_missing_coordinates(self):
+        located = self.create_hotels([(45.0, 9.0)])[0]
+        hotels = self.create_unlocated_hotels(['Via Torino 10, Milano', 'via torino 10,  milano', 'Unknown street'])
+        out = StringIO()
+        with mock.patch.object(HotelSpatialIndex, 'mark_dirty') as mark_dirty, \
+                self.captureOnCommitCallbacks(execute=True):
+            call_command('geocode_hotels', '--delay', '0', stdout=out)
+
+        self.assertIn('Geocoded 1 of 2 addresses (1 unresolved, 0 failed)', out.getvalue())
+        self.assertTrue(mark_dirty.called)
+        for hotel in hotels[:2]:
+            hotel.refresh_from_db()
+            self.assertEqual((float(hotel.latitude), float(hotel.longitude)), (45.4613, 9.1843))
+            self.assertEqual(hotel.geohash, geohash_of(45.4613, 9.1843))
+        hotels[2].refresh_from_db()
+        self.assertIsNone(hotels[2].latitude)
+        located.refresh_from_db()
+        self.assertEqual(float(located.latitude), 45.0)
+        self.assertEqual(GeocodeCache.objects.count(), 2)
+
+        # Cached addresses, resolved or not, are not looked up again
+        with mock.patch('api.hotel.geocoding.LocalGeocoder.geocode', return_value=None) as lookup:
+            call_command('geocode_hotels', '--delay', '0', stdout=StringIO())
+            self.assertFalse(lookup.called)
+            call_command('geocode_hotels', '--delay', '0', '--retry-unresolved', stdout=StringIO())
+            lookup.assert_called_once_with('Unknown street')
+
+
+class CarCalendarTests(FixturesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.car = self.create_car()
+        self.day = date(2030, 3, 10)
+        self.midnight = datetime(2030, 3, 11, tzinfo=dt_timezone.utc)
+
+    def days(self, car=None):
+        return {
+            row.date: (row.booked_minutes, row.first_free, row.last_free)
+            for row in CarDayAvailability.objects.filter(car=car or self.car)
+        }
+
+    def save(self, booking):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.save()
+
+    def test_summarize_day(self):
+        start = datetime(2030, 3, 10, tzinfo=dt_timezone.utc)
+        self.assertEqual(
+            summarize_day(self.day, [(start + timedelta(hours=8), start + timedelta(hours=9, seconds=1))]),
+            (61, dt_time(0, 0), dt_time(23, 59)),
+        )
+        self.assertEqual(summarize_day(self.day, [(start, start + timedelta(hours=6))]), (360, dt_time(6, 0), dt_time(23, 59)))
+        self.assertEqual(summarize_day(self.day, [(start - timedelta(hours=1), start + timedelta(days=2))]), (1440, None, None))
+
+    def test_booking_spanning_midnight(self):
+        self.create_booking(self.car, self.midnight - timedelta(hours=2), self.midnight + timedelta(hours=3))
+        self.assertEqual(self.days(), {
+            self.day: (120, dt_time(0, 0), dt_time(21, 59)),
+            self.day + timedelta(days=1): (180, dt_time(3, 0), dt_time(23, 59)),
+        })
+
+    def test_buffer_extends_the_booked_end(self):
+        self.create_booking(self.car, self.midnight - timedelta(hours=2), self.midnight - timedelta(hours=1), buffer_time=90)
+        self.assertEqual(self.days(), {
+            self.day: (120, dt_time(0, 0), dt_time(21, 59)),
+            self.day + timedelta(days=1): (30, dt_time(0, 30), dt_time(23, 59)),
+        })
+
+    def test_leaving_the_blocking_statuses_clears_the_days(self):
+        booking = self.create_booking(self.car, self.midnight - timedelta(hours=2), self.midnight + timedelta(hours=3))
+        booking.status = Booking.STATUS_CANCELLED
+        self.save(booking)
+        self.assertEqual(self.days(), {})
+
+    def test_vehicle_reassignment_refreshes_both_cars(self):
+        other = self.create_car()
+        booking = self.create_booking(self.car, self.midnight - timedelta(hours=2), self.midnight + timedelta(hours=3))
+        booking.vehicle = other
+        booking.start_time += timedelta(days=1)
+        booking.end_time += timedelta(days=1)
+        self.save(booking)
+        self.assertEqual(self.days(), {})
+        self.assertEqual(set(self.days(other)), {self.day + timedelta(days=1), self.day + timedelta(days=2)})
+
+    def test_rebuild_matches_incremental_refresh(self):
+        rng = random.Random(8)
+        cars = [self.car, self.create_car()]
+        start = datetime(2030, 3, 1, tzinfo=dt_timezone.utc)
+        bookings = []
+        for car in cars:
+            cursor = start
+            for _ in range(12):
+                cursor += timedelta(minutes=rng.randint(0, 36 * 60))
+                end = cursor + timedelta(minutes=rng.randint(15, 40 * 60))
+                bookings.append(self.create_booking(car, cursor, end, buffer_time=rng.choice([0, 30])))
+                cursor = end + timedelta(minutes=60)
+        for booking in rng.sample(bookings, 4):
+            booking.status = Booking.STATUS_CANCELLED
+            self.save(booking)
+
+        incremental = {car.id: self.days(car) for car in cars}
+        self.assertTrue(all(incremental.values()))
+        CarDayAvailability.objects.all().delete()
+        call_command('rebuild_car_calendar', '--from', '2030-02-28', '--days', '90', stdout=StringIO())
+        self.assertEqual({car.id: self.days(car) for car in cars}, incremental)
+
+
+class DirtyFieldsMixinTests(FixturesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.car = Car.objects.get(id=self.create_car(price_per_hour=10).id)
+
+    def test_new_instances_have_no_originals(self):
+        car = Car(rental_company=self.company, model='New', plate_number='NEW1')
+        self.assertTrue(car.has_changed('model'))
+        self.assertIsNone(car.original('model'))
+
+    def test_tracks_values_loaded_from_the_database(self):
+        self.assertFalse(self.car.has_changed('model'))
+        self.car.model = 'Changed'
+        self.assertTrue(self.car.has_changed('model'))
+        self.assertEqual(self.car.original('model'), 'Model 0')
+        self.assertEqual(self.car.original('rental_company'), self.company.id)
+
+    def test_save_makes_current_values_the_originals(self):
+        self.car.model = 'Changed'
+        self.car.save()
+        self.assertFalse(self.car.has_changed('model'))
+        self.assertEqual(self.car.original('model'), 'Changed')
+
+    def test_save_with_update_fields_keeps_unwritten_edits_changed(self):
+        self.car.model = 'Changed'
+        self.car.price_per_hour = 99
+        self.car.save(update_fields=['model'])
+        self.assertFalse(self.car.has_changed('model'))
+        self.assertTrue(self.car.has_changed('price_per_hour'))
+        self.assertEqual(self.car.original('price_per_hour'), 10)
+        self.assertEqual(Car.objects.get(id=self.car.id).price_per_hour, 10)
+
+    def test_refresh_from_db_resets_the_originals(self):
+        Car.objects.filter(id=self.car.id).update(model='Elsewhere')
+        self.car.refresh_from_db()
+        self.assertEqual(self.car.original('model'), 'Elsewhere')
+        self.assertFalse(self.car.has_changed('model'))
+
+    def test_deferred_fields_are_read_once_on_demand(self):
+        car = Car.objects.only('id', 'model').get(id=self.car.id)
+        with self.assertNumQueries(1):
+            self.assertEqual(car.original('price_per_hour'), 10)
+            self.assertEqual(car.original('price_per_hour'), 10)
+
+
+class ImagePreprocessingTests(SimpleTestCase):
+
+    def test_applies_the_exif_orientation(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise to display
+        photo = BytesIO()
+        Image.new('RGB', (40, 20), 'white').save(photo, format='JPEG', exif=exif)
+        self.assertEqual(preprocess_image(Image.open(photo)).size, (20, 40))
+
+    def test_downscales_to_the_longest_side(self):
+        image = Image.new('RGB', (3000, 1000), 'white')
+        self.assertEqual(preprocess_image(image, max_side=1600).size, (1600, 533))
+        self.assertEqual(preprocess_image(image, max_side=None).size, (3000, 1000))
+        self.assertEqual(preprocess_image(Image.new('RGB', (800, 600)), max_side=1600).size, (800, 600))
+
+    def test_grayscale_and_contrast(self):
+        image = Image.fromarray(np.tile(np.linspace(100, 150, 64).astype(np.uint8), (8, 1))).convert('RGB')
+        stretched = preprocess_image(image)
+        self.assertEqual(stretched.mode, 'L')
+        self.assertEqual(stretched.getextrema(), (0, 255))
+        self.assertEqual(preprocess_image(image, grayscale=False, autocontrast=False).getextrema(), ((100, 150),) * 3)
+
+    @override_settings(OCR_MAX_IMAGE_SIDE=1200, OCR_GRAYSCALE=False, OCR_AUTOCONTRAST=True)
+    def test_options_come_from_settings_with_overrides(self):
+        self.assertEqual(
+            preprocessing_options(max_side=800),
+            {'max_side': 800, 'grayscale': False, 'autocontrast': True},
+        )
+
+
+class LazyImportTests(SimpleTestCase):
+
+    def test_imports_on_first_attribute_access_only(self):
+        on_import = mock.Mock()
+        with mock.patch.object(importlib, 'import_module', wraps=importlib.import_module) as import_module:
+            colorsys = LazyModule('colorsys', on_import=on_import)
+            self.assertIn('not loaded', repr(colorsys))
+            import_module.assert_not_called()
+
+            self.assertEqual(colorsys.rgb_to_hsv(1, 0, 0), (0, 1, 1))
+            self.assertEqual(colorsys.hsv_to_rgb(0, 0, 1), (1, 1, 1))
+        import_module.assert_called_once_with('colorsys')
+        on_import.assert_called_once()
+        self.assertIn('(loaded)', repr(colorsys))
+
+    def test_concurrent_first_uses_import_once(self):
+        lazy = LazyModule('colorsys')
+        barrier = threading.Barrier(8)
+
+        def use():
+            barrier.wait()
+            lazy.rgb_to_hls(0, 0, 0)
+
+        with mock.patch.object(importlib, 'import_module', wraps=importlib.import_module) as import_module:
+            threads = [threading.Thread(target=use) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(import_module.call_count, 1)
+
+    def test_startup_leaves_heavy_dependencies_unloaded(self):
+        # Django REST framework imports 'requests' itself when it is installed
+        deferred = [module for module in HEAVY_MODULES if module != 'requests']
+        self.assertEqual(BenchmarkStartupCommand()._startup(deferred)['loaded'], [])
+
+    @override_settings(OCR_PRELOAD=True, OCR_WORKER_ADDRESS='')
+    def test_ocr_preload_only_where_ocr_runs_in_process(self):
+        with mock.patch.object(sys, 'argv', ['manage.py', 'process_ocr_jobs']):
+            self.assertFalse(ApiConfig.should_preload_ocr())
+        with mock.patch.object(sys, 'argv', ['manage.py', 'runserver', '--noreload']):
+            self.assertTrue(ApiConfig.should_preload_ocr())
+            with override_settings(OCR_WORKER_ADDRESS='127.0.0.1:9000'):
+                self.assertFalse(ApiConfig.should_preload_ocr())
+        with mock.patch.object(sys, 'argv', ['gunicorn']):
+            self.assertTrue(ApiConfig.should_preload_ocr())
+
+
+class StubOCRBackend(OCRBackend):
+    """Reads a license from images 300 pixels wide and a receipt from any other."""
+
+    name = 'stub'
+
+    def load(self, languages):
+        pass
+
+    def read(self, images, languages):
+        return [
+            ['PATENTE DI GUIDA', '4a. 01/01/2020', '4b. 31/12/2031'] if image.width == 300 else ['RECEIPT', 'TOTAL 12.00']
+            for image in images
+        ]
+
+
+class OCRBackendTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.dict(ocr_backends._backends, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_backend_is_selected_by_setting(self):
+        with override_settings(OCR_BACKEND='paddleocr'):
+            backend = ocr_backends.get_backend()
+            self.assertIsInstance(backend, ocr_backends.PaddleOCRBackend)
+            self.assertIs(ocr_backends.get_backend(), backend)
+        self.assertIsInstance(ocr_backends.get_backend('easyocr'), ocr_backends.EasyOCRBackend)
+        with self.assertRaisesMessage(ValueError, "Unknown OCR_BACKEND: 'tesseract'"):
+            ocr_backends.get_backend('tesseract')
+
+    def test_batches_are_padded_without_resizing(self):
+        padded = ocr_backends.pad_to_common_size([Image.new('L', (30, 10), 0), Image.new('L', (20, 40), 0)])
+        self.assertEqual([image.size for image in padded], [(30, 40), (30, 40)])
+        self.assertEqual(padded[0].getpixel((29, 39)), 255)
+        self.assertEqual(padded[1].getpixel((19, 39)), 0)
+
+    def test_benchmark_measures_a_backend_over_the_labeled_images(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        for name, width in [('a.png', 300), ('b.png', 200), ('c.png', 200)]:
+            Image.new('RGB', (width, 100), 'white').save(f'{directory}/{name}')
+        with open(f'{directory}/labels.csv', 'w') as f:
+            f.write('filename,is_valid,expiry_date\na.png,true,31/12/2031\nb.png,false,\nc.png,yes,01/01/2030\n')
+
+        out = StringIO()
+        with mock.patch.dict(ocr_backends.BACKENDS, {'stub': StubOCRBackend}):
+            call_command(
+                'benchmark_ocr_backends', '--run-backend', 'stub', '--mode', 'full',
+                '--dir', directory, '--labels', f'{directory}/labels.csv', stdout=out,
+            )
+        result = json.loads(out.getvalue())
+        self.assertAlmostEqual(result['valid_accuracy'], 2 / 3)
+        self.assertAlmostEqual(result['expiry_accuracy'], 2 / 3)
+        self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+        self.assertGreater(result['peak_rss_mb'], 0)
+
+    def test_benchmark_recommends_the_fastest_accurate_backend(self):
+        results = {
+            'easyocr': {'load_s': 9, 'p50_ms': 900, 'p95_ms': 1200, 'peak_rss_mb': 900,
+                        'valid_accuracy': 0.96, 'expiry_accuracy': 0.9},
+            'paddleocr': {'load_s': 4, 'p50_ms': 300, 'p95_ms': 500, 'peak_rss_mb': 700,
+                          'valid_accuracy': 0.8, 'expiry_accuracy': 0.8},
+        }
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        Image.new('RGB', (10, 10)).save(f'{directory}/a.png')
+        with open(f'{directory}/labels.csv', 'w') as f:
+            f.write('filename,is_valid,expiry_date\na.png,false,\n')
+
+        out = StringIO()
+        with mock.patch.object(BenchmarkOCRBackendsCommand, 'run_child', side_effect=lambda backend, options: results[backend]):
+            call_command('benchmark_ocr_backends', '--dir', directory, '--labels', f'{directory}/labels.csv', stdout=out)
+        self.assertIn('Fastest backend with at least 95% detection accuracy: easyocr', out.getvalue())
@@ -7,6 +7,7 @@ from api.guest.views import GuestViewSet
 from api.hotel.views import HotelViewSet
 from api.garage.views import CarViewSet
 from api.linkCarandHotel.views import CarHotelLinkViewSet
+from api.availability.views import availability_view, calendar_view, free_slots_view, nearest_cars_view
 
 router = DefaultRouter()
 router.register(r'rental-company', RentalCompanyViewSet)
@@ -19,6 +20,10 @@ router.register(r'carhotellink', CarHotelLinkViewSet, basename='carhotellink')
 
 
 urlpatterns = [
+    path('availability/', availability_view, name='availability'),
+    path('availability/free-slots/', free_slots_view, name='availability-free-slots'),
+    path('availability/calendar/', calendar_view, name='availability-calendar'),
+    path('availability/nearest-cars/', nearest_cars_view, name='availability-nearest-cars'),
     path('', include(router.urls)), 
    
 
@@ -1,9 +1,11 @@
-import qrcode
+from api.lazy import LazyModule
 from io import BytesIO
 from django.core.files.base import ContentFile
 
 from rental_company.models import RentalCompany
 
+qrcode = LazyModule('qrcode')
+
 def generate_qr_code(data):
     """
     Generates a QR code image for the given data.
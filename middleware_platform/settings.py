@@ -186,6 +186,74 @@ else:
 
 
 
+# Availability index and price quote cache
+# Seconds before a car's in-memory booking timeline is reloaded from the database
+AVAILABILITY_INDEX_TTL = int(os.getenv('AVAILABILITY_INDEX_TTL', '60'))
+# Seconds before the in-process hotel spatial index is rebuilt (it is also rebuilt after local hotel edits)
+HOTEL_SPATIAL_INDEX_TTL = int(os.getenv('HOTEL_SPATIAL_INDEX_TTL', '300'))
+# Optional alias from CACHES shared by all workers (e.g. Redis) through which hotel
+# edits mark every process's spatial index dirty; empty = other processes wait for the TTL
+HOTEL_SPATIAL_INDEX_CACHE_BACKEND = os.getenv('HOTEL_SPATIAL_INDEX_CACHE_BACKEND', '')
+# Hotel radius search: 'memory' (in-process index) or 'database' (PostGIS if installed, else geohash prefixes)
+HOTEL_SPATIAL_STRATEGY = os.getenv('HOTEL_SPATIAL_STRATEGY', 'memory')
+# Largest search radius public endpoints accept, and the nearest-cars radius when none is given (km)
+HOTEL_MAX_RADIUS_KM = float(os.getenv('HOTEL_MAX_RADIUS_KM', '500'))
+NEAREST_CARS_DEFAULT_RADIUS_KM = float(os.getenv('NEAREST_CARS_DEFAULT_RADIUS_KM', '50'))
+
+PRICE_QUOTE_CACHE_SIZE = int(os.getenv('PRICE_QUOTE_CACHE_SIZE', '2048'))
+PRICE_QUOTE_CACHE_TTL = int(os.getenv('PRICE_QUOTE_CACHE_TTL', '300'))
+# Optional alias from CACHES shared by all workers (e.g. Redis); empty = in-process only
+PRICE_QUOTE_CACHE_BACKEND = os.getenv('PRICE_QUOTE_CACHE_BACKEND', '')
+# Seconds the alternative cars offered for a booking conflict are reused
+ALTERNATIVE_CARS_CACHE_TTL = int(os.getenv('ALTERNATIVE_CARS_CACHE_TTL', '60'))
+
+# Geocoding: 'nominatim' (OpenStreetMap) or 'local' (offline stand-in reading GEOCODER_LOCAL_COORDINATES)
+GEOCODER_BACKEND = os.getenv('GEOCODER_BACKEND', 'nominatim')
+GEOCODER_USER_AGENT = os.getenv('GEOCODER_USER_AGENT', 'hotel_booking')
+GEOCODER_TIMEOUT = float(os.getenv('GEOCODER_TIMEOUT', '5'))
+# Nominatim's usage policy allows at most one request per second
+GEOCODER_MIN_DELAY = float(os.getenv('GEOCODER_MIN_DELAY', '1'))
+GEOCODER_LOCAL_COORDINATES = {}
+
+# Driver license OCR worker pool (`manage.py ocr_worker`); empty address = run OCR in the web process
+OCR_WORKER_ADDRESS = os.getenv('OCR_WORKER_ADDRESS', '')
+OCR_WORKER_AUTHKEY = os.getenv('OCR_WORKER_AUTHKEY', SECRET_KEY)
+OCR_WORKER_TIMEOUT = float(os.getenv('OCR_WORKER_TIMEOUT', '30'))
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', '2'))
+# OCR engine for license checks: 'easyocr' or 'paddleocr' (PaddleX OCR pipeline); compare with `manage.py benchmark_ocr_backends`
+OCR_BACKEND = os.getenv('OCR_BACKEND', 'easyocr')
+# Recognition model of the PaddleX pipeline; empty = the pipeline default
+OCR_PADDLE_TEXT_RECOGNITION_MODEL = os.getenv('OCR_PADDLE_TEXT_RECOGNITION_MODEL', 'latin_PP-OCRv5_mobile_rec')
+# Recognized languages; licenses are first read with OCR_FAST_LANGUAGES on a
+# OCR_FAST_MAX_IMAGE_SIDE image, and again with OCR_LANGUAGES only if that pass finds no license and expiry date
+OCR_LANGUAGES = os.getenv('OCR_LANGUAGES', 'en,de,fr,it').split(',')
+OCR_TIERED = os.getenv('OCR_TIERED', 'True').lower() in ('true', '1', 'yes')
+OCR_FAST_LANGUAGES = os.getenv('OCR_FAST_LANGUAGES', 'en').split(',')
+OCR_FAST_MAX_IMAGE_SIDE = int(os.getenv('OCR_FAST_MAX_IMAGE_SIDE', '1024'))
+# Images (e.g. front and back) accepted per license upload, read in one batched OCR call
+OCR_MAX_LICENSE_IMAGES = int(os.getenv('OCR_MAX_LICENSE_IMAGES', '4'))
+# Load the OCR model in the background when a web process starts instead of on the first upload
+OCR_PRELOAD = os.getenv('OCR_PRELOAD', 'False').lower() in ('true', '1', 'yes')
+# Preprocessing before OCR: longest image side in pixels (0 = keep), grayscale, contrast stretch
+OCR_MAX_IMAGE_SIDE = int(os.getenv('OCR_MAX_IMAGE_SIDE', '1600'))
+OCR_GRAYSCALE = os.getenv('OCR_GRAYSCALE', 'True').lower() in ('true', '1', 'yes')
+OCR_AUTOCONTRAST = os.getenv('OCR_AUTOCONTRAST', 'True').lower() in ('true', '1', 'yes')
+# License check results reused for re-uploads of identical bytes
+OCR_RESULT_CACHE_SIZE = int(os.getenv('OCR_RESULT_CACHE_SIZE', '512'))
+OCR_RESULT_CACHE_TTL = int(os.getenv('OCR_RESULT_CACHE_TTL', '3600'))
+# Optional alias from CACHES shared by all workers (e.g. Redis); empty = in-process only
+OCR_RESULT_CACHE_BACKEND = os.getenv('OCR_RESULT_CACHE_BACKEND', '')
+# Background license checks (/api/driver-license-jobs/): OCR jobs run at once in each
+# process (every web worker and every process_ocr_jobs), not across the deployment
+OCR_MAX_CONCURRENT_JOBS = int(os.getenv('OCR_MAX_CONCURRENT_JOBS', '2'))
+# Attempts before a job the OCR worker pool never answered fails as retryable, and the
+# delay before the web process retries it (seconds, doubled after every attempt)
+OCR_JOB_MAX_ATTEMPTS = int(os.getenv('OCR_JOB_MAX_ATTEMPTS', '4'))
+OCR_JOB_RETRY_DELAY = float(os.getenv('OCR_JOB_RETRY_DELAY', '5'))
+# Run queued jobs on a thread pool in the web process; when off only `manage.py process_ocr_jobs` runs them
+OCR_JOBS_IN_WEB_PROCESS = os.getenv('OCR_JOBS_IN_WEB_PROCESS', 'True').lower() in ('true', '1', 'yes')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
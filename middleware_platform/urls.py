@@ -5,8 +5,8 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
 
-from api.booking.views import CancelBookingAPIView, ExtendBookingView, PriceCalculationView
-from api.guest.views import  upload_driver_license_temp
+from api.booking.views import BatchPriceCalculationView, CancelBookingAPIView, ExtendBookingView, PriceCalculationView, PriceQuoteCacheStatsView
+from api.guest.views import  driver_license_job_status, upload_driver_license_job, upload_driver_license_temp
 from auth.forms import StrictAdminPasswordResetForm
 from api.hotel.views import nearby_hotels_view
 from auth.views import CustomAdminPasswordResetView
@@ -17,6 +17,8 @@ urlpatterns = [
 
     path('api/', include('api.urls')),
     path('api/upload-driver-license-temp/', upload_driver_license_temp, name='driver-license-upload-temp'),
+    path('api/driver-license-jobs/', upload_driver_license_job, name='driver-license-job-upload'),
+    path('api/driver-license-jobs/<uuid:job_id>/', driver_license_job_status, name='driver-license-job-status'),
     path('api/', include('payments.urls')),
     path('api/booking/extend/<uuid:hotel_id>/<uuid:car_id>/', ExtendBookingView.as_view(), name='extend-booking-by-vehicle'),
     path('api/booking/extend/<uuid:booking_id>/', ExtendBookingView.as_view(), name='extend-booking'),   
@@ -42,6 +44,8 @@ urlpatterns = [
 
     path('reset/done/', auth_views.PasswordResetCompleteView.as_view(), name='password_reset_complete'),
     path('api/calculate-price/', PriceCalculationView.as_view(), name='calculate_price'),
+    path('api/calculate-price/batch/', BatchPriceCalculationView.as_view(), name='calculate_price_batch'),
+    path('api/calculate-price/cache-stats/', PriceQuoteCacheStatsView.as_view(), name='calculate_price_cache_stats'),
     path('admin/', admin.site.urls),  # Keep this last
     
 
@@ -1,7 +1,7 @@
 from django.core.mail import EmailMessage
 import uuid
 from django.db import models
-import stripe
+from payments.stripe_client import stripe
 from api.booking.models import Booking
 from api.garage.models import Car
 from api.booking.email_service import Email
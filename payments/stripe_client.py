@@ -0,0 +1,12 @@
+from django.conf import settings
+
+from api.lazy import LazyModule
+
+
+def _configure(stripe):
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+
+
+# The Stripe SDK (and requests underneath it) is imported on the first API
+# call instead of at startup; every module shares this configured client.
+stripe = LazyModule('stripe', on_import=_configure)
@@ -5,15 +5,11 @@ import os
 from venv import logger
 from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse, JsonResponse
-import requests
-import stripe
 from django.core.mail import send_mail
 import uuid
-import requests
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 from django.conf import settings
-import stripe
 from django.db.models import Sum
 from api.booking.models import Booking
 from payments.models import Payment
@@ -22,9 +18,11 @@ from api.booking.email_service import Email
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from api.lazy import LazyModule
+from payments.stripe_client import stripe
 
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
+requests = LazyModule('requests')
 STRIPE_WEBHOOK_SECRET = settings.STRIPE_WEBHOOK_SECRET
 
 class PaymentAmountAPIView(APIView):